@@ -0,0 +1,57 @@
+"""
+Records/sec written by `FileHandler` with a flush after every record (default)
+and with buffered writes, with and without fsync.
+"""
+
+from __future__ import annotations
+
+import logging
+import tempfile
+import time
+
+import harness
+
+import np_logging.handlers
+
+
+def records_per_second(n: int, **kwargs) -> float:
+    record = logging.makeLogRecord(
+        {
+            "name": "bench",
+            "msg": "benchmark record %d",
+            "args": (0,),
+            "levelno": logging.DEBUG,
+        }
+    )
+    with tempfile.TemporaryDirectory() as logs_dir:
+        handler = np_logging.handlers.FileHandler(
+            logs_dir=logs_dir, level=logging.DEBUG, **kwargs
+        )
+        t0 = time.perf_counter()
+        for _ in range(n):
+            handler.handle(record)
+        handler.flush()
+        rate = n / (time.perf_counter() - t0)
+        handler.close()
+    return rate
+
+
+def main(n: int = 50_000) -> None:
+    variants = {
+        "flush per record": {},
+        "flush+fsync per record": dict(fsync=True),
+        "buffered 64 KiB": dict(buffer_size=1 << 16),
+        "buffered 64 KiB, fsync per flush": dict(buffer_size=1 << 16, fsync=True),
+    }
+    for name, kwargs in variants.items():
+        records = n // 10 if kwargs == dict(fsync=True) else n
+        harness.report(
+            "file_handler",
+            mode=name,
+            records=records,
+            records_per_s=round(records_per_second(records, **kwargs)),
+        )
+
+
+if __name__ == "__main__":
+    main()
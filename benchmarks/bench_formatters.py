@@ -0,0 +1,93 @@
+"""
+Per-record cost of formatting with each formatter in the package config, as
+`logging.Formatter` and as np_logging's `CachedFormatter`, and of formatting one
+record with all of them in turn, as when it passes through several handlers.
+
+Also per record: writing JSON lines with `JSONFormatter` and with `json.dumps`, and
+reading records back from JSON lines and from `detailed` text.
+"""
+from __future__ import annotations
+
+import json
+import logging
+
+import harness
+
+import np_logging.formatters
+import np_logging.handlers
+import np_logging.parsing
+
+IMPLEMENTATIONS = {
+    "logging": logging.Formatter,
+    "cached": np_logging.formatters.CachedFormatter,
+}
+
+
+def make_record() -> logging.LogRecord:
+    return logging.getLogger("bench").makeRecord(
+        "bench", logging.INFO, __file__, 0, "benchmark record %d", (0,), None
+    )
+
+
+def main() -> None:
+    np_logging.handlers.setup_record_factory("bench")
+    config = np_logging.handlers.PKG_CONFIG["formatters"]
+    for implementation, cls in IMPLEMENTATIONS.items():
+        formatters = {name: cls(**kwargs) for name, kwargs in config.items()}
+        for name, formatter in formatters.items():
+            record = make_record()
+            harness.report(
+                "formatter",
+                implementation=implementation,
+                formatter=name,
+                **harness.per_call(lambda: formatter.format(record)),
+            )
+
+        def format_all():
+            record = make_record()
+            for formatter in formatters.values():
+                formatter.format(record)
+
+        harness.report(
+            "formatter",
+            implementation=implementation,
+            formatter="all, per record (incl. makeRecord)",
+            **harness.per_call(format_all),
+        )
+
+    record = make_record()
+    fields = np_logging.formatters.JSON_FIELDS
+
+    def dumps():
+        record.message = record.getMessage()
+        d = record.__dict__
+        values = {k: d.get("message" if k == "msg" else k) for k in fields}
+        return json.dumps(values, separators=(",", ":"))
+
+    json_formatter = np_logging.formatters.JSONFormatter()
+    for implementation, function in (
+        ("json.dumps", dumps),
+        ("json", lambda: json_formatter.format(record)),
+    ):
+        harness.report(
+            "formatter",
+            implementation=implementation,
+            formatter="json_lines",
+            **harness.per_call(function),
+        )
+
+    n = 10_000
+    json_lines = [json_formatter.format(record) + "\n"] * n
+    text = [np_logging.handlers.formats()["detailed"].format(record) + "\n"] * n
+    for name, function in (
+        ("json_lines", lambda: np_logging.parsing.parse_json_lines(json_lines)),
+        ("detailed", lambda: np_logging.parsing.parse(text)),
+    ):
+        result = harness.per_call(lambda: sum(1 for _ in function()), number=10)
+        harness.report(
+            "read_records", format=name, ns_per_record=round(result["ns_per_call"] / n, 1)
+        )
+
+
+if __name__ == "__main__":
+    main()
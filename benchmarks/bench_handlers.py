@@ -0,0 +1,121 @@
+"""
+Per-record latency (p50/p99) of `handler.handle(record)` for each np_logging
+handler, from one thread and from several threads sharing the handler, plus the
+cost of creating a record through np_logging's record factory.
+
+Runs offline: `ServerHandler` sends to a loopback receiver, and `EmailHandler`
+to a minimal local SMTP server.
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import tempfile
+from typing import Callable, Iterator
+
+import harness
+from loopback import LoopbackSMTPServer
+
+import np_logging.handlers
+from np_logging.server import ThreadedLogServer
+
+THREADS = (1, 4)
+
+
+def make_record() -> logging.LogRecord:
+    "Record with the fields added by np_logging's record factory."
+    np_logging.handlers.setup_record_factory("bench")
+    return logging.getLogger("bench").makeRecord(
+        "bench", logging.ERROR, __file__, 0, "benchmark record %d", (0,), None
+    )
+
+
+@contextlib.contextmanager
+def console_handler() -> Iterator[logging.Handler]:
+    with open(os.devnull, "w") as devnull:
+        yield np_logging.handlers.ConsoleHandler(stream=devnull, level=logging.DEBUG)
+
+
+@contextlib.contextmanager
+def file_handler() -> Iterator[logging.Handler]:
+    with tempfile.TemporaryDirectory() as logs_dir:
+        handler = np_logging.handlers.FileHandler(logs_dir=logs_dir, level=logging.DEBUG)
+        yield handler
+        handler.close()
+
+
+@contextlib.contextmanager
+def server_handler() -> Iterator[logging.Handler]:
+    receiver = ThreadedLogServer()
+    handler = np_logging.handlers.ServerHandler(
+        "bench", host=receiver.host, port=receiver.port, backup=logging.NullHandler()
+    )
+    yield handler
+    handler.close()
+    receiver.close()
+
+
+@contextlib.contextmanager
+def email_handler(cls=np_logging.handlers.EmailHandler, **kwargs) -> Iterator[logging.Handler]:
+    server = LoopbackSMTPServer()
+    handler = cls(
+        "bench@localhost", "bench", mailhost=(server.host, server.port), **kwargs
+    )
+    yield handler
+    handler.close()
+    server.close()
+
+
+@contextlib.contextmanager
+def flight_recorder() -> Iterator[logging.Handler]:
+    handler = np_logging.handlers.FlightRecorderHandler(
+        target=logging.NullHandler(), trigger_level=logging.CRITICAL
+    )
+    yield handler
+    handler.close()
+
+
+HANDLERS: dict[str, tuple[Callable[[], contextlib.AbstractContextManager], int]] = {
+    "ConsoleHandler": (console_handler, 20_000),
+    "FileHandler": (file_handler, 20_000),
+    "ServerHandler": (server_handler, 20_000),
+    "EmailHandler": (email_handler, 200),
+    "DigestEmailHandler": (
+        lambda: email_handler(np_logging.handlers.DigestEmailHandler, window=0.1),
+        20_000,
+    ),
+    "FlightRecorderHandler": (flight_recorder, 20_000),
+}
+"Handler name: (context manager yielding a handler, calls per thread)."
+
+
+def main(scale: float = 1.0) -> None:
+    record = make_record()
+    for name, (make_handler, number) in HANDLERS.items():
+        for threads in THREADS:
+            with make_handler() as handler:
+                handler.handle(record)  # connect & warm up
+                harness.report(
+                    "handler_emit",
+                    handler=name,
+                    **harness.latencies(
+                        lambda: handler.handle(record),
+                        max(1, int(number * scale)),
+                        threads,
+                    ),
+                )
+
+    factory = logging.getLogRecordFactory()
+    args = ("bench", logging.INFO, __file__, 0, "msg %s", ("arg",), None)
+    for threads in THREADS:
+        harness.report(
+            "record_factory_call",
+            **harness.latencies(
+                lambda: factory(*args), max(1, int(100_000 * scale)), threads
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Wall time of `import np_logging` in a fresh interpreter, with a cold config
+cache (ZooKeeper is queried in the background) and a warm one.
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import harness
+
+CODE = "import time; t0 = time.perf_counter(); import np_logging; print(time.perf_counter() - t0)"
+
+
+def import_time(cache_dir: str) -> float:
+    env = {**os.environ, "NP_LOGGING_CACHE_DIR": cache_dir}
+    result = subprocess.run(
+        [sys.executable, "-c", CODE], env=env, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(repeat: int = 10) -> None:
+    with tempfile.TemporaryDirectory() as warm:
+        import_time(warm)  # populates cache if ZK is reachable
+        for name in ("cold", "warm"):
+            times = []
+            for _ in range(repeat):
+                if name == "cold":
+                    with tempfile.TemporaryDirectory() as cold:
+                        times.append(import_time(cold))
+                else:
+                    times.append(import_time(warm))
+            harness.report(
+                "import_np_logging",
+                cache=name,
+                median_ms=round(1000 * statistics.median(times), 1),
+                max_ms=round(1000 * max(times), 1),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Cost of a `logger.debug()` call from a module logger when no handler writes
+DEBUG records: with the logger at DEBUG (the previous fixed level), each call
+makes a record and walks the handler chain; with its level managed by
+`np_logging.levels`, the call is rejected by a cached level check.
+"""
+from __future__ import annotations
+
+import logging
+
+import harness
+
+import np_logging
+import np_logging.levels
+
+
+def main() -> None:
+    parent = logging.getLogger("bench_levels")
+    parent.propagate = False
+    parent.addHandler(logging.NullHandler(logging.INFO))
+    np_logging.handlers.setup_record_factory("bench")
+
+    fixed = logging.getLogger("bench_levels.fixed")
+    fixed.setLevel(logging.DEBUG)
+    managed = np_logging.getLogger("bench_levels.managed")
+    for name, logger in (("fixed DEBUG", fixed), ("managed", managed)):
+        harness.report(
+            "disabled_debug_call",
+            logger_level=name,
+            **harness.per_call(lambda: logger.debug("benchmark %s", "arg"), 100_000),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Records/sec logged from a process pool through `np_logging.multiprocess`, for
+1-4 workers, with the parent's listener passing records to a `NullHandler`.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import os
+import time
+
+import harness
+
+import np_logging
+import np_logging.multiprocess
+
+RECORDS_PER_TASK = 20_000
+
+
+def work(_) -> None:
+    logger = np_logging.getLogger("bench_multiprocess.worker")
+    for i in range(RECORDS_PER_TASK):
+        logger.info("benchmark record %d", i)
+
+
+class CountingHandler(logging.NullHandler):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def handle(self, record):
+        self.count += 1
+
+
+def main(tasks: int = 8) -> None:
+    parent = logging.getLogger("bench_multiprocess")
+    parent.propagate = False
+    handler = CountingHandler()
+    parent.addHandler(handler)
+    for workers in (1, 2, 4):
+        handler.count = 0
+        listener = np_logging.multiprocess.start(level=logging.INFO)
+        t0 = time.perf_counter()
+        with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=listener.initializer, initargs=listener.initargs
+        ) as pool:
+            list(pool.map(work, range(tasks)))
+        np_logging.multiprocess.stop()
+        elapsed = time.perf_counter() - t0
+        assert handler.count == tasks * RECORDS_PER_TASK
+        harness.report(
+            "multiprocess",
+            workers=workers,
+            cpus=os.cpu_count(),
+            records=handler.count,
+            records_per_s=round(handler.count / elapsed),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Time to find the WARNING records from one logger in a 50 MB log file and its rotated
+backups with `np_logging.query`: building the indexes on the first query, then with
+them, compared with parsing every record.
+"""
+from __future__ import annotations
+
+import logging
+import pathlib
+import tempfile
+import time
+
+import harness
+
+import np_logging.handlers
+import np_logging.parsing
+import np_logging.query
+import np_logging.rotation
+
+
+def write_logs(directory: pathlib.Path, n: int) -> None:
+    handler = np_logging.handlers.FileHandler(
+        logs_dir=directory,
+        level=logging.DEBUG,
+        maxBytes=10 * 1024**2,
+        backupCount=1000,
+        rotation="sequence",
+    )
+    for i in range(n):
+        level = logging.WARNING if i % 100_000 < 100 else logging.INFO  # in bursts
+        handler.handle(
+            logging.makeLogRecord(
+                {
+                    "name": f"bench.{i % 10}",
+                    "msg": "benchmark record %d",
+                    "args": (i,),
+                    "levelno": level,
+                    "levelname": logging.getLevelName(level),
+                }
+            )
+        )
+    handler.close()
+    np_logging.rotation.pruner().requests.join()
+
+
+def timed(function) -> tuple[float, int]:
+    t0 = time.perf_counter()
+    found = sum(1 for _ in function())
+    return round((time.perf_counter() - t0) * 1000, 1), found
+
+
+def query_result(n: int) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as d:
+        write_logs(pathlib.Path(d), n)
+        base = pathlib.Path(d) / "debug.log"
+
+        def scan():
+            for record in np_logging.parsing.parse(np_logging.rotation.read_lines(base)):
+                if record["levelno"] >= logging.WARNING and record["name"] == "bench.0":
+                    yield record
+
+        def indexed():
+            return np_logging.query.query(base, level=logging.WARNING, logger="bench.0")
+
+        scan_ms, expected = timed(scan)
+        first_ms, found = timed(indexed)
+        indexed_ms, found_again = timed(indexed)
+    assert expected == found == found_again
+    return {
+        "records": n,
+        "found": found,
+        "scan_ms": scan_ms,
+        "first_query_ms": first_ms,
+        "indexed_query_ms": indexed_ms,
+    }
+
+
+def main() -> None:
+    harness.report("query", **query_result(500_000))
+
+
+if __name__ == "__main__":
+    main()
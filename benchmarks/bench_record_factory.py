@@ -0,0 +1,54 @@
+"""
+Per-record cost of np_logging's record factory, after it has been set up by
+1-100 handlers (each `ServerHandler`/`EmailHandler` sets it up on init).
+
+`legacy` is the previous implementation, which wrapped the installed factory
+on every call and resolved hostname/comp_id per record.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import platform
+
+import harness
+
+import np_logging.handlers
+
+
+def legacy_setup_record_factory(project_name: str):
+    log_factory = logging.getLogRecordFactory()
+
+    def record_factory(*args, **kwargs) -> logging.LogRecord:
+        record = log_factory(*args, **kwargs)
+        record.project = project_name
+        record.comp_id = os.getenv("aibs_comp_id", None)
+        record.rig_name = record.hostname = platform.node()
+        record.version = None
+        return record
+
+    logging.setLogRecordFactory(record_factory)
+
+
+def main() -> None:
+    args = ("bench", logging.INFO, __file__, 0, "msg %s", ("arg",), None)
+    for name, setup in (
+        ("legacy", legacy_setup_record_factory),
+        ("cached", np_logging.handlers.setup_record_factory),
+    ):
+        for n_handlers in (1, 3, 10, 100):
+            logging.setLogRecordFactory(logging.LogRecord)
+            for _ in range(n_handlers):
+                setup("bench")
+            factory = logging.getLogRecordFactory()
+            harness.report(
+                "record_factory",
+                implementation=name,
+                n_handlers=n_handlers,
+                **harness.per_call(lambda: factory(*args)),
+            )
+    logging.setLogRecordFactory(logging.LogRecord)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Time taken by a single rollover of `FileHandler`, with `backupCount` backups
+already on disk, for each rotation scheme in `np_logging.rotation`.
+
+`classic` renames every existing backup, so its cost grows with `backupCount`.
+
+Also: rollover time with `compression`, and the time taken and size ratio of
+compressing a 10 MB backup in the background.
+"""
+from __future__ import annotations
+
+import logging
+import pathlib
+import statistics
+import tempfile
+import time
+
+import harness
+
+import np_logging.handlers
+import np_logging.rotation
+
+
+def rollover_times(
+    directory: pathlib.Path, scheme: str, backup_count: int, repeat: int
+) -> list[float]:
+    base = directory / "info.log"
+    for i in range(1, backup_count + 1):
+        name = f"{base}.{i}" if scheme == "classic" else f"{base}.{i:06d}"
+        pathlib.Path(name).write_bytes(b"")
+    handler = np_logging.handlers.FileHandler(
+        logs_dir=directory,
+        level=logging.INFO,
+        backupCount=backup_count,
+        rotation=scheme,
+    )
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        handler.doRollover()
+        times.append(time.perf_counter() - t0)
+    handler.close()
+    np_logging.rotation.pruner().requests.join()
+    return times
+
+
+def compression_result(directory: pathlib.Path, compression: str) -> dict[str, float]:
+    handler = np_logging.handlers.FileHandler(
+        logs_dir=directory,
+        level=logging.INFO,
+        rotation="sequence",
+        compression=compression,
+    )
+    line = "2022-10-17 12:00:00 bench INFO bench.py:1 main MainThread | record {}\n"
+    with open(handler.baseFilename, "w") as f:
+        for i in range(10 * 1024**2 // len(line)):
+            f.write(line.format(i))
+    size = pathlib.Path(handler.baseFilename).stat().st_size
+    t0 = time.perf_counter()
+    handler.doRollover()
+    t1 = time.perf_counter()
+    np_logging.rotation.pruner().requests.join()
+    t2 = time.perf_counter()
+    handler.close()
+    (segment,) = np_logging.rotation.list_segments(handler.baseFilename)
+    return dict(
+        rollover_ms=round(1000 * (t1 - t0), 3),
+        background_ms=round(1000 * (t2 - t1), 1),
+        ratio=round(size / segment.stat().st_size, 1),
+    )
+
+
+def main(repeat: int = 5) -> None:
+    for backup_count in (10, 1000, 9999):
+        for scheme in np_logging.rotation.ROTATIONS:
+            with tempfile.TemporaryDirectory() as directory:
+                times = rollover_times(
+                    pathlib.Path(directory), scheme, backup_count, repeat
+                )
+            harness.report(
+                "rollover",
+                rotation=scheme,
+                backup_count=backup_count,
+                median_ms=round(1000 * statistics.median(times), 3),
+                max_ms=round(1000 * max(times), 3),
+            )
+    for compression in np_logging.rotation.COMPRESSIONS:
+        with tempfile.TemporaryDirectory() as directory:
+            result = compression_result(pathlib.Path(directory), compression)
+        harness.report("rollover_compression", compression=compression, **result)
+
+
+if __name__ == "__main__":
+    main()
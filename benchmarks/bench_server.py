@@ -0,0 +1,56 @@
+"""
+Records/sec received by `np_logging.server` from many clients at once, each
+sending batches of frames over its own connection.
+"""
+from __future__ import annotations
+
+import logging
+import logging.handlers
+import socket
+import threading
+import time
+
+import harness
+
+from np_logging.server import ThreadedLogServer
+
+
+def frames(n: int) -> bytes:
+    record = logging.makeLogRecord(
+        {"name": "bench", "msg": "benchmark record %d", "args": (0,), "levelno": logging.INFO}
+    )
+    return logging.handlers.SocketHandler(None, None).makePickle(record) * n
+
+
+def records_per_second(clients: int, batches: int, batch_size: int = 100) -> float:
+    server = ThreadedLogServer()
+    data = frames(batch_size)
+    connections = [socket.create_connection((server.host, server.port)) for _ in range(clients)]
+
+    def send(connection: socket.socket) -> None:
+        with connection:
+            for _ in range(batches):
+                connection.sendall(data)
+
+    threads = [threading.Thread(target=send, args=(_,)) for _ in connections]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    n = clients * batches * batch_size
+    assert server.wait_for(n)
+    elapsed = time.perf_counter() - t0
+    server.close()
+    return n / elapsed
+
+
+def main() -> None:
+    for clients in (1, 10, 100):
+        harness.report(
+            "server_ingest",
+            clients=clients,
+            records_per_s=round(records_per_second(clients, batches=2000 // clients)),
+        )
+
+
+if __name__ == "__main__":
+    main()
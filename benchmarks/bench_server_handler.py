@@ -0,0 +1,53 @@
+"""
+Records/sec sent to a loopback receiver by `ServerHandler` (one frame and one
+`sendall` per record) and `BatchServerHandler` (one write per batch).
+"""
+from __future__ import annotations
+
+import logging
+import time
+
+import harness
+
+import np_logging.handlers
+from np_logging.server import ThreadedLogServer
+
+
+def records_per_second(handler: logging.Handler, receiver: ThreadedLogServer, n: int) -> float:
+    record = logging.makeLogRecord(
+        {"name": "bench", "msg": "benchmark record %d", "args": (0,), "levelno": logging.INFO}
+    )
+    start = receiver.received
+    t0 = time.perf_counter()
+    for _ in range(n):
+        handler.handle(record)
+    handler.flush()
+    assert receiver.wait_for(start + n)
+    return n / (time.perf_counter() - t0)
+
+
+def main(n: int = 50_000) -> None:
+    receiver = ThreadedLogServer()
+    kwargs = dict(host=receiver.host, port=receiver.port, backup=logging.NullHandler())
+    variants = {
+        "ServerHandler": lambda: np_logging.handlers.ServerHandler("bench", **kwargs),
+        "BatchServerHandler": lambda: np_logging.handlers.BatchServerHandler("bench", **kwargs),
+        "BatchServerHandler(compress)": lambda: np_logging.handlers.BatchServerHandler(
+            "bench", compress=True, **kwargs
+        ),
+    }
+    for name, make_handler in variants.items():
+        handler = make_handler()
+        records_per_second(handler, receiver, 1000)  # connect & warm up
+        harness.report(
+            "server_handler",
+            handler=name,
+            records=n,
+            records_per_s=round(records_per_second(handler, receiver, n)),
+        )
+        handler.close()
+    receiver.close()
+
+
+if __name__ == "__main__":
+    main()
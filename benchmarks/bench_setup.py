@@ -0,0 +1,60 @@
+"""
+Wall time of `np_logging.setup()` and of the first `np_logging.getLogger()` (root
+logger initialization), each in a fresh interpreter, after `import np_logging`.
+
+Run offline, `setup()` with the default config also includes the time taken to
+find the log server and mail host unreachable.
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import harness
+
+CALLS = {
+    "setup": "np_logging.setup()",
+    "getLogger": "np_logging.getLogger()",
+}
+
+CODE = """
+import time, np_logging
+t0 = time.perf_counter()
+{call}
+print("elapsed", time.perf_counter() - t0)
+"""
+
+
+def call_time(call: str, cache_dir: str) -> float:
+    env = {**os.environ, "NP_LOGGING_CACHE_DIR": cache_dir}
+    with tempfile.TemporaryDirectory() as cwd:  # logs dir is created in cwd
+        result = subprocess.run(
+            [sys.executable, "-c", CODE.format(call=call)],
+            env=env,
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    lines = result.stdout.splitlines()  # also has console output from np_logging
+    return float(next(_ for _ in lines if _.startswith("elapsed ")).split()[-1])
+
+
+def main(repeat: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, call in CALLS.items():
+            call_time(call, cache_dir)  # warm config & probe caches
+            times = [call_time(call, cache_dir) for _ in range(repeat)]
+            harness.report(
+                "np_logging_call",
+                call=name,
+                median_ms=round(1000 * statistics.median(times), 1),
+                max_ms=round(1000 * max(times), 1),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Records/sec backfilled by `np_logging.ship` from a 10 MB log file and its rotated
+backups to a local receiver, and the CPU time used per poll while following files
+that aren't changing.
+"""
+from __future__ import annotations
+
+import logging
+import pathlib
+import tempfile
+import threading
+import time
+
+import harness
+
+import np_logging.handlers
+import np_logging.rotation
+import np_logging.ship
+from np_logging.server import ThreadedLogServer
+
+
+def write_logs(directory: pathlib.Path, n: int, compression=None) -> None:
+    handler = np_logging.handlers.FileHandler(
+        logs_dir=directory,
+        level=logging.INFO,
+        maxBytes=1024**2,
+        backupCount=1000,
+        rotation="sequence",
+        compression=compression,
+    )
+    record = logging.makeLogRecord(
+        {
+            "name": "bench",
+            "msg": "benchmark record %d",
+            "args": (0,),
+            "levelno": logging.INFO,
+            "levelname": "INFO",
+        }
+    )
+    for _ in range(n):
+        handler.handle(record)
+    handler.close()
+    np_logging.rotation.pruner().requests.join()
+
+
+def backfill_result(n: int, compression=None) -> dict[str, float]:
+    server = ThreadedLogServer()
+    with tempfile.TemporaryDirectory() as d:
+        directory = pathlib.Path(d)
+        write_logs(directory, n, compression)
+        t0 = time.perf_counter()
+        sent = np_logging.ship.ship(
+            [directory / "info.log"], server.host, server.port, checkpoint_dir=directory / "ship"
+        )
+        assert server.wait_for(sent)
+        elapsed = time.perf_counter() - t0
+    server.close()
+    return {"records": sent, "records_per_s": round(sent / elapsed)}
+
+
+def idle_follow_result(files: int, polls: int = 50, interval: float = 0.01) -> dict[str, float]:
+    server = ThreadedLogServer()
+    with tempfile.TemporaryDirectory() as d:
+        paths = []
+        for i in range(files):
+            write_logs(pathlib.Path(d) / str(i), 100)
+            paths.append(pathlib.Path(d) / str(i) / "info.log")
+        kwargs = dict(host=server.host, port=server.port, checkpoint_dir=pathlib.Path(d) / "ship")
+        np_logging.ship.ship(paths, **kwargs)
+        stop = threading.Event()
+        follower = threading.Thread(
+            target=np_logging.ship.ship,
+            args=(paths,),
+            kwargs=dict(follow=True, poll_interval=interval, stop=stop, **kwargs),
+        )
+        follower.start()
+        time.sleep(interval * 5)  # first poll lists backups
+        cpu0 = time.process_time()
+        time.sleep(interval * polls)
+        cpu = time.process_time() - cpu0
+        stop.set()
+        follower.join()
+    server.close()
+    return {"files": files, "cpu_us_per_poll": round(cpu / polls * 1e6, 1)}
+
+
+def main() -> None:
+    harness.report("ship_backfill", compression=None, **backfill_result(100_000))
+    harness.report("ship_backfill", compression="gzip", **backfill_result(100_000, "gzip"))
+    harness.report("ship_idle_follow", **idle_follow_result(files=10))
+
+
+if __name__ == "__main__":
+    main()
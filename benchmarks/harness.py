@@ -0,0 +1,69 @@
+"""
+Shared timing helpers for the benchmark scripts in this directory.
+
+Each measurement is printed to stdout as one line of JSON, so results can be
+collected with e.g. `python benchmarks/bench_record_factory.py > results.jsonl`,
+or `python benchmarks/run.py > results.jsonl` for the whole suite.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Any, Callable
+
+
+def per_call(fn: Callable[[], Any], number: int = 10_000, repeat: int = 5) -> dict[str, float]:
+    "Best-of-`repeat` mean time per call of `fn`, in nanoseconds."
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter_ns() - t0) / number)
+    return {"ns_per_call": round(best, 1), "calls": number}
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+def latencies(
+    fn: Callable[[], Any], number: int = 10_000, threads: int = 1
+) -> dict[str, float]:
+    """Per-call latency of `fn`, called `number` times in each of `threads`
+    concurrent threads: p50/p99/max in nanoseconds, and total calls/sec."""
+    samples: list[list[int]] = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def run(times: list[int]) -> None:
+        barrier.wait()
+        clock = time.perf_counter_ns
+        for _ in range(number):
+            t0 = clock()
+            fn()
+            times.append(clock() - t0)
+
+    workers = [threading.Thread(target=run, args=(_,)) for _ in samples]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - t0
+    merged = sorted(t for times in samples for t in times)
+    return {
+        "threads": threads,
+        "calls": len(merged),
+        "p50_ns": percentile(merged, 50),
+        "p99_ns": percentile(merged, 99),
+        "max_ns": merged[-1],
+        "calls_per_s": round(len(merged) / elapsed),
+    }
+
+
+def report(benchmark: str, **result: Any) -> dict[str, Any]:
+    result = {"benchmark": benchmark, **result}
+    print(json.dumps(result), flush=True)
+    return result
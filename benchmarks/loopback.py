@@ -0,0 +1,56 @@
+"""
+Local stand-in for the mail host: accepts connections on a loopback port and
+counts the messages received. For the log server, see `np_logging.server`.
+"""
+from __future__ import annotations
+
+import socket
+import threading
+
+
+class LoopbackSMTPServer:
+    "Minimal SMTP server: accepts any message and counts them."
+
+    def __init__(self):
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen()
+        self.host, self.port = self.server.getsockname()
+        self.received = 0
+        self.connections = 0
+        self.received_event = threading.Condition()
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    def serve(self, conn: socket.socket):
+        with conn, conn.makefile("rb") as lines:
+            conn.sendall(b"220 localhost\r\n")
+            for line in lines:
+                command = line[:4].upper()
+                if command == b"DATA":
+                    conn.sendall(b"354 go ahead\r\n")
+                    for line in lines:
+                        if line == b".\r\n":
+                            break
+                    with self.received_event:
+                        self.received += 1
+                        self.received_event.notify_all()
+                elif command == b"QUIT":
+                    conn.sendall(b"221 bye\r\n")
+                    return
+                conn.sendall(b"250 ok\r\n")
+
+    def wait_for(self, n: int, timeout: float = 60) -> bool:
+        with self.received_event:
+            return self.received_event.wait_for(lambda: self.received >= n, timeout)
+
+    def close(self):
+        self.server.close()
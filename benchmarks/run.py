@@ -0,0 +1,43 @@
+"""
+Runs the benchmark suite, offline, printing one JSON line per measurement:
+    python benchmarks/run.py > results.jsonl
+    python benchmarks/run.py handlers setup  # only bench_handlers.py, bench_setup.py
+
+The first line describes the environment, for comparing results across versions
+and machines.
+"""
+from __future__ import annotations
+
+import importlib
+import os
+import pathlib
+import platform
+import sys
+
+import harness
+
+HERE = pathlib.Path(__file__).parent
+BENCHMARKS = sorted(_.stem[len("bench_") :] for _ in HERE.glob("bench_*.py"))
+
+
+def main(names: list[str]) -> None:
+    try:
+        from importlib.metadata import version
+    except ImportError:  # Python 3.7
+        from importlib_metadata import version
+
+    harness.report(
+        "environment",
+        np_logging=version("np_logging"),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        cpus=os.cpu_count(),
+    )
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise SystemExit(f"Unknown benchmark {name!r}: choose from {BENCHMARKS}")
+        importlib.import_module(f"bench_{name}").main()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,11 +1,89 @@
-from np_logging.handlers import *
-from np_logging.np_logging import (
-    email,
-    get_logger,
-    getLogger,
-    set_level,
-    setLevel,
-    setup,
-    web,
-    debug,
+"""
+Logging setup for Mindscope Neuropixels projects.
+
+Submodules and their contents are imported on first access (PEP 562), so
+`import np_logging` doesn't load the package config, ZooKeeper client or handlers
+until something is logged or configured.
+"""
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+_ATTRIBUTES = {
+    "dropped": "np_logging.listener",
+    "stats": "np_logging.metrics",
+    **dict.fromkeys(
+        ("email", "get_logger", "getLogger", "set_level", "setLevel", "setup", "web", "debug"),
+        "np_logging.np_logging",
+    ),
+}
+"Public names, and the modules they're imported from on first access."
+
+_SUBMODULES = (
+    "aio",
+    "config",
+    "filters",
+    "formatters",
+    "handlers",
+    "levels",
+    "listener",
+    "metrics",
+    "multiprocess",
+    "np_logging",
+    "parsing",
+    "query",
+    "reconfigure",
+    "rotation",
+    "server",
+    "ship",
+    "spool",
+    "utils",
+    "wire",
 )
+
+_HANDLERS_EXPORTS = (
+    "PKG_CONFIG",
+    "SERVER_BACKUP",
+    "SERVER",
+    "CONSOLE",
+    "FILE",
+    "EMAIL",
+    "FORMAT",
+    "setup_record_factory",
+    "ServerBackupHandler",
+    "ServerHandler",
+    "BatchServerHandler",
+    "EmailHandler",
+    "DigestEmailHandler",
+    "ConsoleHandler",
+    "FileHandler",
+    "FlightRecorderHandler",
+)
+"""Names from `np_logging.handlers` that `from np_logging import *` exports, as it did
+when this module ran `from np_logging.handlers import *`. A star import loads them."""
+
+__all__ = [*_ATTRIBUTES, *_HANDLERS_EXPORTS]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _ATTRIBUTES:
+        value = getattr(importlib.import_module(_ATTRIBUTES[name]), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f"{__name__}.{name}")
+    elif not name.startswith("_"):
+        # previously `from np_logging.handlers import *`: handler classes etc.
+        try:
+            value = getattr(importlib.import_module("np_logging.handlers"), name)
+        except AttributeError:
+            raise AttributeError(
+                f"module {__name__!r} has no attribute {name!r}"
+            ) from None
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_ATTRIBUTES, *_SUBMODULES})
@@ -0,0 +1,266 @@
+"""
+Logging from asyncio programs without blocking the event loop.
+
+`AsyncServerHandler` sends records to the log server with asyncio streams, from
+a task on the loop: logging a record only pickles it and puts it on a queue.
+Blocking work - writing the backup file - is done in the loop's default executor.
+
+`np_logging.setup(asyncio=True)` replaces the configured `ServerHandler`s with
+`AsyncServerHandler`s, and runs other handlers (files, email) on a background
+thread, as with `queued=True`. Calling `setup()` again without `asyncio=True`
+swaps them back.
+
+Each handler binds to the running loop it's created on, e.g. by `setup()` called
+in a coroutine, or else when the first record is logged from the loop. Up to
+`maxsize` records logged before then are kept until it binds, or sent when it's
+closed if it never does. When the loop shuts down, e.g. at the end of
+`asyncio.run()`, queued records are sent before the handler's task finishes.
+`await flush()` waits for records logged so far to be sent.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import logging
+import threading
+import weakref
+from typing import Optional
+
+import np_logging.handlers
+import np_logging.listener
+
+MAXSIZE = 10_000
+"Records held per handler while the server is slow or unreachable: oldest are dropped."
+BATCH_SIZE = 1000
+SHUTDOWN_TIMEOUT = 2.0
+"Seconds to spend sending queued records when the loop shuts down."
+
+_handlers: weakref.WeakSet[AsyncServerHandler] = weakref.WeakSet()
+
+
+class AsyncServerHandler(np_logging.handlers.ServerHandler):
+    """`ServerHandler` that never blocks the event loop: see `np_logging.aio`.
+
+    `dropped` counts records discarded because `maxsize` records were already
+    waiting to be sent, before or after binding to a loop. Records logged after the
+    loop has closed are only written to the backup file, if any: a `NullHandler`
+    backup is treated as none.
+    """
+
+    blocking = False
+    "Not moved to the listener thread by `np_logging.listener.enable()`."
+
+    def __init__(
+        self,
+        project_name: Optional[str] = None,
+        maxsize: int = MAXSIZE,
+        timeout: float = 5.0,
+        retry_max: float = 30.0,
+        **kwargs,
+    ):
+        kwargs.pop("spool", None)  # the task's queue stands in for the spool
+        super().__init__(project_name, **kwargs)
+        if isinstance(self.backup, logging.NullHandler):  # no executor round trips
+            self.backup = None
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.retry_max = retry_max
+        self.dropped = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread: Optional[int] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.sender: Optional[asyncio.Task] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.unbound: collections.deque[tuple[logging.LogRecord, bytes]] = (
+            collections.deque(maxlen=maxsize)
+        )
+        "Records logged before a loop was running."
+        _handlers.add(self)
+        with contextlib.suppress(RuntimeError):  # no running loop
+            self.bind(asyncio.get_running_loop())
+
+    def emit(self, record):
+        try:
+            item = (record, self.makePickle(record))
+        except Exception:
+            self.handleError(record)
+            return
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is None and self.loop is None:
+                if len(self.unbound) == self.maxsize:
+                    self.dropped += 1
+                self.unbound.append(item)
+                return
+            if loop is None:  # loop has shut down: no one to send it
+                self.emit_backup(record)
+                return
+            self.bind(loop)
+        if threading.get_ident() == self.loop_thread:
+            self.put(item)
+            return
+        try:
+            loop.call_soon_threadsafe(self.put, item)
+        except RuntimeError:  # loop closed since checked
+            self.emit_backup(record)
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        "Start sending from a task on `loop`. Call from the loop's thread."
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.queue = asyncio.Queue(self.maxsize)
+        self.writer = None
+        while self.unbound:
+            self.put(self.unbound.popleft())
+        self.sender = loop.create_task(self.send_forever())
+
+    def put(self, item: tuple[logging.LogRecord, bytes]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+    def take_batch(self) -> list[tuple[logging.LogRecord, bytes]]:
+        batch = []
+        while not self.queue.empty() and len(batch) < BATCH_SIZE:
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def send_forever(self) -> None:
+        batch: list[tuple[logging.LogRecord, bytes]] = []
+        delay = 1.0
+        try:
+            while True:
+                if not batch:
+                    batch = [await self.queue.get()] + self.take_batch()
+                    if self.backup is not None:
+                        await self.loop.run_in_executor(
+                            None, self.write_backup, [r for r, _ in batch]
+                        )
+                try:
+                    await self.send_frames(b"".join(frame for _, frame in batch))
+                except (OSError, asyncio.TimeoutError):
+                    await self.close_writer()
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.retry_max)
+                    continue
+                delay = 1.0
+                for _ in batch:
+                    self.queue.task_done()
+                batch = []
+        except asyncio.CancelledError:  # loop shutting down: send what's left
+            remaining = self.take_batch()
+            while remaining:
+                self.write_backup([r for r, _ in remaining])
+                batch += remaining
+                remaining = self.take_batch()
+            with contextlib.suppress(OSError, asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self.send_frames(b"".join(frame for _, frame in batch)),
+                    SHUTDOWN_TIMEOUT,
+                )
+            await self.close_writer()
+            raise
+
+    async def send_frames(self, data: bytes) -> None:
+        if self.writer is None:
+            _, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def close_writer(self) -> None:
+        if self.writer is None:
+            return
+        if self.writer.transport.get_write_buffer_size():
+            self.writer.transport.abort()  # unsent data: don't wait for the server
+        else:
+            self.writer.close()
+            with contextlib.suppress(Exception):
+                await asyncio.wait_for(self.writer.wait_closed(), self.timeout)
+        self.writer = None
+
+    def write_backup(self, records: list[logging.LogRecord]) -> None:
+        for record in records:
+            self.emit_backup(record)
+
+    async def drain(self) -> None:
+        "Wait until records logged so far from this loop have been sent."
+        if self.queue is not None and self.loop is asyncio.get_running_loop():
+            await self.queue.join()
+
+    def close(self):
+        if self.sender is not None and not self.loop.is_closed():
+            with contextlib.suppress(RuntimeError):
+                self.loop.call_soon_threadsafe(self.sender.cancel)
+        while self.unbound:  # never bound to a loop: send as `ServerHandler` does
+            record, frame = self.unbound.popleft()
+            self.send(frame)
+            self.emit_backup(record)
+        super().close()
+
+
+async def flush() -> None:
+    "Wait until records logged so far have been sent by every `AsyncServerHandler`."
+    await asyncio.gather(*(handler.drain() for handler in list(_handlers)))
+
+
+def replace_server_handlers(
+    project_name: Optional[str] = None,
+) -> list[AsyncServerHandler]:
+    "Swap `ServerHandler`s on all loggers for equivalent `AsyncServerHandler`s."
+    replaced = []
+    for _logger in np_logging.listener.loggers_with_handlers():
+        for handler in list(_logger.handlers):
+            if not isinstance(handler, np_logging.handlers.ServerHandler) or isinstance(
+                handler, AsyncServerHandler
+            ):
+                continue
+            async_handler = AsyncServerHandler(
+                project_name,
+                host=handler.host,
+                port=handler.port,
+                formatter=handler.formatter,
+                level=handler.level,
+                backup=handler.backup or logging.NullHandler(),
+            )
+            async_handler.name = handler.name
+            handler.backup = None
+            handler.close()
+            _logger.removeHandler(handler)
+            _logger.addHandler(async_handler)
+            replaced.append(async_handler)
+    return replaced
+
+
+def restore_server_handlers(
+    project_name: Optional[str] = None,
+) -> list[np_logging.handlers.ServerHandler]:
+    "Swap `AsyncServerHandler`s on all loggers back for equivalent `ServerHandler`s."
+    restored = []
+    for _logger in np_logging.listener.loggers_with_handlers():
+        for handler in list(_logger.handlers):
+            if not isinstance(handler, AsyncServerHandler):
+                continue
+            server_handler = np_logging.handlers.ServerHandler(
+                project_name,
+                host=handler.host,
+                port=handler.port,
+                formatter=handler.formatter,
+                level=handler.level,
+                backup=handler.backup or logging.NullHandler(),
+            )
+            server_handler.name = handler.name
+            handler.backup = None
+            handler.close()
+            _logger.removeHandler(handler)
+            _logger.addHandler(server_handler)
+            restored.append(server_handler)
+    return restored
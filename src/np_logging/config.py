@@ -1,43 +1,173 @@
+"""
+Package config and default logging config, loaded on first access of
+`PKG_CONFIG` or `DEFAULT_LOGGING_CONFIG`.
+
+The last copy of each config fetched from ZooKeeper is kept in an on-disk cache.
+If the cached copy is missing or older than `CACHE_TTL` seconds, ZooKeeper is
+queried on a background thread to update the cache, and the stale copy (or the
+local copy packaged with np_logging) is used in the meantime. `refresh()` queries
+ZooKeeper immediately.
+"""
 from __future__ import annotations
 
+import json
 import logging
-from typing import Any
-
-import importlib_resources
-import np_config
+import os
+import pathlib
+import threading
+import time
+from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 ZK_DEFAULT_LOGGING_CONFIG = "/projects/np_logging/defaults/logging"
-LOCAL_DEFAULT_LOGGING_CONFIG = (
-    importlib_resources.files("np_logging") / "default_logging_config.yaml"
+ZK_PROJECT_CONFIG = "/projects/np_logging/defaults/configuration"
+
+LOCAL_FILES = {
+    "LOCAL_DEFAULT_LOGGING_CONFIG": "default_logging_config.yaml",
+    "LOCAL_PROJECT_CONFIG": "package_config.yaml",
+}
+"Copies of each config packaged with np_logging, as module attributes."
+
+CACHE_DIR = pathlib.Path(
+    os.getenv("NP_LOGGING_CACHE_DIR")
+    or pathlib.Path(os.getenv("LOCALAPPDATA") or pathlib.Path.home() / ".cache")
+    / "np_logging"
 )
+CACHE_TTL: float = float(os.getenv("NP_LOGGING_CACHE_TTL", 24 * 60 * 60))
+CACHE_FORMAT = 1
+"Stamped on cache files: bump if their layout changes, to invalidate old caches."
 
-ZK_PROJECT_CONFIG = "/projects/np_logging/defaults/configuration"
-LOCAL_PROJECT_CONFIG = importlib_resources.files("np_logging") / "package_config.yaml"
+SOURCES: dict[str, tuple[str, str]] = {
+    "PKG_CONFIG": (ZK_PROJECT_CONFIG, LOCAL_FILES["LOCAL_PROJECT_CONFIG"]),
+    "DEFAULT_LOGGING_CONFIG": (
+        ZK_DEFAULT_LOGGING_CONFIG,
+        LOCAL_FILES["LOCAL_DEFAULT_LOGGING_CONFIG"],
+    ),
+}
+"ZooKeeper path and packaged file name of each config."
 
-try:
-    config = np_config.from_zk(ZK_PROJECT_CONFIG)
-except ConnectionError as exc:
-    logger.debug(
-        "Could not connect to ZooKeeper. Using local copy of package config: %s",
-        LOCAL_PROJECT_CONFIG,
-    )
-    config = np_config.from_file(LOCAL_PROJECT_CONFIG)
-except Exception:
-    raise
-
-PKG_CONFIG: dict[str, Any] = config
-try:
-    config = np_config.from_zk(ZK_DEFAULT_LOGGING_CONFIG)
-except ConnectionError as exc:
+_configs: dict[str, dict[str, Any]] = {}
+_background_refreshes: dict[str, threading.Thread] = {}
+_lock = threading.RLock()
+
+
+def cache_file(zk_path: str) -> pathlib.Path:
+    return CACHE_DIR / f"{zk_path.strip('/').replace('/', '.')}.json"
+
+
+def read_cache(zk_path: str) -> Optional[dict[str, Any]]:
+    "Cached entry for `zk_path`: `{'path', 'fetched', 'format', 'config'}`, if valid."
+    try:
+        entry = json.loads(cache_file(zk_path).read_text())
+    except (OSError, ValueError):
+        return None
+    if entry.get("format") != CACHE_FORMAT or entry.get("path") != zk_path:
+        return None
+    return entry
+
+
+def write_cache(zk_path: str, config: dict[str, Any]) -> None:
+    file = cache_file(zk_path)
+    entry = dict(path=zk_path, fetched=time.time(), format=CACHE_FORMAT, config=config)
+    try:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(entry, default=str))
+        os.replace(tmp, file)
+    except OSError:
+        logger.debug("Could not write config cache %s", file, exc_info=True)
+
+
+def fetch_from_zk(zk_path: str) -> dict[str, Any]:
+    "Query ZooKeeper and update the cache. Raises `ConnectionError` if ZK is unreachable."
+    import np_config
+
+    config = np_config.from_zk(zk_path)
+    write_cache(zk_path, config)
+    return config
+
+
+def refresh_in_background(zk_path: str) -> threading.Thread:
+    "Update the cache from ZooKeeper on a daemon thread, once per process."
+
+    def refresh():
+        try:
+            fetch_from_zk(zk_path)
+        except Exception:
+            logger.debug("Could not fetch %s from ZooKeeper", zk_path, exc_info=True)
+
+    with _lock:
+        if zk_path not in _background_refreshes:
+            thread = threading.Thread(
+                target=refresh, name=f"np_logging config refresh {zk_path}", daemon=True
+            )
+            thread.start()
+            _background_refreshes[zk_path] = thread
+        return _background_refreshes[zk_path]
+
+
+def local_file(name: str) -> Any:
+    "Path to a config file packaged with np_logging."
+    import importlib_resources
+
+    return importlib_resources.files("np_logging") / name
+
+
+def load(zk_path: str, local_path: Any) -> dict[str, Any]:
+    """Cached copy of ZK config if available, otherwise local copy. Never waits on ZK.
+
+    `local_path` may be the name of a file packaged with np_logging.
+    """
+    # import here, not first on the refresh thread: `load` may be called from a handler
+    # built by `dictConfig`, holding `logging`'s lock, which `kazoo` needs at import
+    import np_config
+
+    entry = read_cache(zk_path)
+    if entry is None or time.time() - entry["fetched"] > CACHE_TTL:
+        refresh_in_background(zk_path)
+    if entry is not None:
+        return entry["config"]
     logger.debug(
-        "Could not connect to ZooKeeper. Using local copy of default logging config: %s",
-        LOCAL_DEFAULT_LOGGING_CONFIG,
+        "No cached copy of %s from ZooKeeper. Using local copy: %s", zk_path, local_path
     )
-    config = np_config.from_file(LOCAL_DEFAULT_LOGGING_CONFIG)
-except Exception:
-    raise
+    if isinstance(local_path, str) and local_path in LOCAL_FILES.values():
+        local_path = local_file(local_path)
+    return np_config.from_file(local_path)
+
+
+def get(name: str) -> dict[str, Any]:
+    "Load config by module attribute name on first use, e.g. `get('PKG_CONFIG')`."
+    with _lock:
+        if name not in _configs:
+            _configs[name] = load(*SOURCES[name])
+        return _configs[name]
+
+
+def refresh() -> None:
+    """Fetch configs from ZooKeeper now and update the cache.
+
+    Configs that were already loaded are updated in-place. Raises `ConnectionError`
+    if ZK is unreachable.
+    """
+    for name, (zk_path, _) in SOURCES.items():
+        config = fetch_from_zk(zk_path)
+        with _lock:
+            if name in _configs:
+                _configs[name].clear()
+                _configs[name].update(config)
+            else:
+                _configs[name] = config
+
+
+def __getattr__(name: str) -> Any:
+    if name in SOURCES:
+        return get(name)
+    if name in LOCAL_FILES:
+        return local_file(LOCAL_FILES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-DEFAULT_LOGGING_CONFIG: dict[str, Any] = config
+PKG_CONFIG: dict[str, Any]
+DEFAULT_LOGGING_CONFIG: dict[str, Any]
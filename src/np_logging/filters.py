@@ -0,0 +1,361 @@
+"""
+Filters for noisy callsites, e.g. logging inside per-frame callbacks in an
+acquisition loop.
+
+`RateLimitFilter` passes at most `rate` records per second from each callsite
+(`pathname:lineno`) or each logger, allowing bursts of up to `burst` records, and
+optionally only 1 in every `sample` records. Records at `bypass_level` and above
+always pass. When records from a callsite pass again after some were suppressed, a
+summary is logged first, e.g. "suppressed 4,213 records from acq.py:88 in 12.0 s".
+
+Filters can be added in the logging config used by `np_logging.setup()`:
+
+    filters:
+      rate_limit:
+        (): np_logging.filters.RateLimitFilter
+        rate: 10
+        burst: 50
+    handlers:
+      console_handler:
+        (): np_logging.handlers.ConsoleHandler
+        filters: [rate_limit]
+
+`CoalesceFilter` passes the first of a run of consecutive duplicate records (same
+logger, level, msg and args) and replaces the rest with a single record carrying
+their count and first/last timestamps, e.g. "Camera poll failed [repeated 4,213
+times from 10:02:11 to 10:09:40]". `np_logging.setup(coalesce=True)` adds one to
+every configured handler.
+
+A filter shared by several handlers makes one decision per record, so each
+handler passes or suppresses the same records. Summaries are handled directly by
+the handlers the filter was added to that the summarized records reached - not
+those on unrelated loggers - rather than through loggers, so each of them gets a
+summary once, before the record that ended the suppression, and in queued mode
+summaries aren't queued again from the listener thread. Summaries still pending
+are logged at exit, or by `summarize()`.
+"""
+from __future__ import annotations
+
+import datetime
+import logging
+import threading
+import time
+import weakref
+from typing import Hashable, Iterable, Optional
+
+import np_logging.listener
+
+COALESCE_INTERVAL = 30.0
+"Maximum seconds a run of duplicate records is held before its summary is logged."
+
+_filters: weakref.WeakSet[RateLimitFilter | CoalesceFilter] = weakref.WeakSet()
+
+
+def owners(_filter: logging.Filter) -> list[logging.Handler]:
+    "Handlers `_filter` has been added to."
+    handlers = (ref() for ref in list(logging._handlerList))
+    return [h for h in handlers if h is not None and _filter in h.filters]
+
+
+def reached(name: str) -> list[logging.Handler]:
+    "Handlers that records from logger `name` are passed to, whether queued or not."
+    handlers = []
+    _logger = logging.getLogger(None if name == "root" else name)
+    while _logger is not None:
+        handlers.extend(np_logging.listener.sinks(_logger))
+        _logger = _logger.parent if _logger.propagate else None
+    return list(dict.fromkeys(handlers))
+
+
+def emit_summary(_filter: logging.Filter, summary: logging.LogRecord) -> None:
+    """Pass a summary from `_filter` to the handlers it's on that its logger's records
+    reach, or to its logger if the filter is on no handlers."""
+    handlers = [h for h in reached(summary.name) if _filter in h.filters]
+    if not handlers and not owners(_filter):  # added to a logger instead
+        logging.getLogger(summary.name).handle(summary)
+    for handler in handlers:
+        if summary.levelno >= handler.level:
+            handler.handle(summary)
+
+
+def is_summary(record: logging.LogRecord) -> bool:
+    "Whether `record` was logged by a filter in place of records it held back."
+    return "suppressed" in record.__dict__ or "repeated" in record.__dict__
+
+
+class Bucket:
+    "Token bucket and suppression count for one callsite or logger."
+
+    __slots__ = ("tokens", "updated", "seen", "suppressed", "since", "level", "record", "passed")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.seen = 0
+        self.suppressed = 0
+        self.since = now
+        self.level = logging.NOTSET
+        self.record: Optional[logging.LogRecord] = None
+        "Last record filtered, and whether it `passed`: for filters shared by handlers."
+        self.passed = True
+
+
+class RateLimitFilter(logging.Filter):
+    """Token-bucket rate limit per callsite (`per='callsite'`) or per logger
+    (`per='logger'`), with optional 1-in-`sample` sampling: see `np_logging.filters`.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 50,
+        sample: int = 1,
+        per: str = "callsite",
+        bypass_level: int | str = logging.WARNING,
+        name: str = "",
+    ):
+        super().__init__(name)
+        if per not in ("callsite", "logger"):
+            raise ValueError(f"per must be 'callsite' or 'logger', not {per!r}")
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.sample = max(1, int(sample))
+        self.per = per
+        if isinstance(bypass_level, str):
+            bypass_level = logging.getLevelName(bypass_level.upper())
+        self.bypass_level = bypass_level
+        self.clock = time.monotonic
+        self.buckets: dict[Hashable, Bucket] = {}
+        self.lock = threading.Lock()
+        _filters.add(self)
+
+    def key(self, record: logging.LogRecord) -> Hashable:
+        if self.per == "logger":
+            return record.name
+        return (record.pathname, record.lineno)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.bypass_level or is_summary(record):
+            return super().filter(record)
+        key = self.key(record)
+        summary = None
+        with self.lock:
+            now = self.clock()
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = Bucket(self.burst, now)
+            elif bucket.record is record:  # already decided for another handler
+                return bucket.passed
+            bucket.record = record
+            bucket.tokens = min(
+                self.burst, bucket.tokens + (now - bucket.updated) * self.rate
+            )
+            bucket.updated = now
+            bucket.seen += 1
+            passed = (bucket.seen - 1) % self.sample == 0 and bucket.tokens >= 1
+            if passed:
+                bucket.tokens -= 1
+                if bucket.suppressed:
+                    summary = self.take_summary(bucket, record, now)
+            else:
+                if not bucket.suppressed:
+                    bucket.since = now
+                bucket.suppressed += 1
+                bucket.level = max(bucket.level, record.levelno)
+            bucket.passed = passed
+        if summary is not None:
+            emit_summary(self, summary)
+        return passed and super().filter(record)
+
+    def take_summary(
+        self, bucket: Bucket, record: logging.LogRecord, now: float
+    ) -> logging.LogRecord:
+        "Record reporting `bucket`'s suppressed records, resetting its count. Call with `lock` held."
+        where = (
+            f"logger {record.name!r}"
+            if self.per == "logger"
+            else f"{record.filename}:{record.lineno}"
+        )
+        summary = logging.getLogger(record.name).makeRecord(
+            record.name,
+            bucket.level,
+            record.pathname,
+            record.lineno,
+            "suppressed %s records from %s in %.1f s",
+            (f"{bucket.suppressed:,}", where, now - bucket.since),
+            None,
+            record.funcName,
+            extra={"suppressed": bucket.suppressed},
+        )
+        bucket.suppressed = 0
+        bucket.level = logging.NOTSET
+        return summary
+
+    def summarize(self) -> None:
+        "Log summaries of records suppressed since the last record that passed."
+        summaries = []
+        with self.lock:
+            now = self.clock()
+            for bucket in self.buckets.values():
+                if bucket.suppressed and bucket.record is not None:
+                    summaries.append(self.take_summary(bucket, bucket.record, now))
+        for summary in summaries:
+            emit_summary(self, summary)
+
+
+class CoalesceFilter(logging.Filter):
+    """Replaces consecutive duplicates of a record with one summary record: see
+    `np_logging.filters`.
+
+    The summary is logged when a different record arrives, or at most `interval`
+    seconds after the first duplicate. Records with exception info are never
+    coalesced.
+    """
+
+    def __init__(self, interval: float = COALESCE_INTERVAL, name: str = ""):
+        super().__init__(name)
+        self.interval = interval
+        self.last: Optional[logging.LogRecord] = None
+        "Last record passed: the one duplicates are compared with."
+        self.repeated = 0
+        self.first_created = self.last_created = 0.0
+        self.record: Optional[logging.LogRecord] = None
+        "Last record filtered, and whether it `passed`: for filters shared by handlers."
+        self.passed = True
+        self.lock = threading.Lock()
+        _filters.add(self)
+        start_timer()
+
+    @staticmethod
+    def duplicate(record: logging.LogRecord, last: logging.LogRecord) -> bool:
+        try:
+            return (
+                record.exc_info is None
+                and record.msg == last.msg
+                and record.levelno == last.levelno
+                and record.name == last.name
+                and record.args == last.args
+            )
+        except Exception:  # args that can't be compared
+            return False
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if is_summary(record):
+            return super().filter(record)
+        summary = None
+        with self.lock:
+            if record is self.record:  # already decided for another handler
+                return self.passed
+            self.record = record
+            passed = self.last is None or not self.duplicate(record, self.last)
+            if passed:
+                summary = self.take_summary()
+                self.last = record
+            else:
+                if not self.repeated:
+                    self.first_created = record.created
+                    _wake.set()  # timer to summarize the run after `interval`
+                self.repeated += 1
+                self.last_created = record.created
+            self.passed = passed
+        if summary is not None:
+            emit_summary(self, summary)
+        return passed and super().filter(record)
+
+    def take_summary(self) -> Optional[logging.LogRecord]:
+        "Record reporting duplicates held back, if any, resetting the count. Call with `lock` held."
+        if not self.repeated:
+            return None
+        last = self.last
+        summary = logging.getLogger(last.name).makeRecord(
+            last.name,
+            last.levelno,
+            last.pathname,
+            last.lineno,
+            "%s [repeated %s times from %s to %s]",
+            (
+                last.getMessage(),
+                f"{self.repeated:,}",
+                datetime.datetime.fromtimestamp(self.first_created).strftime("%H:%M:%S"),
+                datetime.datetime.fromtimestamp(self.last_created).strftime("%H:%M:%S"),
+            ),
+            None,
+            last.funcName,
+            extra=dict(
+                repeated=self.repeated,
+                first_created=self.first_created,
+                last_created=self.last_created,
+            ),
+        )
+        self.repeated = 0
+        return summary
+
+    def summarize(self) -> None:
+        "Log a summary of duplicates held back since the last record passed."
+        with self.lock:
+            summary = self.take_summary()
+        if summary is not None:
+            emit_summary(self, summary)
+
+    def summarize_due(self, now: float) -> Optional[float]:
+        """Log a summary of duplicates held back for `interval` or more by `now`.
+        Returns when the current run is due, if it isn't yet."""
+        with self.lock:
+            if not self.repeated:
+                return None
+            due = self.first_created + self.interval
+            if due > now:
+                return due
+            summary = self.take_summary()
+        emit_summary(self, summary)
+        return None
+
+
+_wake = threading.Event()
+"Set when a `CoalesceFilter` starts holding back duplicates."
+_timer: Optional[threading.Thread] = None
+_timer_lock = threading.Lock()
+
+
+def start_timer() -> None:
+    "Start the thread that logs summaries of runs held back for their `interval`."
+    global _timer
+    with _timer_lock:
+        if _timer is None:
+            _timer = threading.Thread(
+                target=_summarize_due, name="np_logging coalesce timer", daemon=True
+            )
+            _timer.start()
+
+
+def _summarize_due() -> None:
+    while True:
+        now = time.time()
+        dues = [
+            _filter.summarize_due(now)
+            for _filter in list(_filters)
+            if isinstance(_filter, CoalesceFilter)
+        ]
+        timeout = min((_ - now for _ in dues if _ is not None), default=None)
+        _wake.wait(timeout)
+        _wake.clear()
+
+
+def coalesce(
+    loggers: Iterable[logging.Logger], interval: float = COALESCE_INTERVAL
+) -> CoalesceFilter:
+    "Add one `CoalesceFilter` to all handlers of `loggers`, replacing any already added."
+    coalesce_filter = CoalesceFilter(interval)
+    for _logger in loggers:
+        for handler in _logger.handlers:
+            for _filter in [_ for _ in handler.filters if isinstance(_, CoalesceFilter)]:
+                _filter.summarize()
+                handler.removeFilter(_filter)
+            handler.addFilter(coalesce_filter)
+    return coalesce_filter
+
+
+def summarize() -> None:
+    "Log pending summaries from every `RateLimitFilter` and `CoalesceFilter`: called at exit."
+    for _filter in list(_filters):
+        _filter.summarize()
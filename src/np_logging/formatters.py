@@ -0,0 +1,222 @@
+"""
+Formatter for the formats in the package config, which each record usually passes
+through several times (console, info & debug files, server backup).
+
+`CachedFormatter` output is identical to `logging.Formatter`, but per record it:
+- formats `asctime` with `time.strftime` once per second, not once per record
+- renders `%`-style format strings with a function compiled from the format, instead
+  of interpolating over the record's `__dict__`
+- reuses `record.message` from the previous formatter in the same thread, if it
+  formatted the same record, instead of calling `record.getMessage()` again
+
+    >>> import logging
+    >>> formatter = CachedFormatter("%(levelname)-7s %(name)s:%(lineno)d | %(message)s")
+    >>> record = logging.makeLogRecord(
+    ...     {'msg': '%d%%', 'args': (99,), 'levelname': 'INFO', 'name': 'np', 'lineno': 1}
+    ... )
+    >>> formatter.format(record) == logging.Formatter(formatter._fmt).format(record)
+    True
+    >>> formatter.format(record)
+    'INFO    np:1 | 99%'
+
+`JSONFormatter` writes each record as one line of compact JSON, with the record
+factory's fields, for reading without parsing text (see `np_logging.parsing`):
+    >>> print(JSONFormatter(fields=('name', 'levelname', 'msg')).format(record))
+    {"name":"np","levelname":"INFO","msg":"99%"}
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import threading
+import time
+import weakref
+from typing import Any, Callable, Optional
+
+FIELD = re.compile(r"%\((?P<key>\w+)\)(?P<spec>[#0+ -]*\d*(?:\.\d+)?[diouxXeEfFgGcrsa])|%%")
+
+JSON_FIELDS = (
+    "created",
+    "name",
+    "levelname",
+    "levelno",
+    "filename",
+    "lineno",
+    "funcName",
+    "threadName",
+    "process",
+    "project",
+    "rig_name",
+    "comp_id",
+    "msg",
+)
+"Record attributes written by `JSONFormatter`: `msg` is the formatted message."
+
+_encode_str = json.encoder.encode_basestring
+_dumps = json.JSONEncoder(
+    ensure_ascii=False, separators=(",", ":"), allow_nan=False, default=str
+).encode
+
+_last = threading.local()
+"Last record whose message was formatted in this thread: `[ref(record), msg, args, message]`."
+
+
+def compile_format(fmt: str) -> Optional[Callable[[dict[str, Any]], str]]:
+    """Function equivalent to `lambda d: fmt % d`, for a `%`-style format with only
+    named fields, or `None` if the format can't be compiled."""
+    if "%" in FIELD.sub("", fmt):
+        return None  # unnamed or malformed conversions: leave to `logging`
+    namespace: dict[str, Any] = {}
+
+    def constant(value: str) -> str:
+        name = f"c{len(namespace)}"
+        namespace[name] = value
+        return name
+
+    parts = []
+    position = 0
+    for match in FIELD.finditer(fmt):
+        literal = fmt[position : match.start()] + ("%" if match.group() == "%%" else "")
+        position = match.end()
+        if literal:
+            parts.append(f"{{{constant(literal)}}}")
+        key, spec = match.group("key", "spec")
+        if key is None:
+            continue
+        if spec == "s":
+            parts.append(f"{{d[{key!r}]!s}}")
+        else:  # keep %-conversion semantics, e.g. %d of a float
+            parts.append(f"{{{constant('%' + spec)} % (d[{key!r}],)}}")
+    if fmt[position:]:
+        parts.append(f"{{{constant(fmt[position:])}}}")
+    return eval(f"lambda d: f{''.join(parts)!r}", namespace)
+
+
+def encode_value(value: Any) -> str:
+    """JSON for `value`, with a fast path for the types of common record attributes.
+
+    Always valid JSON: a NaN or infinite float is `null`, and a container holding one
+    is encoded as its `str()`.
+    """
+    cls = value.__class__
+    if cls is str:
+        return _encode_str(value)
+    if cls is int:
+        return repr(value)
+    if cls is float:
+        return repr(value) if math.isfinite(value) else "null"
+    if value is None:
+        return "null"
+    try:
+        return _dumps(value)
+    except ValueError:  # non-finite floats, or circular references
+        return _encode_str(str(value))
+
+
+def compile_json(fields: tuple[str, ...]) -> Callable[[dict[str, Any]], str]:
+    """Function returning the JSON object of `fields` from a record's `__dict__`,
+    without the closing brace. `msg` is read from `message`."""
+    namespace: dict[str, Any] = {"encode": encode_value}
+    items = []
+    for i, key in enumerate(fields):
+        namespace[f"k{i}"] = "message" if key == "msg" else key
+        items.append(f'"{key}":{{encode(d.get(k{i}))}}')
+    return eval(f"lambda d: f{'{{' + ','.join(items)!r}", namespace)
+
+
+def get_message(record: logging.LogRecord) -> str:
+    "`record.getMessage()`, reusing the result of the last call in this thread."
+    last = getattr(_last, "record", None)
+    if (
+        last
+        and last[0]() is record
+        and last[1] is record.msg
+        and last[2] is record.args
+    ):
+        return last[3]
+    message = record.getMessage()
+    # weakly referenced, and emptied when the record is freed: the cache mustn't
+    # keep records, their args or tracebacks alive
+    entry: list[Any] = []
+    entry += (weakref.ref(record, lambda _: entry.clear()), record.msg, record.args, message)
+    _last.record = entry
+    return message
+
+
+class CachedFormatter(logging.Formatter):
+    "`logging.Formatter` with cached timestamps and a compiled format: see `np_logging.formatters`."
+
+    def __init__(
+        self,
+        fmt: Optional[str] = None,
+        datefmt: Optional[str] = None,
+        style: str = "%",
+        **kwargs,
+    ):
+        super().__init__(fmt, datefmt, style, **kwargs)
+        self.uses_time = self.usesTime()
+        self.render = compile_format(self._fmt) if style == "%" else None
+        self.time_cache: tuple[tuple[int, Optional[str]], str] = ((-1, None), "")
+        "`((second, datefmt), asctime)`, without msecs, for the last second formatted."
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        if datefmt != self.datefmt:
+            return super().formatTime(record, datefmt)
+        key = (int(record.created), datefmt)
+        cached_key, formatted = self.time_cache
+        if key != cached_key:
+            formatted = time.strftime(
+                datefmt or self.default_time_format, self.converter(record.created)
+            )
+            self.time_cache = (key, formatted)
+        if datefmt or not self.default_msec_format:
+            return formatted
+        return self.default_msec_format % (formatted, record.msecs)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        if self.render is None:
+            return super().formatMessage(record)
+        try:
+            return self.render(record.__dict__)
+        except (KeyError, TypeError, ValueError):  # let `logging` raise its usual error
+            return super().formatMessage(record)
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.message = get_message(record)
+        if self.uses_time:
+            record.asctime = self.formatTime(record, self.datefmt)
+        s = self.formatMessage(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + record.exc_text
+        if record.stack_info:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + self.formatStack(record.stack_info)
+        return s
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one line of JSON each: `fields` (default `JSON_FIELDS`),
+    then `exc_text` and `stack_info` if the record has them."""
+
+    def __init__(self, fields: Optional[tuple[str, ...]] = None, **kwargs):
+        super().__init__()
+        self.fields = tuple(fields or JSON_FIELDS)
+        self.render = compile_json(self.fields)
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.message = get_message(record)
+        s = self.render(record.__dict__)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            s += ',"exc_text":' + _encode_str(record.exc_text)
+        if record.stack_info:
+            s += ',"stack_info":' + _encode_str(self.formatStack(record.stack_info))
+        return s + "}"
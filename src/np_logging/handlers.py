@@ -6,9 +6,14 @@ Can be specified in logging config dict:
     info_file_handler:
         (): np_logging.handlers.FileHandler
         level: INFO
+
+Arguments left as `None` default to the handler's settings in the package config,
+which is loaded when the first handler is built, not on import.
 """
 from __future__ import annotations
 
+import atexit
+import collections
 import contextlib
 import logging
 import logging.handlers
@@ -16,142 +21,786 @@ import os
 import pathlib
 import platform
 import sys
+import threading
+import time
+import weakref
 from typing import Any, Callable, Optional
 
 import np_logging.config
+import np_logging.formatters
+import np_logging.metrics
+import np_logging.rotation
+import np_logging.spool
+import np_logging.wire
+
+HANDLER_CONFIGS = {
+    "SERVER_BACKUP": "log_server_file_backup",
+    "SERVER": "log_server",
+    "CONSOLE": "console",
+    "FILE": "file",
+    "EMAIL": "email",
+}
+"Module attributes for each handler's settings in the package config."
 
-PKG_CONFIG = np_logging.config.PKG_CONFIG
+_formats: dict[str, logging.Formatter] = {}
+_formats_lock = threading.Lock()
 
-SERVER_BACKUP: dict[str, Any] = PKG_CONFIG["handlers"]["log_server_file_backup"]
-SERVER: dict[str, Any] = PKG_CONFIG["handlers"]["log_server"]
-CONSOLE: dict[str, Any] = PKG_CONFIG["handlers"]["console"]
-FILE: dict[str, Any] = PKG_CONFIG["handlers"]["file"]
-EMAIL: dict[str, Any] = PKG_CONFIG["handlers"]["email"]
 
-FORMAT: dict[str, logging.Formatter] = {
-    k: logging.Formatter(**v) for k, v in PKG_CONFIG["formatters"].items()
-}
+def handler_config(name: str) -> dict[str, Any]:
+    "Settings for a handler in the package config, e.g. `handler_config('file')`."
+    return np_logging.config.PKG_CONFIG["handlers"][name]
+
+
+def formats() -> dict[str, logging.Formatter]:
+    "Formatters for the formats in the package config, built on first use."
+    with _formats_lock:
+        if not _formats:
+            _formats.update(
+                (k, np_logging.formatters.CachedFormatter(**v))
+                for k, v in np_logging.config.PKG_CONFIG["formatters"].items()
+            )
+        return _formats
+
+
+def file_formatter(
+    config: dict[str, Any], formatter: Optional[logging.Formatter], json_lines: bool
+) -> logging.Formatter:
+    "`formatter`, or the default for a file handler with settings `config`."
+    if formatter is not None:
+        return formatter
+    if json_lines:
+        return np_logging.formatters.JSONFormatter()
+    return formats()[config["formatter"]]
 
 
-def setup_record_factory(project_name: str) -> Callable:
-    "Make log records compatible with eng-mindscope log server."
-    log_factory = logging.getLogRecordFactory()
+def default_project_name() -> str:
+    return pathlib.Path.cwd().name
 
-    def record_factory(*args, **kwargs) -> logging.LogRecord:
-        record = log_factory(*args, **kwargs)
-        record.project = project_name
-        record.comp_id = os.getenv("aibs_comp_id", None)
-        record.rig_name = record.hostname = platform.node()
-        record.version = None
+
+def __getattr__(name: str) -> Any:
+    "`PKG_CONFIG`, `FORMAT` and handler settings, e.g. `FILE`, loaded on first access."
+    if name == "PKG_CONFIG":
+        return np_logging.config.PKG_CONFIG
+    if name == "FORMAT":
+        return formats()
+    if name in HANDLER_CONFIGS:
+        return handler_config(HANDLER_CONFIGS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class RecordFactory:
+    """Adds the fields expected by the eng-mindscope log server to each record.
+
+    Fields are resolved once, not per record: call `refresh()` to resolve them again.
+    """
+
+    def __init__(self, base: Callable[..., logging.LogRecord], project_name: str):
+        self.base = base
+        self.project_name = project_name
+        self.refresh()
+
+    def refresh(self) -> None:
+        hostname = platform.node()
+        self.fields = dict(
+            project=self.project_name,
+            comp_id=os.getenv("aibs_comp_id", None),
+            rig_name=hostname,
+            hostname=hostname,
+            version=None,
+        )
+
+    def set_project_name(self, project_name: str) -> None:
+        self.project_name = project_name
+        self.fields = {**self.fields, "project": project_name}
+
+    def __call__(self, *args, **kwargs) -> logging.LogRecord:
+        record = self.base(*args, **kwargs)
+        record.__dict__.update(self.fields)
         return record
 
-    logging.setLogRecordFactory(record_factory)
-    return record_factory
+
+def setup_record_factory(project_name: str, refresh: bool = False) -> RecordFactory:
+    """Make log records compatible with eng-mindscope log server.
+
+    Repeated calls update the installed factory's project name instead of wrapping it
+    again. With `refresh=True`, hostname and comp_id are also resolved again.
+    """
+    factory = logging.getLogRecordFactory()
+    if isinstance(factory, RecordFactory):
+        factory.set_project_name(project_name)
+        if refresh:
+            factory.refresh()
+        return factory
+    factory = RecordFactory(factory, project_name)
+    logging.setLogRecordFactory(factory)
+    return factory
 
 
-class ServerBackupHandler(logging.handlers.RotatingFileHandler):
+class ServerBackupHandler(
+    np_logging.rotation.SegmentRotationMixin, logging.handlers.RotatingFileHandler
+):
+    """`rotation` sets the naming scheme for backups, and `compression` whether they're
+    compressed in the background: see `np_logging.rotation`.
+
+    With `json_lines`, and no `formatter`, records are written as JSON: see
+    `np_logging.formatters.JSONFormatter`.
+    """
+
     def __init__(
         self,
-        filename: str = SERVER_BACKUP["backup_filepath"],
-        mode: str = SERVER_BACKUP["mode"],
-        maxBytes: int = SERVER_BACKUP["maxBytes"],
-        backupCount: int = SERVER_BACKUP["backupCount"],
-        encoding: str = SERVER_BACKUP["encoding"],
-        delay: bool = SERVER_BACKUP["delay"],
-        formatter: logging.Formatter = FORMAT[SERVER_BACKUP["formatter"]],
+        filename: Optional[str] = None,
+        mode: Optional[str] = None,
+        maxBytes: Optional[int] = None,
+        backupCount: Optional[int] = None,
+        encoding: Optional[str] = None,
+        delay: Optional[bool] = None,
+        formatter: Optional[logging.Formatter] = None,
+        rotation: Optional[str] = None,
+        compression: Optional[str] = None,
+        json_lines: Optional[bool] = None,
         **kwargs,
     ):
+        config = handler_config("log_server_file_backup")
+        filename = config["backup_filepath"] if filename is None else filename
+        mode = config["mode"] if mode is None else mode
+        maxBytes = config["maxBytes"] if maxBytes is None else maxBytes
+        backupCount = config["backupCount"] if backupCount is None else backupCount
+        encoding = config["encoding"] if encoding is None else encoding
+        delay = config["delay"] if delay is None else delay
+        json_lines = config.get("json_lines", False) if json_lines is None else json_lines
+        formatter = file_formatter(config, formatter, json_lines)
+        rotation = config.get("rotation", "classic") if rotation is None else rotation
+        compression = config.get("compression") if compression is None else compression
         super().__init__(filename, mode, maxBytes, backupCount, encoding, delay)
+        self.init_rotation(rotation, compression)
         self.setLevel(logging.NOTSET)
         self.setFormatter(formatter)
+        np_logging.metrics.register(self)
 
-    def emit(self, record):
-        with contextlib.suppress(OSError):
-            super().emit(record)
+    def handleError(self, record):
+        """Write errors, e.g. while the share is unreachable, aren't printed: they're
+        counted in `np_logging.stats()` when metrics are enabled."""
+        if isinstance(sys.exc_info()[1], OSError):
+            return
+        super().handleError(record)
 
 
 class ServerHandler(logging.handlers.SocketHandler):
+    """Sends records to the eng-mindscope log server, and to a backup file.
+
+    With `spool`, records are instead written to a local store-and-forward spool
+    (see `np_logging.spool`) and sent on a background thread, with no backup file:
+    `spool=True` uses a directory in `logs/spool`.
+    """
+
     def __init__(
         self,
-        project_name: str = pathlib.Path.cwd().name,
-        host: str = SERVER["host"],
-        port: int = SERVER["port"],
-        formatter: logging.Formatter = FORMAT[SERVER["formatter"]],
-        level: int = SERVER["level"],
+        project_name: Optional[str] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        formatter: Optional[logging.Formatter] = None,
+        level: Optional[int] = None,
         backup: logging.Handler = None,
+        spool: bool | str | pathlib.Path = False,
         **kwargs,
     ):
+        config = handler_config("log_server")
+        project_name = project_name or default_project_name()
+        host = config["host"] if host is None else host
+        port = config["port"] if port is None else port
+        formatter = formats()[config["formatter"]] if formatter is None else formatter
+        level = config["level"] if level is None else level
         super().__init__(host, port)
         self.setLevel(level)
         self.setFormatter(formatter)
         setup_record_factory(project_name)
-        if backup is None:
+        self.backup = backup
+        if backup is None and not spool:
             with contextlib.suppress(Exception):
-                backup = ServerBackupHandler()
-                self.backup = backup
+                self.backup = ServerBackupHandler()
+        self.spool: Optional[np_logging.spool.Spool] = None
+        if spool:
+            if spool is True:
+                spool = pathlib.Path(handler_config("file")["logs_dir"]).resolve() / "spool"
+                spool /= f"{host}_{port}"
+            self.spool = np_logging.spool.Spool.first_available(spool)
+            self.forwarder = np_logging.spool.SpoolForwarder(self.spool, host, port)
+            self.forwarder.start()
+        np_logging.metrics.register(self)
 
     def emit(self, record):
-        super().emit(record)
-        with contextlib.suppress(Exception):
-            self.backup.emit(record)
+        if self.spool is not None:
+            try:
+                self.spool.append(self.makePickle(record))
+            except Exception:
+                self.handleError(record)
+        else:
+            super().emit(record)
+        self.emit_backup(record)
+
+    def close(self, drain_timeout: float = 2.0):
+        "With a spool, waits up to `drain_timeout` seconds for records to be sent."
+        if self.spool is not None:
+            if self.forwarder.is_alive():
+                self.forwarder.drain(drain_timeout)
+                self.forwarder.stop()
+            self.spool.close()
+        super().close()
+
+    def emit_backup(self, record):
+        if self.backup is not None:
+            try:
+                self.backup.handle(record)
+            except Exception:
+                np_logging.metrics.count(self.backup)
+
+
+class BatchServerHandler(ServerHandler):
+    """`ServerHandler` that sends records in batches, with one socket write per
+    `batch_size` records, `batch_bytes` bytes or `batch_interval` seconds -
+    whichever is reached first.
+
+    Batches are readable by any receiver of `logging.handlers.SocketHandler` frames,
+    unless `compress=True`, which requires an np_logging receiver
+    (see `np_logging.wire`).
+    """
+
+    def __init__(
+        self,
+        project_name: Optional[str] = None,
+        batch_size: int = 1000,
+        batch_bytes: int = 1 << 20,
+        batch_interval: float = 0.1,
+        compress: bool = False,
+        **kwargs,
+    ):
+        super().__init__(project_name, **kwargs)
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.batch_interval = batch_interval
+        self.compress = compress
+        self.frames: list[bytes] = []
+        self.nbytes = 0
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name=f"{self} flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.batch_interval):
+            self.flush()
+
+    def emit(self, record):
+        if self.spool is not None:  # forwarder sends in batches
+            return super().emit(record)
+        try:
+            frame = self.makePickle(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self.frames.append(frame)
+        self.nbytes += len(frame)
+        if len(self.frames) >= self.batch_size or self.nbytes >= self.batch_bytes:
+            self.flush()
+        self.emit_backup(record)
+
+    def flush(self):
+        with self.lock:
+            if not self.frames:
+                return
+            data = b"".join(self.frames)
+            self.frames.clear()
+            self.nbytes = 0
+            if self.compress:
+                data = np_logging.wire.compress(data)
+            self.send(data)
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+        super().close()
 
 
 class EmailHandler(logging.handlers.SMTPHandler):
     def __init__(
         self,
         toaddrs: str | list[str],
-        project_name: str = pathlib.Path.cwd().name,
-        mailhost: str | tuple[str, int] = EMAIL["mailhost"],
-        fromaddr: str = EMAIL["fromaddr"],
-        subject: str = EMAIL["subject"],
-        credentials: Optional[tuple[str, str]] = EMAIL["credentials"],
-        secure=EMAIL["secure"],
-        timeout: float = EMAIL["timeout"],
-        formatter: logging.Formatter = FORMAT[EMAIL["formatter"]],
-        level: int = EMAIL["level"],
+        project_name: Optional[str] = None,
+        mailhost: Optional[str | tuple[str, int]] = None,
+        fromaddr: Optional[str] = None,
+        subject: Optional[str] = None,
+        credentials: Optional[tuple[str, str]] = None,
+        secure=None,
+        timeout: Optional[float] = None,
+        formatter: Optional[logging.Formatter] = None,
+        level: Optional[int] = None,
         **kwargs,
     ):
+        config = handler_config("email")
+        project_name = project_name or default_project_name()
+        mailhost = config["mailhost"] if mailhost is None else mailhost
+        fromaddr = config["fromaddr"] if fromaddr is None else fromaddr
+        subject = config["subject"] if subject is None else subject
+        credentials = config["credentials"] if credentials is None else credentials
+        secure = config["secure"] if secure is None else secure
+        timeout = config["timeout"] if timeout is None else timeout
+        formatter = formats()[config["formatter"]] if formatter is None else formatter
+        level = config["level"] if level is None else level
         super().__init__(
             mailhost, fromaddr, toaddrs, subject, credentials, secure, timeout
         )
         self.setLevel(level)
         self.setFormatter(formatter)
         setup_record_factory(project_name)
+        np_logging.metrics.register(self)
+
+
+_digest_last_sent: dict[str, float] = {}
+"Time each subject was last sent by a `DigestEmailHandler`, shared between handlers."
+_digest_lock = threading.Lock()
+
+
+class DigestEmailHandler(EmailHandler):
+    """`EmailHandler` that collects records for `window` seconds and sends them as
+    one email, from a background thread.
+
+    - identical messages in a digest are sent once, with a count
+    - emails with the same subject are sent at most once per `min_interval` seconds:
+      records arriving sooner wait for the next digest
+    - the SMTP connection is kept open between digests, and closed after
+      `idle_timeout` seconds unused
+
+    `flush()` sends collected records immediately, regardless of `min_interval`.
+    """
+
+    def __init__(
+        self,
+        toaddrs: str | list[str],
+        project_name: Optional[str] = None,
+        window: float = 60.0,
+        min_interval: float = 300.0,
+        idle_timeout: float = 60.0,
+        **kwargs,
+    ):
+        super().__init__(toaddrs, project_name, **kwargs)
+        self.window = window
+        self.min_interval = min_interval
+        self.idle_timeout = idle_timeout
+        self.pending: dict[str, list] = {}
+        "Formatted message -> [count, first record], in order received."
+        self.started: Optional[float] = None
+        "When the first pending record was received."
+        self.smtp = None
+        self.smtp_last_used = 0.0
+        self.smtp_lock = threading.Lock()
+        self.sent = 0
+        "Number of emails sent."
+        self._closed = False
+        self._condition = threading.Condition()
+        self._sender = threading.Thread(
+            target=self._send_periodically, name=f"{self} sender", daemon=True
+        )
+        self._sender.start()
+
+    def emit(self, record):
+        try:
+            msg = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._condition:
+            if msg in self.pending:
+                self.pending[msg][0] += 1
+                return
+            self.pending[msg] = [1, record]
+            if self.started is None:
+                self.started = time.monotonic()
+                self._condition.notify()
+
+    def due(self) -> Optional[float]:
+        "When pending records can be sent (monotonic clock), or `None` if none pending."
+        if self.started is None:
+            return None
+        with _digest_lock:
+            last_sent = _digest_last_sent.get(self.subject, -self.min_interval)
+        return max(self.started + self.window, last_sent + self.min_interval)
+
+    def take_pending(self) -> list[tuple[str, list]]:
+        "Call with `_condition` held."
+        entries = list(self.pending.items())
+        self.pending.clear()
+        self.started = None
+        return entries
+
+    def _send_periodically(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    due = self.due()
+                    now = time.monotonic()
+                    if due is not None and now >= due:
+                        break
+                    if due is None and self.smtp is not None:
+                        idle_until = self.smtp_last_used + self.idle_timeout
+                        if now >= idle_until:
+                            with self.smtp_lock:
+                                self.close_connection()
+                            continue
+                        due = idle_until
+                    self._condition.wait(None if due is None else due - now)
+                if self._closed:
+                    return
+                entries = self.take_pending()
+            self.send_digest(entries)
+
+    def connection(self):
+        "Open SMTP connection, reused if still alive. Call with `smtp_lock` held."
+        import smtplib
+
+        if self.smtp is not None:
+            try:
+                if self.smtp.noop()[0] == 250:
+                    return self.smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close_connection()
+        smtp = smtplib.SMTP(
+            self.mailhost, self.mailport or smtplib.SMTP_PORT, timeout=self.timeout
+        )
+        np_logging.metrics.count(self, "connects")
+        if self.username:
+            if self.secure is not None:
+                smtp.ehlo()
+                smtp.starttls(*self.secure)
+                smtp.ehlo()
+            smtp.login(self.username, self.password)
+        self.smtp = smtp
+        return smtp
+
+    def close_connection(self):
+        if self.smtp is not None:
+            with contextlib.suppress(Exception):
+                self.smtp.quit()
+            self.smtp = None
+
+    @staticmethod
+    def format_digest(entries: list[tuple[str, list]]) -> str:
+        return "\n\n".join(
+            msg if count == 1 else f"{msg}\n[repeated {count} times]"
+            for msg, (count, _) in entries
+        )
+
+    def send_digest(self, entries: list[tuple[str, list]]) -> None:
+        if not entries:
+            return
+        import email.utils
+        import smtplib
+        from email.message import EmailMessage
+
+        msg = EmailMessage()
+        msg["From"] = self.fromaddr
+        msg["To"] = ",".join(self.toaddrs)
+        msg["Subject"] = self.subject
+        msg["Date"] = email.utils.localtime()
+        with _digest_lock:
+            _digest_last_sent[self.subject] = time.monotonic()
+        try:
+            msg.set_content(self.format_digest(entries))
+            with self.smtp_lock:
+                try:
+                    self.connection().send_message(msg)
+                except (smtplib.SMTPServerDisconnected, OSError):
+                    self.close_connection()  # dropped since checked: retry once
+                    self.connection().send_message(msg)
+                self.smtp_last_used = time.monotonic()
+            self.sent += 1
+        except Exception:
+            self.handleError(entries[0][1][1])
+
+    def flush(self):
+        with self._condition:
+            entries = self.take_pending()
+        self.send_digest(entries)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._sender.join()
+        self.flush()
+        with self.smtp_lock:
+            self.close_connection()
+        super().close()
 
 
 class ConsoleHandler(logging.StreamHandler):
     def __init__(
         self,
-        stream=sys.stdout,
-        formatter: logging.Formatter = FORMAT[CONSOLE["formatter"]],
-        level: int = CONSOLE["level"],
+        stream=None,
+        formatter: Optional[logging.Formatter] = None,
+        level: Optional[int] = None,
         **kwargs,
     ):
+        config = handler_config("console")
+        stream = sys.stdout if stream is None else stream
+        formatter = formats()[config["formatter"]] if formatter is None else formatter
+        level = config["level"] if level is None else level
         super().__init__(stream)
         self.setLevel(level)
         self.setFormatter(formatter)
+        np_logging.metrics.register(self)
 
 
-class FileHandler(logging.handlers.RotatingFileHandler):
+class FileHandler(
+    np_logging.rotation.SegmentRotationMixin, logging.handlers.RotatingFileHandler
+):
+    """`rotation` sets the naming scheme for backups, and `compression` whether they're
+    compressed in the background: see `np_logging.rotation`.
+
+    By default the file is flushed after every record. With `buffer_size` > 0, writes
+    are buffered and flushed when the buffer fills, when a record at `flush_level` or
+    above is emitted, `flush_interval` seconds after the last flush, and at exit.
+    With `fsync`, each flush is also synced to disk.
+
+    With `json_lines`, and no `formatter`, records are written as JSON: see
+    `np_logging.formatters.JSONFormatter`.
+    """
+
     def __init__(
         self,
-        logs_dir: str | pathlib.Path = FILE["logs_dir"],
-        mode: str = FILE["mode"],
-        maxBytes: int = FILE["maxBytes"],
-        backupCount: int = FILE["backupCount"],
-        encoding: str = FILE["encoding"],
-        delay: bool = FILE["delay"],
-        formatter: logging.Formatter = FORMAT[FILE["formatter"]],
-        level: int = FILE["level"],
+        logs_dir: Optional[str | pathlib.Path] = None,
+        mode: Optional[str] = None,
+        maxBytes: Optional[int] = None,
+        backupCount: Optional[int] = None,
+        encoding: Optional[str] = None,
+        delay: Optional[bool] = None,
+        formatter: Optional[logging.Formatter] = None,
+        level: Optional[int | str] = None,
+        rotation: Optional[str] = None,
+        compression: Optional[str] = None,
+        buffer_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        flush_level: Optional[int | str] = None,
+        fsync: Optional[bool] = None,
+        json_lines: Optional[bool] = None,
         **kwargs,
     ):
+        config = handler_config("file")
+        logs_dir = config["logs_dir"] if logs_dir is None else logs_dir
+        mode = config["mode"] if mode is None else mode
+        maxBytes = config["maxBytes"] if maxBytes is None else maxBytes
+        backupCount = config["backupCount"] if backupCount is None else backupCount
+        encoding = config["encoding"] if encoding is None else encoding
+        delay = config["delay"] if delay is None else delay
+        json_lines = config.get("json_lines", False) if json_lines is None else json_lines
+        formatter = file_formatter(config, formatter, json_lines)
+        level = config["level"] if level is None else level
+        rotation = config.get("rotation", "classic") if rotation is None else rotation
+        compression = config.get("compression") if compression is None else compression
+        buffer_size = config.get("buffer_size", 0) if buffer_size is None else buffer_size
+        flush_interval = (
+            config.get("flush_interval", 1.0) if flush_interval is None else flush_interval
+        )
+        flush_level = (
+            config.get("flush_level", logging.ERROR) if flush_level is None else flush_level
+        )
+        fsync = config.get("fsync", False) if fsync is None else fsync
         name = logging.getLevelName(level) if not isinstance(level, str) else level
         filename = pathlib.Path(logs_dir).resolve() / f"{name.lower()}.log"
         filename.parent.mkdir(parents=True, exist_ok=True)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.flush_level = (
+            logging.getLevelName(flush_level)
+            if isinstance(flush_level, str)
+            else flush_level
+        )
+        self.fsync = fsync
+        self.last_flush = time.monotonic()
+        self.pending = False
         super().__init__(filename, mode, maxBytes, backupCount, encoding, delay)
+        self.init_rotation(rotation, compression)
         self.setLevel(level)
         self.setFormatter(formatter)
+        if buffer_size:
+            _buffered_file_handlers.add(self)
+            start_flusher()
+        np_logging.metrics.register(self)
+
+    def _open(self):
+        if not self.buffer_size:
+            return super()._open()
+        stream = open(
+            self.baseFilename,
+            self.mode,
+            buffering=self.buffer_size,
+            encoding=self.encoding,
+            errors=getattr(self, "errors", None),
+        )
+        self.size = stream.seek(0, os.SEEK_END)
+        return stream
 
     def emit(self, record):
+        try:
+            if not self.buffer_size:
+                return super().emit(record)
+            # track size instead of `stream.tell()`, which flushes the buffer
+            msg = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            size = self.encoded_size(msg)
+            if 0 < self.maxBytes <= self.size + size and self.size:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(msg)
+            self.size += size
+            self.pending = True
+            if (
+                record.levelno >= self.flush_level
+                or time.monotonic() - self.last_flush >= self.flush_interval
+            ):
+                self.flush()
+        except Exception:
+            np_logging.metrics.count(self)
+
+    def encoded_size(self, msg: str) -> int:
+        "Bytes `msg` takes in the file: `maxBytes` is in bytes, not characters."
+        size = len(msg) if msg.isascii() else len(msg.encode(self.encoding or "utf8", "replace"))
+        if os.linesep != "\n":  # text mode translates newlines
+            size += msg.count("\n") * (len(os.linesep) - 1)
+        return size
+
+    def flush(self):
+        with self.lock:
+            super().flush()
+            if self.fsync and self.stream is not None and not self.stream.closed:
+                os.fsync(self.stream.fileno())
+            self.last_flush = time.monotonic()
+            self.pending = False
+
+
+_buffered_file_handlers: weakref.WeakSet[FileHandler] = weakref.WeakSet()
+_flusher: Optional[threading.Thread] = None
+_flusher_wakeup = threading.Event()
+
+
+def flush_buffered_file_handlers(overdue_only: bool = False) -> None:
+    "Flush `FileHandler`s with buffered writes: all, or only those past `flush_interval`."
+    now = time.monotonic()
+    for handler in list(_buffered_file_handlers):
+        if not handler.pending:
+            continue
+        if overdue_only and now - handler.last_flush < handler.flush_interval:
+            continue
         with contextlib.suppress(Exception):
-            super().emit(record)
\ No newline at end of file
+            handler.flush()
+
+
+def start_flusher() -> None:
+    "Flush buffered writes when their interval expires, even if no more records arrive."
+    global _flusher
+    _flusher_wakeup.set()  # re-check intervals
+    if _flusher is not None:
+        return
+
+    def flush_periodically():
+        while True:
+            intervals = [h.flush_interval for h in list(_buffered_file_handlers)]
+            _flusher_wakeup.wait(min(intervals, default=1.0) / 2)
+            _flusher_wakeup.clear()
+            flush_buffered_file_handlers(overdue_only=True)
+
+    _flusher = threading.Thread(
+        target=flush_periodically, name="np_logging file flusher", daemon=True
+    )
+    _flusher.start()
+
+
+class FlightRecorderHandler(logging.Handler):
+    """Keeps the last `capacity` records in memory, unformatted, and writes them to
+    `target` only when needed for a post-mortem:
+
+    - when a record at `trigger_level` or above is handled
+    - when `utils.ExitHooks` catches an uncaught exception, in any thread
+    - at interpreter exit, after the exit message is logged, unless `dump_at_exit`
+      is false: then a normal exit writes nothing
+    - on demand, with `dump()` or `dump_flight_recorders()`
+
+    With `max_age`, only records from the last `max_age` seconds are written.
+    The default target is a `FileHandler` for debug.log, opened on first dump.
+
+    Can replace the debug file handler in a logging config dict:
+        debug_file_handler:
+            (): np_logging.handlers.FlightRecorderHandler
+            capacity: 10000
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10_000,
+        max_age: Optional[float] = None,
+        trigger_level: int | str = logging.ERROR,
+        target: Optional[logging.Handler] = None,
+        logs_dir: Optional[str | pathlib.Path] = None,
+        level: int = logging.DEBUG,
+        dump_at_exit: bool = True,
+        **kwargs,
+    ):
+        super().__init__(level)
+        self.records: collections.deque[logging.LogRecord] = collections.deque(
+            maxlen=capacity
+        )
+        self.max_age = max_age
+        self.trigger_level = (
+            logging.getLevelName(trigger_level)
+            if isinstance(trigger_level, str)
+            else trigger_level
+        )
+        self.target = target or FileHandler(logs_dir, level="DEBUG", delay=True)
+        self.dump_at_exit = dump_at_exit
+        _flight_recorders.add(self)
+
+    def emit(self, record):
+        self.records.append(record)
+        if record.levelno >= self.trigger_level:
+            self.dump()
+
+    def dump(self) -> int:
+        "Write out and clear the recorded records. Returns the number written."
+        with self.lock:
+            records = list(self.records)
+            self.records.clear()
+        if self.max_age is not None:
+            cutoff = time.time() - self.max_age
+            records = [r for r in records if r.created >= cutoff]
+        for record in records:
+            self.target.handle(record)
+        self.target.flush()
+        return len(records)
+
+    def flush(self):
+        "Records are only written by `dump()`."
+
+    def close(self):
+        _flight_recorders.discard(self)
+        self.records.clear()
+        self.target.close()
+        super().close()
+
+
+_flight_recorders: weakref.WeakSet[FlightRecorderHandler] = weakref.WeakSet()
+
+
+def dump_flight_recorders(at_exit: bool = False) -> None:
+    """Write out the records held by every `FlightRecorderHandler`: at exit, only
+    those with `dump_at_exit`."""
+    for handler in list(_flight_recorders):
+        if at_exit and not handler.dump_at_exit:
+            continue
+        with contextlib.suppress(Exception):
+            handler.dump()
+
+
+atexit.register(dump_flight_recorders, at_exit=True)  # runs before `logging.shutdown()`
@@ -0,0 +1,81 @@
+"""
+Levels for module loggers created by `np_logging.getLogger(name)`.
+
+A module logger's level is set to the lowest level of any handler its records
+reach (on the logger itself, or on ancestors it propagates to), but not below
+DEBUG. Records below that level would be discarded by every handler, so
+`logger.isEnabledFor()` rejects them before a record is made, using the logger's
+cached result.
+
+Levels are updated by `np_logging.setLevel()`, `np_logging.debug()` and
+`np_logging.setup()`. After changing handlers or their levels directly, call
+`refresh()`.
+
+A logger whose level is set by anything else is no longer managed.
+    >>> import logging
+    >>> parent = logging.getLogger('doctest_levels')
+    >>> parent.propagate = False
+    >>> parent.addHandler(logging.NullHandler(logging.WARNING))
+    >>> logger = manage(logging.getLogger('doctest_levels.module'))
+    >>> logging.getLevelName(logger.level)
+    'WARNING'
+    >>> parent.handlers[0].setLevel(logging.INFO)
+    >>> refresh()
+    >>> logging.getLevelName(logger.level)
+    'INFO'
+"""
+from __future__ import annotations
+
+import logging
+import threading
+
+FLOOR = logging.DEBUG
+"Managed loggers are never set below this level."
+
+_managed: dict[logging.Logger, int] = {}
+"Managed loggers, and the level last set on each."
+_lock = threading.Lock()
+
+
+def minimum_level(logger: logging.Logger) -> int:
+    """Lowest level of any handler reached by records from `logger`, or `NOTSET` if
+    none are (yet)."""
+    levels = []
+    current = logger
+    while current is not None:
+        levels.extend(handler.level for handler in current.handlers)
+        if not current.propagate:
+            break
+        current = current.parent
+    return min(levels, default=logging.NOTSET)  # no handlers yet: don't filter
+
+
+def manage(logger: logging.Logger) -> logging.Logger:
+    "Set `logger`'s level from its handlers now, and whenever levels are refreshed."
+    with _lock:
+        _managed[logger] = logger.level
+    update(logger)
+    return logger
+
+
+def update(logger: logging.Logger) -> None:
+    level = max(FLOOR, minimum_level(logger))
+    with _lock:
+        if _managed.get(logger) != logger.level:  # set elsewhere: leave it alone
+            _managed.pop(logger, None)
+            return
+        _managed[logger] = level
+        if logger.level != level:
+            logger.setLevel(level)  # also clears `isEnabledFor` caches
+
+
+def refresh() -> None:
+    "Update the levels of all managed loggers, after handler levels have changed."
+    with _lock:
+        loggers = list(_managed)
+    for logger in loggers:
+        update(logger)
+
+
+def managed(logger: logging.Logger) -> bool:
+    return logger in _managed
@@ -0,0 +1,224 @@
+"""
+Non-blocking logging: records are put on a bounded in-process queue by the
+calling thread, and the configured handlers are run on a background thread.
+
+Used by `np_logging.setup(queued=True)` and `np_logging.getLogger(queued=True)`,
+or directly:
+    >>> import logging, np_logging.listener
+    >>> logger = logging.getLogger('doctest_listener')
+    >>> logger.addHandler(logging.NullHandler())
+    >>> q = np_logging.listener.enable([logger], maxsize=100, overflow='drop_oldest')
+    >>> type(logger.handlers[0]).__name__
+    'QueueHandler'
+    >>> np_logging.listener.disable()
+    >>> type(logger.handlers[0]).__name__
+    'NullHandler'
+"""
+from __future__ import annotations
+
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import threading
+from typing import Iterable, Optional, Sequence
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_below")
+"""
+- `block`: the calling thread waits for space in the queue
+- `drop_oldest`: the oldest queued record is discarded to make space
+- `drop_below`: records below `drop_level` are discarded, others wait for space
+"""
+DEFAULT_MAXSIZE = 10_000
+DEFAULT_OVERFLOW = "block"
+DEFAULT_DROP_LEVEL = logging.WARNING
+
+logger = logging.getLogger(__name__)
+
+_queue: Optional[OverflowQueue] = None
+_listener: Optional[QueueListener] = None
+_lock = threading.RLock()
+
+
+class OverflowQueue(queue.Queue):
+    """Bounded queue of `(handlers, record)` items that applies an overflow policy
+    instead of raising `queue.Full`.
+
+    `dropped` counts the records that were discarded.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        overflow: str = DEFAULT_OVERFLOW,
+        drop_level: int | str = DEFAULT_DROP_LEVEL,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow should be one of {OVERFLOW_POLICIES}, not {overflow!r}"
+            )
+        super().__init__(maxsize)
+        self.overflow = overflow
+        self.drop_level = (
+            logging.getLevelName(drop_level)
+            if isinstance(drop_level, str)
+            else drop_level
+        )
+        self.dropped = 0
+
+    def put(self, item, block=True, timeout=None):
+        if item is None or self.overflow == "block":  # sentinel is never dropped
+            return super().put(item, block, timeout)
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                if self.overflow == "drop_oldest":
+                    self._get()
+                    self.unfinished_tasks -= 1
+                    self.dropped += 1
+                elif item[1].levelno < self.drop_level:
+                    self.dropped += 1
+                    return
+                else:
+                    while self._qsize() >= self.maxsize:
+                        self.not_full.wait()
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """Stands in for a logger's handlers: records are queued with the handlers
+    they're destined for, to be handled on the listener thread.
+
+    Level is kept at the lowest level of its handlers, so records that no
+    handler wants aren't queued.
+    """
+
+    def __init__(self, queue: OverflowQueue, handlers: Sequence[logging.Handler]):
+        super().__init__(queue)
+        self.handlers = tuple(handlers)
+        self.update_level()
+
+    def update_level(self) -> None:
+        self.setLevel(min((h.level for h in self.handlers), default=logging.NOTSET))
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merge args into msg now, in case they're mutated before the record is
+        handled, in a copy: other handlers on the logger still get the original."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.queue.put((self.handlers, record))
+
+
+class QueueListener(logging.handlers.QueueListener):
+    "Passes each queued record to the handlers it was queued with."
+
+    def __init__(self, queue: OverflowQueue):
+        super().__init__(queue, respect_handler_level=True)
+
+    def handle(self, item) -> None:
+        handlers, record = item
+        for handler in handlers:
+            if record.levelno >= handler.level:
+                try:
+                    handler.handle(record)
+                except Exception:
+                    handler.handleError(record)
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def sinks(logger: logging.Logger) -> list[logging.Handler]:
+    "The handlers a logger's records end up at, whether queued or not."
+    result = []
+    for handler in logger.handlers:
+        if isinstance(handler, QueueHandler):
+            result.extend(handler.handlers)
+        else:
+            result.append(handler)
+    return result
+
+
+def loggers_with_handlers() -> list[logging.Logger]:
+    return [logging.getLogger()] + [
+        _
+        for _ in logging.root.manager.loggerDict.values()
+        if isinstance(_, logging.Logger) and _.handlers
+    ]
+
+
+def enable(
+    loggers: Optional[Iterable[str | logging.Logger]] = None,
+    maxsize: int = DEFAULT_MAXSIZE,
+    overflow: str = DEFAULT_OVERFLOW,
+    drop_level: int | str = DEFAULT_DROP_LEVEL,
+) -> OverflowQueue:
+    """Replace the handlers on `loggers` (default: all loggers with handlers) with a
+    `QueueHandler` and start a listener thread to run them. Handlers with a
+    `blocking = False` attribute are left in place.
+
+    If already enabled, the existing queue is re-used, queue arguments are ignored,
+    and handlers added since are moved behind the queue.
+    """
+    global _queue, _listener
+    with _lock:
+        if _queue is None:
+            _queue = OverflowQueue(maxsize, overflow, drop_level)
+            _listener = QueueListener(_queue)
+            _listener.start()
+            atexit.unregister(disable)
+            atexit.register(disable)
+        for _ in loggers_with_handlers() if loggers is None else loggers:
+            if isinstance(_, str):
+                _ = logging.getLogger(None if _ == "root" else _)
+            _logger = _
+            handlers = [h for h in sinks(_logger) if getattr(h, "blocking", True)]
+            if not handlers:
+                continue
+            for handler in list(_logger.handlers):
+                if handler in handlers or isinstance(handler, QueueHandler):
+                    _logger.removeHandler(handler)
+            _logger.addHandler(QueueHandler(_queue, handlers))
+        return _queue
+
+
+def disable() -> None:
+    """Stop the listener thread after it has handled all queued records, and
+    restore the original handlers to their loggers."""
+    global _queue, _listener
+    with _lock:
+        if _listener is None:
+            return
+        for _logger in loggers_with_handlers():
+            for handler in list(_logger.handlers):
+                if isinstance(handler, QueueHandler):
+                    _logger.removeHandler(handler)
+                    for _ in handler.handlers:
+                        _logger.addHandler(_)
+        _listener.stop()
+        if _queue.dropped:
+            logger.warning("%d log records were dropped from the queue", _queue.dropped)
+        _queue = _listener = None
+
+
+def enabled() -> bool:
+    return _listener is not None
+
+
+def dropped() -> int:
+    "Number of records discarded by the current queue's overflow policy."
+    return _queue.dropped if _queue is not None else 0
+
+
+def update_levels() -> None:
+    "Re-sync queue handler levels after their handlers' levels were changed."
+    for _logger in loggers_with_handlers():
+        for handler in _logger.handlers:
+            if isinstance(handler, QueueHandler):
+                handler.update_level()
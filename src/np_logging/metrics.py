@@ -0,0 +1,232 @@
+"""
+Optional runtime metrics for np_logging's handlers, to find which one is slowing
+down logging: records emitted, characters written, errors (including those the
+handlers otherwise swallow), socket connections, rollovers, and a histogram of
+time spent handling each record.
+
+Disabled by default, with no overhead: `enable()` instruments existing and new
+handlers by wrapping methods on each instance, and `disable()` removes them.
+    >>> import np_logging, np_logging.metrics
+    >>> np_logging.metrics.enable()
+    >>> handler = np_logging.handlers.ConsoleHandler()
+    >>> stats = np_logging.stats()[np_logging.metrics.key(handler)]
+    >>> stats['records'], stats['errors']
+    (0, 0)
+    >>> np_logging.metrics.disable()
+
+`enable(log_interval=...)` also logs a summary of `stats()` periodically.
+"""
+from __future__ import annotations
+
+import logging
+import logging.handlers
+import threading
+import time
+import weakref
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_US = tuple(2**i for i in range(25))
+"Upper bounds of latency histogram buckets, in microseconds: 1 us to ~17 s."
+
+_handlers: weakref.WeakSet[logging.Handler] = weakref.WeakSet()
+_enabled = False
+_lock = threading.Lock()
+_reporter: Optional[threading.Thread] = None
+_reporter_stop = threading.Event()
+
+
+class HandlerMetrics:
+    "Counters and latency histogram for one handler."
+
+    COUNTERS = ("records", "chars", "errors", "connects", "rollovers")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = 0
+        self.chars = 0
+        "Length of formatted messages, or bytes sent by socket handlers."
+        self.errors = 0
+        self.connects = 0
+        self.rollovers = 0
+        self.latency = [0] * (len(BUCKETS_US) + 1)
+        self.max_latency = 0.0
+
+    def add(self, counter: str, n: int = 1) -> None:
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def observe(self, seconds: float) -> None:
+        bucket = min(int(seconds * 1e6).bit_length(), len(BUCKETS_US))
+        with self.lock:
+            self.records += 1
+            self.latency[bucket] += 1
+            if seconds > self.max_latency:
+                self.max_latency = seconds
+
+    def percentile_us(self, p: float) -> Optional[int]:
+        "Upper bound of the histogram bucket containing the `p`th percentile."
+        total = sum(self.latency)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(BUCKETS_US + (None,), self.latency):
+            seen += count
+            if seen >= p / 100 * total:
+                return bound
+        return None
+
+    def as_dict(self) -> dict[str, Any]:
+        with self.lock:
+            stats: dict[str, Any] = {_: getattr(self, _) for _ in self.COUNTERS}
+            stats["latency_us"] = {
+                f"<={bound}" if bound else f">{BUCKETS_US[-1]}": count
+                for bound, count in zip(BUCKETS_US + (None,), self.latency)
+                if count
+            }
+            stats["p50_us"] = self.percentile_us(50)
+            stats["p99_us"] = self.percentile_us(99)
+            stats["max_us"] = round(self.max_latency * 1e6)
+        return stats
+
+
+def register(handler: logging.Handler) -> None:
+    "Called by np_logging handlers on init: instruments them if metrics are enabled."
+    _handlers.add(handler)
+    if _enabled:
+        attach(handler)
+
+
+def attach(handler: logging.Handler) -> None:
+    "Wrap the instance's methods to update `handler.metrics`."
+    if getattr(handler, "metrics", None) is not None:
+        return
+    metrics = handler.metrics = HandlerMetrics()
+    cls = type(handler)
+
+    def handle(record):
+        t0 = time.perf_counter()
+        try:
+            return cls.handle(handler, record)
+        finally:
+            metrics.observe(time.perf_counter() - t0)
+
+    def handleError(record):
+        metrics.add("errors")
+        return cls.handleError(handler, record)
+
+    def format(record):
+        msg = cls.format(handler, record)
+        metrics.add("chars", len(msg))
+        return msg
+
+    def send(s):
+        metrics.add("chars", len(s))
+        return cls.send(handler, s)
+
+    def makeSocket(*args, **kwargs):
+        metrics.add("connects")
+        return cls.makeSocket(handler, *args, **kwargs)
+
+    def doRollover():
+        metrics.add("rollovers")
+        return cls.doRollover(handler)
+
+    wrappers = dict(handle=handle, handleError=handleError)
+    if isinstance(handler, logging.handlers.SocketHandler):
+        wrappers.update(send=send, makeSocket=makeSocket)
+    else:
+        wrappers.update(format=format)
+    if isinstance(handler, logging.handlers.BaseRotatingHandler):
+        wrappers.update(doRollover=doRollover)
+    handler.__dict__.update(wrappers)
+
+
+def detach(handler: logging.Handler) -> None:
+    for name in ("handle", "handleError", "format", "send", "makeSocket", "doRollover"):
+        handler.__dict__.pop(name, None)
+    handler.metrics = None
+
+
+def count(handler: logging.Handler, counter: str = "errors") -> None:
+    """Increment one of `handler`'s counters, if instrumented: e.g. for an error it
+    handled without calling `handleError`."""
+    metrics = getattr(handler, "metrics", None)
+    if metrics is not None:
+        metrics.add(counter)
+
+
+def enable(log_interval: Optional[float] = None) -> None:
+    """Instrument np_logging's handlers, existing and new. With `log_interval`, a
+    summary is logged to the `np_logging.metrics` logger every `log_interval` seconds."""
+    global _enabled, _reporter
+    with _lock:
+        _enabled = True
+        for handler in list(_handlers):
+            attach(handler)
+        if log_interval and _reporter is None:
+            _reporter_stop.clear()
+            _reporter = threading.Thread(
+                target=report_periodically,
+                args=(log_interval,),
+                name="np_logging metrics reporter",
+                daemon=True,
+            )
+            _reporter.start()
+
+
+def disable() -> None:
+    "Remove instrumentation from all handlers and discard their metrics."
+    global _enabled, _reporter
+    with _lock:
+        _enabled = False
+        for handler in list(_handlers):
+            detach(handler)
+        if _reporter is not None:
+            _reporter_stop.set()
+            _reporter = None
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def key(handler: logging.Handler) -> str:
+    "Name of `handler` in `stats()`."
+    target = (
+        getattr(handler, "baseFilename", None)
+        or (
+            f"{handler.host}:{handler.port}"
+            if isinstance(handler, logging.handlers.SocketHandler)
+            else None
+        )
+        or getattr(handler, "mailhost", None)
+        or getattr(getattr(handler, "stream", None), "name", None)
+    )
+    name = handler.name or f"{id(handler):x}"
+    return f"{type(handler).__name__}({name}, {target})"
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    """Metrics for each instrumented handler since `enable()`: counters, latency
+    histogram (record counts per bucket, by upper bound in microseconds) and
+    approximate p50/p99."""
+    return {
+        key(handler): handler.metrics.as_dict()
+        for handler in list(_handlers)
+        if getattr(handler, "metrics", None) is not None
+    }
+
+
+def summary() -> str:
+    return "; ".join(
+        f"{name}: {s['records']} records, {s['errors']} errors, p50 {s['p50_us']} us, "
+        f"p99 {s['p99_us']} us, max {s['max_us']} us"
+        for name, s in stats().items()
+    )
+
+
+def report_periodically(interval: float) -> None:
+    while not _reporter_stop.wait(interval):
+        logger.info("Handler metrics: %s", summary())
@@ -0,0 +1,198 @@
+"""
+Logging from worker processes, e.g. in a `multiprocessing.Pool` or
+`concurrent.futures.ProcessPoolExecutor`.
+
+Workers don't open log files or connections: records are sent in batches over a
+`multiprocessing.Queue` to a listener thread in the parent, where they're passed to
+the parent's loggers - and so to its file, server and email handlers, which are
+only ever opened, written and rotated by the parent.
+
+In the parent, after `np_logging.setup()` or `np_logging.getLogger()`:
+    >>> import concurrent.futures, np_logging.multiprocess
+    >>> listener = np_logging.multiprocess.start()
+    >>> with concurrent.futures.ProcessPoolExecutor(
+    ...     initializer=listener.initializer, initargs=listener.initargs
+    ... ) as pool:
+    ...     pass
+    >>> np_logging.multiprocess.stop()
+
+In workers, `np_logging.getLogger()` and `logging.getLogger()` can be used as
+usual. The listener is also stopped at exit, after any queued records are handled.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.util
+import threading
+from typing import Any, Optional
+
+import np_logging.levels
+
+BATCH_SIZE = 100
+BATCH_INTERVAL = 0.1
+"Seconds a worker holds records before sending, unless a batch fills first."
+
+logger = logging.getLogger(__name__)
+
+_listener: Optional[Listener] = None
+_worker_handler: Optional[WorkerHandler] = None
+_lock = threading.Lock()
+
+
+class WorkerHandler(logging.handlers.QueueHandler):
+    """Sends records from a worker process to the parent's listener, in batches of
+    up to `batch_size` records, at least every `batch_interval` seconds.
+
+    A record at `flush_level` or above is sent immediately, with the rest of its
+    batch. Batches are also sent when the worker exits.
+    """
+
+    def __init__(
+        self,
+        queue: Any,
+        batch_size: int = BATCH_SIZE,
+        batch_interval: float = BATCH_INTERVAL,
+        flush_level: int = logging.WARNING,
+    ):
+        super().__init__(queue)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.flush_level = flush_level
+        self.batch: list[logging.LogRecord] = []
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, name=f"{self} flusher", daemon=True
+        )
+        self._flusher.start()
+        # runs at worker exit, including pool workers, which skip `atexit`:
+        # before the queue's own finalizer (priority 10) stops its feeder thread
+        multiprocessing.util.Finalize(self, self.close, exitpriority=11)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.batch_interval):
+            self.flush()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        "Called with `self.lock` held, via `handle()`."
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size or record.levelno >= self.flush_level:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.batch:
+                return
+            batch, self.batch = self.batch, []
+            self.queue.put(batch)
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+        super().close()
+
+
+class Listener(threading.Thread):
+    """Passes batches of records received from workers to the parent's loggers.
+
+    Pass `initializer` and `initargs` to a process pool to set up its workers.
+    """
+
+    def __init__(self, queue: Any, level: int):
+        super().__init__(name="np_logging multiprocess listener", daemon=True)
+        self.queue = queue
+        self.level = level
+        self.records = 0
+
+    @property
+    def initializer(self):
+        return worker_init
+
+    @property
+    def initargs(self) -> tuple[Any, int]:
+        return (self.queue, self.level)
+
+    def run(self) -> None:
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            fields = getattr(logging.getLogRecordFactory(), "fields", {})
+            for record in batch:
+                for key, value in fields.items():  # if worker had no record factory
+                    record.__dict__.setdefault(key, value)
+                try:
+                    logging.getLogger(record.name).handle(record)
+                except Exception:
+                    logger.debug("Could not handle record from worker", exc_info=True)
+            self.records += len(batch)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        "Stop after handling records already sent by workers."
+        self.queue.put(None)
+        self.join(timeout)
+
+
+def start(
+    context: Optional[str] = None, level: Optional[int] = None
+) -> Listener:
+    """Start the listener for worker processes, if not already running.
+
+    `context` is the `multiprocessing` start method of the workers' pool, if not the
+    default. `level` is the level below which workers discard records (default: the
+    lowest level of the root logger's handlers).
+    """
+    global _listener
+    with _lock:
+        if _listener is None:
+            if level is None:
+                level = max(
+                    np_logging.levels.FLOOR,
+                    np_logging.levels.minimum_level(logging.getLogger()),
+                )
+            _listener = Listener(multiprocessing.get_context(context).Queue(), level)
+            _listener.start()
+            atexit.unregister(stop)
+            atexit.register(stop)
+        return _listener
+
+
+def stop() -> None:
+    "Stop the listener after handling all records sent so far."
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+
+def worker_init(queue: Any, level: int = logging.DEBUG) -> None:
+    """Initializer for worker processes: send all records to the parent's listener,
+    and replace any handlers inherited from the parent (when forked)."""
+    global _listener, _worker_handler
+    _listener = None  # if forked from the parent: its listener isn't ours to stop
+    atexit.unregister(stop)
+    handler = WorkerHandler(queue)
+    handler.setLevel(level)
+    root = logging.getLogger()
+    for _logger in [root] + [
+        _
+        for _ in logging.root.manager.loggerDict.values()
+        if isinstance(_, logging.Logger) and _.handlers
+    ]:
+        for _handler in list(_logger.handlers):
+            _logger.removeHandler(_handler)
+        if _logger is not root and not _logger.propagate:
+            _logger.addHandler(handler)  # otherwise its records reach root's handler
+    root.addHandler(handler)
+    root.setLevel(level)
+    _worker_handler = handler
+    np_logging.levels.refresh()
+
+
+def in_worker() -> bool:
+    "Whether this process's records are sent to a parent's listener."
+    return _worker_handler is not None
@@ -5,14 +5,18 @@ import logging
 import logging.config
 import logging.handlers
 import pathlib
-from typing import Callable, Generator, Optional, Sequence
+import sys
+from typing import Any, Callable, Generator, Optional, Sequence
 
+import np_logging.filters as filters
 import np_logging.handlers as handlers
+import np_logging.levels as levels
+import np_logging.listener as listener
+import np_logging.multiprocess as multiprocess
+import np_logging.reconfigure as reconfigure
 import np_logging.utils as utils
 import np_logging.config as config
 
-DEFAULT_LOGGING_CONFIG, PKG_CONFIG = config.DEFAULT_LOGGING_CONFIG, config.PKG_CONFIG
-
 pkg_logger = logging.getLogger(__name__)
 pkg_logger.setLevel(logging.NOTSET)
 
@@ -20,11 +24,31 @@ console: None | handlers.ConsoleHandler = None
 """The console handler added to the root logger by `getLogger`."""
 
 
-def getLogger(name: Optional[str] = None, level: int | str = "INFO") -> logging.Logger:
+def __getattr__(name: str) -> Any:
+    "`DEFAULT_LOGGING_CONFIG` and `PKG_CONFIG`, loaded on first access."
+    if name in config.SOURCES:
+        return config.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def pkg_config() -> dict[str, Any]:
+    return config.PKG_CONFIG
+
+
+def default_logging_config() -> dict[str, Any]:
+    return config.DEFAULT_LOGGING_CONFIG
+
+
+def getLogger(
+    name: Optional[str] = None, level: int | str = "INFO", queued: bool = False
+) -> logging.Logger:
     """`logging.getLogger`, with console & debug/warning file handlers if root logger.
 
     An additional level argument sets the level of the newly-created console handler.
 
+    With `queued=True`, the root logger's handlers are run on a background thread
+    (see `np_logging.listener`).
+
     Note that the logger level determines whether msgs are passed to handlers. If the
     root logger has a level higher than DEBUG, then the debug file handler won't
     log anything, so generally we want to leave the root logger level at DEBUG and
@@ -37,7 +61,11 @@ def getLogger(name: Optional[str] = None, level: int | str = "INFO") -> logging.
 
     if name is None or name == "root":
         global console
+        if multiprocess.in_worker():  # records are handled by the parent
+            return logger
         if console is not None:  # already added our handlers to root
+            if queued:
+                listener.enable([logger])
             return logger
 
         console = handlers.ConsoleHandler(level=level)
@@ -45,16 +73,20 @@ def getLogger(name: Optional[str] = None, level: int | str = "INFO") -> logging.
         logger.addHandler(console)
         logger.addHandler(handlers.FileHandler(level=logging.WARNING))
         logger.addHandler(handlers.FileHandler(level=logging.DEBUG))
+        if queued:
+            listener.enable([logger])
 
         utils.setup_logging_at_exit()
 
-        logger.setLevel(PKG_CONFIG["default_logger_level"])
+        logger.setLevel(pkg_config()["default_logger_level"])
+        levels.refresh()  # module loggers may have been created before root handlers
         # note that setting the root logger level to NOTSET here can result in unpredictable behavior:
         # the logging module seems to step in and set to WARNING
     elif not logger.handlers:
         # we created a new module logger -
-        # make sure all logs are propagated to root:
-        logger.setLevel(logging.DEBUG)
+        # make sure all logs that a handler will write are propagated to root,
+        # and no records are made for those that won't:
+        levels.manage(logger)
     return logger
 
 
@@ -75,22 +107,24 @@ def setLevel(level: int | str) -> None:
             )
         return
     console.setLevel(level)
+    listener.update_levels()
+    levels.refresh()
 
    
 set_level: Callable[[int | str], None] = setLevel
 
 
-def web(project_name: str = pathlib.Path.cwd().name) -> logging.Logger:
+def web(project_name: Optional[str] = None) -> logging.Logger:
     """
     Set up a socket handler to send logs to the eng-mindscope log server.
     """
-    name = PKG_CONFIG.get("default_server_logger_name", "web")
+    name = pkg_config().get("default_server_logger_name", "web")
     logger = logging.getLogger(name)
     if logger.handlers:
         return logger
     handler = handlers.ServerHandler(project_name)
     logger.addHandler(handler)
-    logger.setLevel(PKG_CONFIG["default_logger_level"])
+    logger.setLevel(pkg_config()["default_logger_level"])
     return logger
 
 
@@ -103,7 +137,7 @@ def email(
     """
     Set up an email logger to send an email at program exit.
     """
-    name = PKG_CONFIG.get("default_exit_email_logger_name", "email")
+    name = pkg_config().get("default_exit_email_logger_name", "email")
     logger = logging.getLogger(name)
     if logger.handlers: # we already created it
         return logger
@@ -116,11 +150,18 @@ def email(
 
 
 def setup(
-    config: str | dict | pathlib.Path = DEFAULT_LOGGING_CONFIG,
-    project_name: str = pathlib.Path.cwd().name,  # for log server
+    config: Optional[str | dict | pathlib.Path] = None,  # default logging config
+    project_name: Optional[str] = None,  # for log server, default: cwd name
     email_address: Optional[str | Sequence[str]] = None,
     email_at_exit: bool | int = False,  # auto-True if address arg provided
     log_at_exit: bool = True,
+    queued: bool = False,
+    queue_size: int = listener.DEFAULT_MAXSIZE,
+    overflow: str = listener.DEFAULT_OVERFLOW,
+    drop_level: int | str = listener.DEFAULT_DROP_LEVEL,
+    asyncio: bool = False,
+    coalesce: bool = False,
+    incremental: bool = True,
 ):
     """
     With no args, uses default config to set up loggers named `web` and `email`, plus console logging
@@ -147,13 +188,44 @@ def setup(
     - `email_at_exit` (`True` if `email_address` is not `None`)
         - If `True`, an email is sent when the program terminates.
         - If `logging.ERROR`, the email is only sent if the program terminates via an exception.
+
+    - `queued`
+        - If `True`, handlers are run on a background thread, fed by a queue of
+          `queue_size` records: logging calls don't wait on network or file I/O.
+        - `overflow` sets what happens when the queue is full: one of
+          `np_logging.listener.OVERFLOW_POLICIES`. See `np_logging.dropped()`.
+        - With `overflow="drop_below"`, records below `drop_level` are discarded
+          while the queue is full, and others wait for space.
+
+    - `asyncio`
+        - If `True`, records are sent to the log server from a task on the running
+          event loop, and other handlers are run on a background thread (as with
+          `queued`): logging calls never block the loop. See `np_logging.aio`.
+        - If `False` after a previous call with `True`, the log server handlers
+          are swapped back to blocking ones.
+
+    - `coalesce`
+        - If `True`, consecutive duplicate records are replaced by a single record
+          with their count, before reaching any handler. See `np_logging.filters`.
+
+    - `incremental`
+        - If `True`, calling `setup()` again only rebuilds the handlers whose config
+          changed, and only updates the loggers and levels that changed: open files,
+          server connections and buffered records are kept. If `False`, all
+          handlers are closed and rebuilt by `logging.config.dictConfig`.
+          See `np_logging.reconfigure`.
     """
+    if config is None:
+        config = default_logging_config()
+    project_name = project_name or handlers.default_project_name()
     config = utils.get_config_dict_from_multi_input(config)
     removed_handlers = utils.ensure_accessible_handlers(config)
 
     handlers.setup_record_factory(project_name)
 
-    logging.config.dictConfig(config)
+    listener.disable()  # existing handlers are about to be replaced or updated
+    changes = reconfigure.apply(config, incremental)
+    pkg_logger.debug("Applied logging config: handlers %s", changes)
 
     if removed_handlers:
         pkg_logger.debug(
@@ -161,7 +233,7 @@ def setup(
             removed_handlers,
         )
 
-    exit_email_logger = config.get("exit_email_logger", None) or PKG_CONFIG.get(
+    exit_email_logger = config.get("exit_email_logger", None) or pkg_config().get(
         "default_exit_email_logger_name", "email"
     )
     if email_at_exit is True:
@@ -178,12 +250,26 @@ def setup(
         if email_at_exit is False or email_at_exit is None:
             # no reason for user to provide an email address unless exit logging is desired
             email_at_exit = logging.INFO
+    if asyncio:
+        import np_logging.aio
+
+        np_logging.aio.replace_server_handlers(project_name)
+    elif "np_logging.aio" in sys.modules:  # `asyncio=True` in a previous call
+        import np_logging.aio
+
+        np_logging.aio.restore_server_handlers(project_name)
+    if coalesce:
+        filters.coalesce(listener.loggers_with_handlers())
+    if queued or asyncio:
+        # before `setup_logging_at_exit`: atexit runs the queue's shutdown after exit msgs are logged
+        listener.enable(maxsize=queue_size, overflow=overflow, drop_level=drop_level)
     utils.setup_logging_at_exit(
         email_level=email_at_exit,
         email_logger=exit_email_logger,
         root_log_at_exit=log_at_exit,
     )
-    logging.getLogger('root').setLevel(PKG_CONFIG["default_logger_level"])
+    logging.getLogger('root').setLevel(pkg_config()["default_logger_level"])
+    levels.refresh()
     pkg_logger.debug("np_logging setup complete")
 
 
@@ -200,16 +286,20 @@ def debug() -> Generator[None, None, None]:
     handler_level_0 = []
     
     root_logger.setLevel(logging.DEBUG)
-    for handler in (_ for _ in root_logger.handlers if isinstance(_, logging.StreamHandler)):
+    stream_handlers = [
+        _ for _ in listener.sinks(root_logger) if isinstance(_, logging.StreamHandler)
+    ]
+    for handler in stream_handlers:
         handler_level_0 += [handler.level]
         handler.setLevel(logging.DEBUG)
+    listener.update_levels()
+    levels.refresh()
         
     try:
         yield
     finally:
         root_logger.setLevel(logger_level_0)
-        for handler, level in zip(
-            (_ for _ in root_logger.handlers if isinstance(_, logging.StreamHandler)),
-            handler_level_0,
-        ):
-            handler.setLevel(level)
\ No newline at end of file
+        for handler, level in zip(stream_handlers, handler_level_0):
+            handler.setLevel(level)
+        listener.update_levels()
+        levels.refresh()
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""
+Reading records back from the text written by np_logging's file handlers.
+
+A `%`-style format, e.g. `detailed` from the package config, is turned into a
+regular expression matching the first line of each record. Lines that don't
+match continue the previous record (e.g. a traceback), and are appended to its
+message.
+
+    >>> parser = Parser([LineFormat("%(asctime)s %(name)s %(levelname)-8s | %(message)s")])
+    >>> lines = [
+    ...     "2022-10-17 12:00:00,250 np.test WARNING  | disk 95% full",
+    ...     "2022-10-17 12:00:01,500 np.test ERROR    | failed",
+    ...     "Traceback (most recent call last):",
+    ... ]
+    >>> [parser.feed(line) for line in lines][1]['msg']
+    'disk 95% full'
+    >>> record = parser.flush()
+    >>> record['levelno'], record['msecs'], record['msg']
+    (40, 500.0, 'failed\\nTraceback (most recent call last):')
+
+Fields that aren't in the format are left for `logging.makeLogRecord()` to fill.
+
+Files written with `json_lines` (see `np_logging.formatters.JSONFormatter`) have a
+record per line, which `JSONLineFormat` matches without a regular expression.
+`parse_json_lines()` reads them lazily, without looking ahead for continuation lines:
+
+    >>> lines = ['{"created":1666000800.25,"levelname":"INFO","msg":"started"}\\n']
+    >>> [(r['levelno'], r['msecs'], r['msg']) for r in parse_json_lines(lines)]
+    [(20, 250.0, 'started')]
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+import time
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+import np_logging.config
+import np_logging.formatters
+
+PACKAGE_FORMATS = ("detailed", "log_server_file_backup")
+"Formats in the package config that file handlers write with, tried in order."
+
+DATE_DIRECTIVES = {
+    "Y": r"\d{4}",
+    "y": r"\d{2}",
+    "m": r"\d{2}",
+    "d": r"\d{2}",
+    "H": r"\d{2}",
+    "I": r"\d{2}",
+    "M": r"\d{2}",
+    "S": r"\d{2}",
+    "f": r"\d{6}",
+    "j": r"\d{3}",
+    "b": r"[A-Za-z]+",
+    "a": r"[A-Za-z]+",
+    "p": r"[AP]M",
+    "z": r"[+-]\d{4}",
+    "%": "%",
+}
+"Patterns for `strftime` directives: others match anything."
+
+FIELD_PATTERNS = {
+    "levelname": r"[A-Z]+|Level \d+",
+    "message": r".*",
+    "levelno": r"\d+",
+    "lineno": r"\d+",
+    "process": r"\d+",
+    "thread": r"\d+",
+    "created": r"[\d.]+",
+}
+"Patterns for record attributes: others match as little as possible."
+
+INTEGER_FIELDS = ("levelno", "lineno", "process", "thread")
+
+JSON_LINES = "json"
+"`fmt` of `JSONLineFormat`, e.g. in `np_logging.query` indexes."
+
+
+def date_pattern(datefmt: Optional[str]) -> str:
+    "Regular expression for `asctime` formatted with `datefmt`."
+    if datefmt is None:  # `logging.Formatter` default, with msecs
+        return date_pattern(logging.Formatter.default_time_format) + r",\d{3}"
+    return "".join(
+        DATE_DIRECTIVES.get(part[1], ".+?") if part.startswith("%") else re.escape(part)
+        for part in re.split(r"(%.)", datefmt)
+        if part
+    )
+
+
+def level_number(levelname: str) -> int:
+    level = logging.getLevelName(levelname)
+    if isinstance(level, int):
+        return level
+    if levelname.startswith("Level "):
+        return int(levelname[len("Level ") :])
+    return logging.NOTSET
+
+
+class LineFormat:
+    "Matches the first line of a record written with `%`-style format `fmt`."
+
+    def __init__(self, fmt: str, datefmt: Optional[str] = None, **kwargs):
+        self.fmt = fmt
+        self.datefmt = datefmt
+        self.regex = re.compile(self.pattern(fmt, datefmt))
+        self.time_cache: tuple[Optional[str], float] = (None, 0.0)
+
+    @staticmethod
+    def pattern(fmt: str, datefmt: Optional[str]) -> str:
+        if "%" in np_logging.formatters.FIELD.sub("", fmt):
+            raise ValueError(f"Can only parse formats with named fields: {fmt!r}")
+        parts = []
+        seen = set()
+        position = 0
+        for match in np_logging.formatters.FIELD.finditer(fmt):
+            parts.append(re.escape(fmt[position : match.start()]))
+            position = match.end()
+            key, spec = match.group("key", "spec")
+            if key is None:  # %%
+                parts.append("%")
+                continue
+            if key in seen:
+                parts.append(f"(?P={key})")
+                continue
+            seen.add(key)
+            field = FIELD_PATTERNS.get(key, ".*?")
+            if key == "asctime":
+                field = date_pattern(datefmt)
+            group = f"(?P<{key}>{field})"
+            if spec[:-1].lstrip("#0+- ")[:1].isdigit():  # padded to a width
+                group = group + " *" if "-" in spec else " *" + group
+            parts.append(group)
+        parts.append(re.escape(fmt[position:]))
+        return "".join(parts)
+
+    def parse_time(self, asctime: str) -> tuple[float, float]:
+        "`created` and `msecs` from `asctime`, in local time like `logging.Formatter`."
+        msecs = 0.0
+        if self.datefmt is None:
+            asctime, _, millis = asctime.rpartition(",")
+            msecs = float(millis)
+        cached, seconds = self.time_cache
+        if asctime != cached:
+            seconds = time.mktime(
+                time.strptime(asctime, self.datefmt or logging.Formatter.default_time_format)
+            )
+            self.time_cache = (asctime, seconds)
+        return seconds + msecs / 1000, msecs
+
+    def match(self, line: str) -> Optional[dict[str, Any]]:
+        "Record dict for the first line of a record, or `None` if `line` isn't one."
+        match = self.regex.fullmatch(line)
+        if match is None:
+            return None
+        fields = match.groupdict()
+        fields["msg"] = fields.pop("message", "")
+        fields["args"] = None
+        if "levelname" in fields:
+            fields["levelno"] = level_number(fields["levelname"])
+        if "asctime" in fields:
+            try:
+                fields["created"], fields["msecs"] = self.parse_time(fields.pop("asctime"))
+            except ValueError:
+                return None
+        elif "created" in fields:
+            fields["created"] = float(fields["created"])
+        for key in INTEGER_FIELDS:
+            if key in fields:
+                fields[key] = int(fields[key])
+        return fields
+
+
+def json_record(fields: dict[str, Any]) -> dict[str, Any]:
+    "Record dict from a record written by `JSONFormatter`."
+    fields["args"] = None
+    if "levelno" not in fields and "levelname" in fields:
+        fields["levelno"] = level_number(fields["levelname"])
+    if fields.get("created") is None:  # e.g. NaN, written as null
+        fields.pop("created", None)
+    else:
+        fields["msecs"] = round(fields["created"] % 1 * 1000, 3)
+    return fields
+
+
+class JSONLineFormat:
+    "Matches records written by `np_logging.formatters.JSONFormatter`, one per line."
+
+    fmt = JSON_LINES
+    datefmt = None
+
+    def match(self, line: str) -> Optional[dict[str, Any]]:
+        if not line.startswith("{"):
+            return None
+        try:
+            fields = json.loads(line)
+        except ValueError:
+            return None
+        return json_record(fields) if isinstance(fields, dict) else None
+
+
+def line_format(fmt: str, datefmt: Optional[str] = None) -> LineFormat | JSONLineFormat:
+    "Format matching records written with `fmt`, or JSON lines if `fmt` is `JSON_LINES`."
+    return JSONLineFormat() if fmt == JSON_LINES else LineFormat(fmt, datefmt)
+
+
+def package_formats() -> list[LineFormat | JSONLineFormat]:
+    formatters = np_logging.config.PKG_CONFIG["formatters"]
+    return [JSONLineFormat()] + [LineFormat(**formatters[name]) for name in PACKAGE_FORMATS]
+
+
+class Parser:
+    """Assembles record dicts from lines of text, one line at a time.
+
+    The format is the first of `formats` (default: JSON lines, then `PACKAGE_FORMATS`)
+    to match a line: lines before that are skipped.
+    """
+
+    def __init__(self, formats: Optional[Sequence[LineFormat | JSONLineFormat]] = None):
+        self.formats = list(formats) if formats is not None else package_formats()
+        self.format: Optional[LineFormat | JSONLineFormat] = None
+        self.pending: Optional[dict[str, Any]] = None
+
+    def match(self, line: str) -> Optional[dict[str, Any]]:
+        if self.format is not None:
+            return self.format.match(line)
+        for line_format in self.formats:
+            fields = line_format.match(line)
+            if fields is not None:
+                self.format = line_format
+                return fields
+        return None
+
+    def feed(self, line: str) -> Optional[dict[str, Any]]:
+        "The previous record, if `line` starts a new one."
+        line = line.rstrip("\r\n")
+        fields = self.match(line)
+        if fields is None:
+            if self.pending is not None:
+                self.pending["msg"] += "\n" + line
+            return None
+        previous, self.pending = self.pending, fields
+        return previous
+
+    def flush(self) -> Optional[dict[str, Any]]:
+        "The last record, once no more lines will be fed."
+        previous, self.pending = self.pending, None
+        return previous
+
+
+def parse(
+    lines: Iterable[str], formats: Optional[Sequence[LineFormat | JSONLineFormat]] = None
+) -> Iterator[dict[str, Any]]:
+    "Record dicts from lines of text, e.g. from `np_logging.rotation.read_lines()`."
+    parser = Parser(formats)
+    for line in lines:
+        record = parser.feed(line)
+        if record is not None:
+            yield record
+    record = parser.flush()
+    if record is not None:
+        yield record
+
+
+def parse_json_lines(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """Record dicts from lines written by `JSONFormatter`, e.g. from
+    `np_logging.rotation.read_lines()`, one at a time. Lines that aren't JSON objects,
+    e.g. a last line still being written, are skipped."""
+    loads = json.loads
+    for line in lines:
+        try:
+            fields = loads(line)
+        except ValueError:
+            continue
+        if isinstance(fields, dict):
+            yield json_record(fields)
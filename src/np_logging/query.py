@@ -0,0 +1,374 @@
+"""
+Indexed queries over log files and their rotated backups, e.g. "WARNING and above
+from logger `np.camera` between 10:00 and 10:30", without reading every file.
+
+    python -m np_logging.query logs/debug.log --level WARNING --logger np.camera \\
+        --since 2022-10-17T10:00 --until 2022-10-17T10:30
+
+Each file gets a compact sidecar index, in `.index` next to it, built the first time
+it's queried. Records are grouped in blocks of about 64 KB, and the index holds each
+block's byte offset and time range, plus postings: the blocks with records at each
+level, and from each logger. A query only reads the blocks that can match, with
+memory-mapped reads for plain files (compressed backups are decompressed up to the
+last block needed).
+
+Indexes are updated incrementally: a file that has grown is only indexed from where
+its index ends, and records past that are scanned directly. An index is found by a
+hash of its file's first kilobyte, as in `np_logging.ship`, so it stays valid when the file is rotated or
+compressed: a backup is never indexed twice.
+
+    >>> import logging, tempfile
+    >>> with tempfile.TemporaryDirectory() as d:
+    ...     log = pathlib.Path(d) / 'info.log'
+    ...     _ = log.write_text(
+    ...         '2022-10-17 12:00:00 np.camera WARNING cam.py:1 f MainThread | dropped frames\\n'
+    ...         '2022-10-17 12:00:01 np.sync INFO sync.py:1 f MainThread | sync ok\\n'
+    ...     )
+    ...     [fields['msg'] for _, fields in query(log, level=logging.WARNING)]
+    ...     [fields['msg'] for _, fields in query(log, logger='np')]
+    ['dropped frames']
+    ['dropped frames', 'sync ok']
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime
+import json
+import logging
+import mmap
+import os
+import pathlib
+import sys
+from typing import IO, Any, Iterable, Iterator, Optional, Sequence
+
+import np_logging.parsing
+import np_logging.rotation
+import np_logging.ship
+
+BLOCK_BYTES = 1 << 16
+INDEX_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def index_dir(base: pathlib.Path) -> pathlib.Path:
+    return base.parent / ".index"
+
+
+class Index:
+    """Sidecar index of one log file: see `np_logging.query`.
+
+    - `blocks`: `[offset, first, last]` per block: start offset and the earliest and
+      latest `created` time of its records
+    - `levels` and `loggers`: ids of blocks with records at each level, and from
+      each logger
+    - `size`: offset indexed up to, at a record boundary
+    - `complete`: whether the whole file is indexed: backups don't change
+    """
+
+    def __init__(self, path: pathlib.Path, file: pathlib.Path):
+        self.path = path
+        "Where the index is saved."
+        self.file = file
+        "Log file indexed, as of the last update: may since have been renamed."
+        self.size = 0
+        self.complete = False
+        self.format: Optional[list[Optional[str]]] = None
+        "`[fmt, datefmt]` of the records."
+        self.blocks: list[list[float]] = []
+        self.levels: dict[str, list[int]] = {}
+        self.loggers: dict[str, list[int]] = {}
+
+    @classmethod
+    def load(cls, path: pathlib.Path, file: pathlib.Path) -> Index:
+        index = cls(path, file)
+        with contextlib.suppress(OSError, ValueError, KeyError):
+            data = json.loads(path.read_text())
+            if data["version"] == INDEX_VERSION:
+                for key in ("size", "complete", "format", "blocks", "levels", "loggers"):
+                    setattr(index, key, data[key])
+        index.file = file
+        return index
+
+    def save(self) -> None:
+        data = dict(
+            version=INDEX_VERSION,
+            file=self.file.name,
+            size=self.size,
+            complete=self.complete,
+            format=self.format,
+            blocks=self.blocks,
+            levels=self.levels,
+            loggers=self.loggers,
+        )
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, separators=(",", ":")))
+            os.replace(tmp, self.path)
+        except OSError:  # e.g. read-only share: index is rebuilt next time
+            logger.debug("Could not save index %s", self.path, exc_info=True)
+
+    def line_formats(self) -> Optional[list]:
+        if self.format is None:
+            return None
+        return [np_logging.parsing.line_format(*self.format)]
+
+    def reopen_last_block(self) -> int:
+        "Remove a last block smaller than `BLOCK_BYTES`, to extend it. Returns where to index from."
+        if not self.blocks or self.size - self.blocks[-1][0] >= BLOCK_BYTES:
+            return self.size
+        last = len(self.blocks) - 1
+        for postings in (*self.levels.values(), *self.loggers.values()):
+            if postings and postings[-1] == last:
+                postings.pop()
+        self.levels = {k: v for k, v in self.levels.items() if v}
+        self.loggers = {k: v for k, v in self.loggers.items() if v}
+        return int(self.blocks.pop()[0])
+
+    def add(self, fields: dict[str, Any], offset: int) -> None:
+        "Add a record starting at `offset`."
+        created = round(fields.get("created", 0.0), 3)
+        blocks = self.blocks
+        if not blocks or offset - blocks[-1][0] >= BLOCK_BYTES:
+            blocks.append([offset, created, created])
+        block = blocks[-1]
+        if created < block[1]:
+            block[1] = created
+        elif created > block[2]:
+            block[2] = created
+        block_id = len(self.blocks) - 1
+        for postings, key in (
+            (self.levels, str(fields.get("levelno", logging.NOTSET))),
+            (self.loggers, fields.get("name")),
+        ):
+            if key is None:
+                continue
+            ids = postings.setdefault(key, [])
+            if not ids or ids[-1] != block_id:
+                ids.append(block_id)
+
+    def update(self, final: bool) -> bool:
+        """Index records added to the file since the last update. Returns whether the
+        index changed.
+
+        Unless `final`, the last record isn't indexed, in case it's still being written.
+        """
+        if self.complete:
+            return False
+        start = self.reopen_last_block()
+        parser = np_logging.parsing.Parser(self.line_formats())
+        position = record_start = start
+        with np_logging.rotation.open_bytes(self.file) as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                pending = parser.pending
+                fields = parser.feed(line.decode("utf8", "replace"))
+                if parser.pending is not pending:  # `line` starts a record
+                    if fields is not None:
+                        self.add(fields, record_start)
+                    record_start = position
+                position += len(line)
+        fields = parser.flush()
+        if fields is not None and final:
+            self.add(fields, record_start)
+            record_start = position
+        if parser.format is not None:
+            self.format = [parser.format.fmt, parser.format.datefmt]
+        changed = record_start != self.size or final
+        self.size = record_start if fields is not None else position
+        self.complete = final
+        return changed
+
+    def candidates(
+        self,
+        level: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        name: Optional[str] = None,
+    ) -> list[int]:
+        "Ids of blocks that may contain matching records."
+        ids = set(range(len(self.blocks)))
+        if level is not None:
+            ids &= {i for k, v in self.levels.items() if int(k) >= level for i in v}
+        if name is not None:
+            ids &= {
+                i for k, v in self.loggers.items() if is_descendant(k, name) for i in v
+            }
+        return sorted(
+            i
+            for i in ids
+            if (since is None or self.blocks[i][2] >= since)
+            and (until is None or self.blocks[i][1] <= until)
+        )
+
+    def ranges(self, ids: Iterable[int]) -> list[tuple[int, int]]:
+        "Byte ranges of blocks `ids`, with adjacent blocks merged."
+        ranges: list[tuple[int, int]] = []
+        for i in ids:
+            start = int(self.blocks[i][0])
+            end = int(self.blocks[i + 1][0]) if i + 1 < len(self.blocks) else self.size
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+
+def is_descendant(name: str, ancestor: str) -> bool:
+    "Whether logger `name` is `ancestor` or below it, e.g. `np.camera` below `np`."
+    return name == ancestor or name.startswith(ancestor + ".") or ancestor in ("", "root")
+
+
+def get_index(file: pathlib.Path, base: pathlib.Path, final: bool) -> Optional[Index]:
+    "Up-to-date index of `file`, a backup of log file `base` or `base` itself."
+    head = np_logging.ship.head(file)
+    if not head:
+        return None
+    key = np_logging.ship.fingerprint(head)[:16]
+    index = Index.load(index_dir(base) / f"{base.name}.{key}.json", file)
+    if not np_logging.rotation.is_compressed(file) and file.stat().st_size < index.size:
+        index = Index(index.path, file)  # truncated, or another file with the same start
+    if index.update(final):
+        index.save()
+    return index
+
+
+def remove_stale_indexes(base: pathlib.Path, keep: Iterable[pathlib.Path]) -> None:
+    "Delete indexes of `base`'s files that no longer exist."
+    keep = set(keep)
+    for path in index_dir(base).glob(f"{np_logging.rotation.glob_escape(base.name)}.*.json"):
+        if path not in keep:
+            with contextlib.suppress(OSError):
+                path.unlink()
+
+
+def read_ranges(file: pathlib.Path, ranges: list[tuple[int, int]]) -> Iterator[bytes]:
+    "Bytes in each of `ranges`, in order: memory-mapped for plain files."
+    if not ranges:
+        return
+    with np_logging.rotation.open_bytes(file) as f:
+        if np_logging.rotation.is_compressed(file):
+            for start, end in ranges:
+                f.seek(start)
+                yield f.read(end - start)
+            return
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start, end in ranges:
+                yield mapped[start : min(end, size)]
+
+
+def read_tail(file: pathlib.Path, offset: int) -> bytes:
+    "Complete lines past `offset`."
+    with np_logging.rotation.open_bytes(file) as f:
+        f.seek(offset)
+        data = f.read()
+    return data[: data.rfind(b"\n") + 1]
+
+
+def records(
+    lines: Iterable[str], parser: np_logging.parsing.Parser
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    "`(text, fields)` for each record in `lines`."
+    text: list[str] = []
+    for line in lines:
+        fields = parser.feed(line)
+        if fields is not None:
+            yield "".join(text), fields
+            text = []
+        if parser.pending is not None:
+            text.append(line)
+    fields = parser.flush()
+    if fields is not None:
+        yield "".join(text), fields
+
+
+def query(
+    paths: str | pathlib.Path | Sequence[str | pathlib.Path],
+    level: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    logger: Optional[str] = None,
+) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Records in log files `paths` and their backups, oldest first, that are at
+    `level` or above, were created between `since` and `until` (as from `time.time()`)
+    and are from `logger` or its descendants.
+
+    Yields `(text, fields)`: each record's text, as in the file, and the fields
+    parsed from it (see `np_logging.parsing`).
+    """
+    if isinstance(paths, (str, pathlib.Path)):
+        paths = [paths]
+
+    def matches(fields: dict[str, Any]) -> bool:
+        created = fields.get("created")
+        return (
+            (level is None or fields.get("levelno", logging.NOTSET) >= level)
+            and (since is None or created is None or created >= since)
+            and (until is None or created is None or created <= until)
+            and (logger is None or is_descendant(fields.get("name") or "", logger))
+        )
+
+    for base in map(pathlib.Path, paths):
+        base = base.resolve()
+        files = np_logging.rotation.list_segments(base)
+        if base.exists():
+            files.append(base)
+        indexes = []
+        for file in files:
+            try:
+                index = get_index(file, base, final=file != base)
+            except FileNotFoundError:  # pruned since listed
+                continue
+            if index is None:
+                continue
+            indexes.append(index.path)
+            ranges = index.ranges(index.candidates(level, since, until, logger))
+            chunks = list(read_ranges(file, ranges)) + [read_tail(file, index.size)]
+            for chunk in chunks:
+                parser = np_logging.parsing.Parser(index.line_formats())
+                lines = chunk.decode("utf8", "replace").splitlines(True)
+                for text, fields in records(lines, parser):
+                    if matches(fields):
+                        yield text, fields
+        remove_stale_indexes(base, indexes)
+
+
+def parse_time(value: str) -> float:
+    "Seconds since the epoch from an ISO 8601 date/time, in local time, or a number."
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m np_logging.query", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("paths", nargs="+", help="log files: backups are included")
+    parser.add_argument("--level", help="e.g. WARNING: records at this level or above")
+    parser.add_argument("--since", type=parse_time, help="e.g. 2022-10-17T10:00")
+    parser.add_argument("--until", type=parse_time, help="e.g. 2022-10-17T10:30")
+    parser.add_argument("--logger", help="records from this logger or below it")
+    parser.add_argument("--count", action="store_true", help="only print the number found")
+    args = parser.parse_args(argv)
+
+    level = None if args.level is None else np_logging.parsing.level_number(args.level.upper())
+    found = query(args.paths, level, args.since, args.until, args.logger)
+    if args.count:
+        print(sum(1 for _ in found))
+        return
+    with contextlib.suppress(BrokenPipeError):
+        for text, _ in found:
+            sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Applying a logging config dict again without rebuilding what hasn't changed.
+
+`logging.config.dictConfig` closes every handler and builds them all again, so
+files are reopened, connections to the log server are dropped and remade, and
+buffered or queued records can be lost. `apply(config)` instead compares the
+config with the one last applied, and with the handlers currently on loggers:
+
+- a handler whose settings are unchanged is kept, with its open files, sockets,
+  buffers and threads; a changed level, formatter or filters is set on it in place
+- a handler whose other settings changed, whose level was removed (leaving the
+  level it sets itself, as `dictConfig` would), or that's new, is built; handlers
+  replaced or no longer configured are closed once loggers have switched over
+- loggers' levels, `propagate` and handlers are only set where they differ, and
+  loggers that are no longer configured are reset. Unlike `dictConfig`, other
+  existing loggers are never disabled
+
+The first call uses `dictConfig`, as does a config that can't be applied
+incrementally (the stdlib's own `incremental: true` mode, or handlers that refer
+to other handlers).
+
+    >>> config = {
+    ...     'version': 1,
+    ...     'handlers': {'h': {'class': 'logging.NullHandler', 'level': 'INFO'}},
+    ...     'loggers': {'doctest_reconfigure': {'handlers': ['h']}},
+    ...     'disable_existing_loggers': False,
+    ... }
+    >>> apply(config)['built']
+    ['h']
+    >>> handler = logging.getLogger('doctest_reconfigure').handlers[0]
+    >>> config['handlers']['h']['level'] = 'DEBUG'
+    >>> apply(config)
+    {'built': [], 'kept': ['h'], 'closed': []}
+    >>> logging.getLogger('doctest_reconfigure').handlers[0] is handler
+    True
+"""
+from __future__ import annotations
+
+import copy
+import logging
+import logging.config
+import threading
+from typing import Any, Optional
+
+_applied: dict[str, tuple] = {}
+"Settings each configured handler was last built or updated from, by name."
+_loggers: dict[str, tuple] = {}
+"Settings each configured logger was last set from, by name."
+_lock = threading.Lock()
+
+ROOT = "root"
+
+
+def handler_settings(config: dict[str, Any], name: str) -> tuple:
+    """`(core, level, formatter, filters)` for handler `name`: a change in `core`
+    settings means it must be rebuilt."""
+    handler = dict(config["handlers"][name])
+    level = handler.pop("level", None)
+    formatter = handler.pop("formatter", None)
+    filters = handler.pop("filters", [])
+    return (
+        copy.deepcopy(handler),
+        level,
+        copy.deepcopy(config.get("formatters", {}).get(formatter)),
+        copy.deepcopy([config.get("filters", {}).get(_) for _ in filters]),
+    )
+
+
+def logger_configs(config: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    loggers = dict(config.get("loggers", {}))
+    if "root" in config:
+        loggers[ROOT] = config["root"]
+    return loggers
+
+
+def logger_settings(logger_config: dict[str, Any]) -> tuple:
+    return copy.deepcopy(
+        (
+            logger_config.get("level"),
+            logger_config.get("propagate"),
+            list(logger_config.get("handlers", [])),
+            list(logger_config.get("filters", [])),
+        )
+    )
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(None if name == ROOT else name)
+
+
+def updatable(config: dict[str, Any]) -> bool:
+    "Whether `config` can be applied by `apply()` without `dictConfig`."
+    return not config.get("incremental", False) and not any(
+        "target" in _ for _ in config.get("handlers", {}).values()
+    )
+
+
+def live_handlers() -> dict[str, logging.Handler]:
+    "Named handlers currently on loggers, by name."
+    live = {}
+    for _logger in [logging.getLogger()] + list(logging.root.manager.loggerDict.values()):
+        for handler in getattr(_logger, "handlers", []):
+            if handler.name:
+                live.setdefault(handler.name, handler)
+    return live
+
+
+def full(config: dict[str, Any]) -> dict[str, list[str]]:
+    logging.config.dictConfig(config)
+    _applied.clear()
+    _loggers.clear()
+    if updatable(config):
+        _applied.update(
+            (name, handler_settings(config, name)) for name in config.get("handlers", {})
+        )
+        _loggers.update(
+            (name, logger_settings(_)) for name, _ in logger_configs(config).items()
+        )
+    return {"built": list(config.get("handlers", {})), "kept": [], "closed": []}
+
+
+def apply(config: dict[str, Any], incremental: bool = True) -> dict[str, list[str]]:
+    """Apply a logging config dict, rebuilding only what changed since the last
+    call: see `np_logging.reconfigure`. Returns names of handlers built, kept and
+    closed."""
+    with _lock:
+        if not incremental or not _applied or not updatable(config):
+            return full(config)
+        return update(config)
+
+
+def update(config: dict[str, Any]) -> dict[str, list[str]]:
+    configurator = logging.config.DictConfigurator(config)
+    converted = configurator.config
+
+    def formatter(name: Optional[str]) -> Optional[logging.Formatter]:
+        if name is None:
+            return None
+        if isinstance(converted["formatters"][name], dict):
+            converted["formatters"][name] = configurator.configure_formatter(
+                converted["formatters"][name]
+            )
+        return converted["formatters"][name]
+
+    def filter(name: str) -> logging.Filter:
+        if isinstance(converted["filters"][name], dict):
+            converted["filters"][name] = configurator.configure_filter(
+                converted["filters"][name]
+            )
+        return converted["filters"][name]
+
+    live = live_handlers()
+    handlers: dict[str, logging.Handler] = {}
+    built, kept = [], []
+    for name, handler_config in config.get("handlers", {}).items():
+        settings = handler_settings(config, name)
+        previous = _applied.get(name)
+        handler = live.get(name)
+        level_removed = (
+            previous is not None and previous[1] is not None and settings[1] is None
+        )
+        if (
+            handler is not None
+            and previous is not None
+            and previous[0] == settings[0]
+            and not level_removed
+        ):
+            if settings[1] != previous[1]:
+                handler.setLevel(logging._checkLevel(settings[1]))
+            if settings[2] != previous[2]:
+                handler.setFormatter(formatter(handler_config.get("formatter")))
+            if settings[3] != previous[3]:
+                handler.filters = [filter(_) for _ in handler_config.get("filters", [])]
+            kept.append(name)
+        else:
+            formatter(handler_config.get("formatter"))
+            for _ in handler_config.get("filters", []):
+                filter(_)
+            handler = configurator.configure_handler(converted["handlers"][name])
+            handler.name = name
+            built.append(name)
+        handlers[name] = handler
+        _applied[name] = settings
+
+    replaced = [h for h in live.values() if h not in handlers.values()]
+    removed: list[logging.Handler] = []
+    loggers = logger_configs(config)
+    for name, logger_config in loggers.items():
+        settings = logger_settings(logger_config)
+        _logger = get_logger(name)
+        _logger.disabled = False
+        if settings[0] is not None:
+            level = logging._checkLevel(settings[0])
+            if _logger.level != level:
+                _logger.setLevel(level)
+        if settings[1] is not None and name != ROOT:
+            _logger.propagate = settings[1]
+        wanted = [handlers[_] for _ in settings[2]]
+        for handler in list(_logger.handlers):
+            if handler not in wanted:
+                _logger.removeHandler(handler)
+                removed.append(handler)
+        for handler in wanted:
+            if handler not in _logger.handlers:
+                _logger.addHandler(handler)
+        if _loggers.get(name, (None,) * 4)[3] != settings[3]:
+            _logger.filters = [filter(_) for _ in settings[3]]
+        _loggers[name] = settings
+    for name in [_ for _ in _loggers if _ not in loggers]:
+        del _loggers[name]
+        if name == ROOT:  # as with `dictConfig`, root is left as it is
+            continue
+        _logger = get_logger(name)
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+            removed.append(handler)
+        _logger.setLevel(logging.NOTSET)
+        _logger.propagate = True
+        _logger.filters = []
+    for name in [_ for _ in _applied if _ not in handlers]:
+        del _applied[name]
+
+    closed = []
+    attached = set(live_handlers().values())
+    for handler in dict.fromkeys(replaced + removed):
+        if handler not in attached:
+            handler.close()
+            closed.append(handler.name)
+    for name, handler in handlers.items():
+        # `close()` unregisters a handler by name, even if a successor has taken it
+        handler.name = name
+    return {"built": built, "kept": kept, "closed": closed}
@@ -0,0 +1,267 @@
+"""
+Rotation schemes for `FileHandler` and `ServerBackupHandler`.
+
+- `classic`: the stdlib scheme - `info.log` is renamed `info.log.1`, after
+  renaming every existing backup `.n` to `.n+1`: up to `backupCount` renames
+  per rollover
+- `sequence`: `info.log` is renamed `info.log.000042`, numbered in order
+- `timestamp`: `info.log` is renamed `info.log.20221017T120000.123456`
+
+`sequence` and `timestamp` rollovers are a single close, rename and open.
+Backups beyond `backupCount` are deleted by a background pruner thread.
+
+With `compression` (`gzip` or `xz`, for `sequence` and `timestamp` only), the
+pruner thread also compresses backups, e.g. to `info.log.000042.gz`, keeping their
+modification times, before deleting the oldest: `backupCount` counts compressed
+backups. `open_segment()` and `read_lines()` read plain and compressed backups alike.
+
+`list_segments()` returns backups of any scheme in order, oldest first:
+    >>> import pathlib, tempfile
+    >>> with tempfile.TemporaryDirectory() as d:
+    ...     for name in ('info.log.2', 'info.log.1', 'info.log.000001', 'info.log.000002', 'info.log'):
+    ...         _ = (pathlib.Path(d) / name).write_text('')
+    ...     [_.name for _ in list_segments(pathlib.Path(d) / 'info.log')]
+    ['info.log.2', 'info.log.1', 'info.log.000001', 'info.log.000002']
+    >>> with tempfile.TemporaryDirectory() as d:
+    ...     for name in ('info.log.000002', 'info.log.000001.gz', 'info.log.000001'):
+    ...         _ = (pathlib.Path(d) / name).write_text('')
+    ...     [_.name for _ in list_segments(pathlib.Path(d) / 'info.log')]
+    ['info.log.000001.gz', 'info.log.000002']
+"""
+from __future__ import annotations
+
+import contextlib
+import datetime
+import gzip
+import logging
+import lzma
+import os
+import pathlib
+import queue
+import re
+import shutil
+import threading
+from typing import IO, Iterator, Optional
+
+ROTATIONS = ("classic", "sequence", "timestamp")
+SEQUENCE_WIDTH = 6
+"Sequence numbers are zero-padded, to distinguish them from `classic` numbers."
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S.%f"
+
+COMPRESSIONS = {"gzip": (".gz", gzip.open), "xz": (".xz", lzma.open)}
+"Compression methods for backups: file extension and `open()` function."
+
+SEGMENT_SUFFIX = re.compile(
+    r"\.(?P<suffix>\d+|\d{8}T\d{6}\.\d{6})(?P<extension>\.gz|\.xz)?$"
+)
+
+logger = logging.getLogger(__name__)
+
+
+def segment_key(path: pathlib.Path, base_name: str) -> Optional[tuple]:
+    "Sort key for a backup segment of `base_name`, or `None` if `path` isn't one."
+    match = SEGMENT_SUFFIX.search(path.name)
+    if match is None or path.name[: match.start()] != base_name:
+        return None
+    suffix = match["suffix"]
+    if "T" in suffix:
+        return (1, suffix)
+    if len(suffix) < SEQUENCE_WIDTH:  # classic: oldest has highest number
+        return (0, -int(suffix))
+    return (2, int(suffix))
+
+
+def list_segments(base: str | pathlib.Path) -> list[pathlib.Path]:
+    """Rotated backups of log file `base`, oldest first.
+
+    If a backup exists both plain and compressed, compression has finished but the
+    plain file hasn't been deleted yet: only the compressed file is listed.
+    """
+    base = pathlib.Path(base)
+    segments: dict[tuple, pathlib.Path] = {}
+    for path in base.parent.glob(f"{glob_escape(base.name)}.*"):
+        key = segment_key(path, base.name)
+        if key is not None and (key not in segments or is_compressed(path)):
+            segments[key] = path
+    return [segments[key] for key in sorted(segments)]
+
+
+def is_compressed(path: pathlib.Path) -> bool:
+    return path.suffix in (".gz", ".xz")
+
+
+def open_segment(path: str | pathlib.Path, encoding: str = "utf8") -> IO[str]:
+    "Open a plain or compressed log file for reading text."
+    path = pathlib.Path(path)
+    for extension, opener in COMPRESSIONS.values():
+        if path.suffix == extension:
+            return opener(path, "rt", encoding=encoding, errors="replace")
+    return open(path, encoding=encoding, errors="replace")
+
+
+def open_bytes(path: str | pathlib.Path) -> IO[bytes]:
+    "Open a plain or compressed log file for reading bytes."
+    path = pathlib.Path(path)
+    for extension, opener in COMPRESSIONS.values():
+        if path.suffix == extension:
+            return opener(path, "rb")
+    return open(path, "rb")
+
+
+def read_lines(
+    base: str | pathlib.Path, include_current: bool = True, encoding: str = "utf8"
+) -> Iterator[str]:
+    """Lines of all backups of log file `base`, oldest first, then of `base` itself.
+
+    Backups deleted by the pruner after being listed are skipped.
+    """
+    paths = list_segments(base)
+    if include_current:
+        paths.append(pathlib.Path(base))
+    for path in paths:
+        for candidate in moved(path):
+            try:
+                stream = open_segment(candidate, encoding)
+            except FileNotFoundError:
+                continue
+            with stream:
+                yield from stream
+            break
+
+
+def moved(path: pathlib.Path) -> list[pathlib.Path]:
+    "`path`, and where it would be if compressed since it was listed."
+    if is_compressed(path):
+        return [path]
+    return [path] + [path.with_name(path.name + ext) for ext, _ in COMPRESSIONS.values()]
+
+
+def compress(path: pathlib.Path, compression: str) -> pathlib.Path:
+    """Compress backup `path`, keeping its modification time, then delete it.
+
+    The compressed file appears complete or not at all.
+    """
+    extension, opener = COMPRESSIONS[compression]
+    target = path.with_name(path.name + extension)
+    tmp = path.with_name(f"{target.name}.tmp")
+    stat = path.stat()
+    with open(path, "rb") as src, opener(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.utime(tmp, (stat.st_atime, stat.st_mtime))
+    os.replace(tmp, target)
+    with contextlib.suppress(OSError):  # e.g. open on Windows: pruned later
+        path.unlink()
+    return target
+
+
+def glob_escape(name: str) -> str:
+    return re.sub(r"([\[\]*?])", r"[\1]", name)
+
+
+class Pruner(threading.Thread):
+    """Compresses backups, and deletes the oldest beyond a handler's `backupCount`,
+    off the logging thread."""
+
+    def __init__(self):
+        super().__init__(name="np_logging rotation pruner", daemon=True)
+        self.requests: queue.Queue[tuple[str, int, Optional[str]]] = queue.Queue()
+        self.start()
+
+    def run(self) -> None:
+        while True:
+            base, backup_count, compression = self.requests.get()
+            try:
+                if compression:
+                    self.compress(base, compression)
+                self.prune(base, backup_count)
+            except Exception:
+                logger.debug("Could not prune backups of %s", base, exc_info=True)
+            finally:
+                self.requests.task_done()
+
+    @staticmethod
+    def compress(base: str, compression: str) -> None:
+        for path in list_segments(base):
+            if not is_compressed(path):
+                try:
+                    compress(path, compression)
+                except FileNotFoundError:  # pruned by another process
+                    continue
+
+    @staticmethod
+    def prune(base: str, backup_count: int) -> None:
+        segments = list_segments(base)
+        for path in segments[: max(0, len(segments) - backup_count)]:
+            paths = [path]
+            if is_compressed(path):  # and any plain copy left behind
+                paths.append(path.with_suffix(""))
+            for _ in paths:
+                with contextlib.suppress(OSError):
+                    _.unlink()
+
+
+_pruner: Optional[Pruner] = None
+_pruner_lock = threading.Lock()
+
+
+def pruner() -> Pruner:
+    global _pruner
+    with _pruner_lock:
+        if _pruner is None:
+            _pruner = Pruner()
+        return _pruner
+
+
+class SegmentRotationMixin:
+    """For `logging.handlers.RotatingFileHandler` subclasses: adds `sequence` and
+    `timestamp` rotation schemes. Call `init_rotation()` after `__init__`."""
+
+    rotation: str = "classic"
+    compression: Optional[str] = None
+
+    def init_rotation(
+        self, rotation: str = "classic", compression: Optional[str] = None
+    ) -> None:
+        if rotation not in ROTATIONS:
+            raise ValueError(f"rotation should be one of {ROTATIONS}, not {rotation!r}")
+        if compression and compression not in COMPRESSIONS:
+            raise ValueError(
+                f"compression should be one of {tuple(COMPRESSIONS)}, not {compression!r}"
+            )
+        if compression and rotation == "classic":
+            raise ValueError(
+                "compression requires 'sequence' or 'timestamp' rotation: "
+                "'classic' renames every backup on rollover"
+            )
+        self.rotation = rotation
+        self.compression = compression or None
+        self.sequence = 0
+        self.timestamp = datetime.datetime.min
+        if rotation == "sequence":
+            base_name = pathlib.Path(self.baseFilename).name
+            keys = (segment_key(_, base_name) for _ in list_segments(self.baseFilename))
+            self.sequence = max((key[1] for key in keys if key[0] == 2), default=0)
+
+    def next_segment_name(self) -> str:
+        if self.rotation == "sequence":
+            self.sequence += 1
+            return f"{self.baseFilename}.{self.sequence:0{SEQUENCE_WIDTH}d}"
+        self.timestamp = max(
+            datetime.datetime.now(),
+            self.timestamp + datetime.timedelta(microseconds=1),
+        )
+        return f"{self.baseFilename}.{self.timestamp.strftime(TIMESTAMP_FORMAT)}"
+
+    def doRollover(self) -> None:
+        if self.rotation == "classic":
+            return super().doRollover()
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename):
+            self.rotate(
+                self.baseFilename, self.rotation_filename(self.next_segment_name())
+            )
+        if not self.delay:
+            self.stream = self._open()
+        pruner().requests.put((self.baseFilename, self.backupCount, self.compression))
@@ -0,0 +1,340 @@
+"""
+Receiver for records sent by `ServerHandler`, `BatchServerHandler` and
+`logging.handlers.SocketHandler`: a stand-in for the eng-mindscope log server, a
+local relay on a rig, or a sink for load tests and spool replays.
+
+    python -m np_logging.server --port 9000 --file logs/server.log
+    python -m np_logging.server --port 9000 --forward eng-mindscope:9000 --compress
+
+Connections are served by asyncio, so thousands can be open at once. Frames are
+decoded with `np_logging.wire.FrameDecoder` (including compressed batches), and
+records are written to rotating files and/or forwarded upstream in batches on a
+background thread, so slow disks or upstream servers don't hold up receiving.
+The ingest rate is logged every `--report-interval` seconds.
+
+In tests and benchmarks, run a receiver on a loopback port with `ThreadedLogServer`:
+    >>> import logging.handlers
+    >>> server = ThreadedLogServer(keep=True)
+    >>> handler = logging.handlers.SocketHandler(server.host, server.port)
+    >>> handler.emit(logging.makeLogRecord({'msg': 'hello'}))
+    >>> handler.close()
+    >>> server.join()
+    True
+    >>> [r['msg'] for r in server.records]
+    ['hello']
+    >>> server.close()
+
+Like the stdlib's socket receiver, records are unpickled, so only listen on
+trusted networks: by default, the receiver only accepts connections from this
+machine. Pass `--host 0.0.0.0` (or a specific interface) to accept others.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import queue
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+import np_logging.wire
+
+DEFAULT_PORT = 9000
+READ_BYTES = 1 << 16
+BACKLOG = 4096
+MAX_BATCHES = 10_000
+"Batches of received records waiting for handlers, beyond which new ones are dropped."
+
+logger = logging.getLogger(__name__)
+
+
+class Sinks(threading.Thread):
+    """Passes batches of received records to handlers, off the event loop.
+
+    Missing fields expected by np_logging's formatters are filled with `None`. A
+    record that fails to be handled is logged, and the rest carry on.
+    """
+
+    FIELDS = ("project", "comp_id", "rig_name", "hostname", "version")
+
+    def __init__(
+        self, handlers: Sequence[logging.Handler], max_batches: int = MAX_BATCHES
+    ):
+        super().__init__(name="np_logging server sinks", daemon=True)
+        self.handlers = tuple(handlers)
+        self.batches: queue.Queue = queue.Queue(max_batches)
+        self.dropped = 0
+        "Records discarded because `max_batches` batches were waiting."
+
+    def put(self, batch: list[dict[str, Any]]) -> None:
+        "Queue a batch without waiting: dropped if the handlers have fallen behind."
+        try:
+            self.batches.put_nowait(batch)
+        except queue.Full:
+            if not self.dropped:
+                logger.warning("Handlers can't keep up: dropping records")
+            self.dropped += len(batch)
+
+    def run(self) -> None:
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                break
+            for fields in batch:
+                try:
+                    self.handle(fields)
+                except Exception:
+                    logger.exception("Failed to handle record %r", fields.get("msg"))
+        for handler in self.handlers:
+            handler.close()
+
+    def handle(self, fields: dict[str, Any]) -> None:
+        for field in self.FIELDS:
+            fields.setdefault(field, None)
+        record = logging.makeLogRecord(fields)
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        "Stop after handling all records received, and close the handlers."
+        self.batches.put(None)
+        self.join(timeout)
+
+
+class LogServer:
+    """Receives records on `host:port` and passes them to `handlers` on a background
+    thread. With `keep=True`, received record dicts are also appended to
+    `records`. If the handlers fall behind by `max_batches` batches, new records
+    are dropped and counted in `stats()`."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        handlers: Sequence[logging.Handler] = (),
+        keep: bool = False,
+        max_batches: int = MAX_BATCHES,
+    ):
+        self.host = host
+        self.port = port
+        self.sinks = Sinks(handlers, max_batches) if handlers else None
+        self.keep = keep
+        self.records: list[dict[str, Any]] = []
+        self.received = 0
+        self.bytes = 0
+        self.reads = 0
+        self.connections = 0
+        self.open_connections = 0
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.changed: Optional[asyncio.Condition] = None
+
+    async def start(self) -> None:
+        self.changed = asyncio.Condition()
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, backlog=BACKLOG
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        if self.sinks is not None:
+            self.sinks.start()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        self.open_connections += 1
+        decoder = np_logging.wire.FrameDecoder()
+        try:
+            while True:
+                data = await reader.read(READ_BYTES)
+                if not data:
+                    break
+                self.reads += 1
+                self.bytes += len(data)
+                try:
+                    records = decoder.feed(data)
+                except Exception:
+                    logger.warning(
+                        "Closing connection from %s: undecodable data",
+                        writer.get_extra_info("peername"),
+                    )
+                    break
+                if records:
+                    self.received += len(records)
+                    if self.keep:
+                        self.records.extend(records)
+                    if self.sinks is not None:
+                        self.sinks.put(records)
+                    async with self.changed:
+                        self.changed.notify_all()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self.open_connections -= 1
+            async with self.changed:
+                self.changed.notify_all()
+
+    def stats(self) -> dict[str, int]:
+        return dict(
+            records=self.received,
+            bytes=self.bytes,
+            connections=self.connections,
+            open_connections=self.open_connections,
+            dropped=self.sinks.dropped if self.sinks is not None else 0,
+        )
+
+    async def report_periodically(self, interval: float) -> None:
+        last, t_last = self.received, time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            logger.info(
+                "%.0f records/s, %s",
+                (self.received - last) / (now - t_last),
+                self.stats(),
+            )
+            last, t_last = self.received, now
+
+    async def serve_forever(self, report_interval: Optional[float] = None) -> None:
+        await self.start()
+        logger.info("Receiving log records on %s:%d", self.host, self.port)
+        if report_interval:
+            asyncio.ensure_future(self.report_periodically(report_interval))
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.sinks is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.sinks.stop)
+
+
+class ThreadedLogServer(LogServer):
+    "`LogServer` running on its own event loop thread: for tests and benchmarks."
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="np_logging log server", daemon=True
+        )
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self.loop).result()
+
+    def wait_for(self, n: int, timeout: float = 60) -> bool:
+        "Wait until at least `n` records have been received."
+
+        async def wait():
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.received >= n)
+
+        return self.run_until(wait(), timeout)
+
+    def join(self, timeout: float = 5) -> bool:
+        "Wait until a client has connected, and all connections have closed."
+
+        async def wait():
+            async with self.changed:
+                await self.changed.wait_for(
+                    lambda: self.connections and not self.open_connections
+                )
+
+        return self.run_until(wait(), timeout)
+
+    def run_until(self, coro, timeout: float) -> bool:
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(coro, timeout), self.loop
+        )
+        try:
+            future.result()
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def close(self) -> None:
+        if self.loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "localhost", int(port)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m np_logging.server", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="interface to listen on: records are unpickled, so only trusted networks",
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--file", help="write records to this rotating log file")
+    parser.add_argument("--max-bytes", type=int, default=100 * 1024**2)
+    parser.add_argument("--backup-count", type=int, default=100)
+    parser.add_argument(
+        "--rotation", default="sequence", choices=("classic", "sequence", "timestamp")
+    )
+    parser.add_argument(
+        "--compression", choices=("gzip", "xz"), help="compress rotated files"
+    )
+    parser.add_argument("--json-lines", action="store_true", help="write records as JSON")
+    parser.add_argument("--forward", metavar="HOST:PORT", help="relay records upstream")
+    parser.add_argument("--compress", action="store_true", help="compress forwarded batches")
+    parser.add_argument("--spool", action="store_true", help="spool forwarded records to disk")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    import np_logging.handlers
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(message)s")
+    handlers: list[logging.Handler] = []
+    if args.file:
+        handlers.append(
+            np_logging.handlers.ServerBackupHandler(
+                filename=args.file,
+                maxBytes=args.max_bytes,
+                backupCount=args.backup_count,
+                rotation=args.rotation,
+                compression=args.compression,
+                json_lines=args.json_lines,
+                delay=True,
+            )
+        )
+    if args.forward:
+        host, port = parse_address(args.forward)
+        handlers.append(
+            np_logging.handlers.BatchServerHandler(
+                host=host,
+                port=port,
+                compress=args.compress,
+                spool=args.spool,
+                backup=logging.NullHandler(),
+                level=logging.NOTSET,
+            )
+        )
+    server = LogServer(args.host, args.port, handlers)
+
+    async def serve():
+        try:
+            await server.serve_forever(args.report_interval)
+        finally:
+            await server.stop()
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+Backfill shipper: sends records from log files to the log server, e.g. after the
+server was unreachable and records only reached `logs/*.log` or the server backup
+file.
+
+    python -m np_logging.ship logs/debug.log
+    python -m np_logging.ship //allen/.../eng-mindscope_backup.log --follow
+
+Each file is read with its rotated backups, oldest first, plain or compressed
+(see `np_logging.rotation`). Records are parsed back from the text written with
+the package config's formats (see `np_logging.parsing`) and sent in large batches.
+After each batch is sent, the position reached is checkpointed: a hash of the first
+bytes of the file being read, to find it again after it's rotated or compressed,
+and a byte offset within it. A restarted shipper continues from its checkpoint.
+
+With `--follow`, files are polled for new records: between polls only the current
+file is `stat`ed, and backups are only listed again after a rollover.
+
+Delivery is at-least-once, as with `np_logging.spool`. The files written by one
+`FileHandler` per level overlap (debug.log has everything in info.log), so ship
+one of them.
+
+Library use:
+    >>> import logging, tempfile
+    >>> from np_logging.server import ThreadedLogServer
+    >>> with tempfile.TemporaryDirectory() as d:
+    ...     log = pathlib.Path(d) / 'info.log'
+    ...     _ = log.write_text('2022-10-17 12:00:00 np WARNING test.py:1 f MainThread | shipped\\n')
+    ...     server = ThreadedLogServer(keep=True)
+    ...     ship([log], server.host, server.port, checkpoint_dir=d)
+    ...     ship([log], server.host, server.port, checkpoint_dir=d)  # nothing new
+    ...     server.wait_for(1)
+    ...     server.close()
+    1
+    0
+    True
+    >>> [(r['levelname'], r['msg']) for r in server.records]
+    [('WARNING', 'shipped')]
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import socket
+import threading
+from typing import Any, Iterable, Optional, Sequence
+
+import np_logging.parsing
+import np_logging.rotation
+import np_logging.wire
+
+HEAD_BYTES = 1024
+"Bytes at the start of a file hashed to recognize it after it's renamed or compressed."
+BATCH_BYTES = 1 << 20
+POLL_INTERVAL = 1.0
+RETRY_MAX = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+def head(path: pathlib.Path, size: int = HEAD_BYTES) -> bytes:
+    with np_logging.rotation.open_bytes(path) as f:
+        return f.read(size)
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def log_files(paths: Iterable[str | pathlib.Path]) -> list[pathlib.Path]:
+    "`paths`, with directories replaced by the `*.log` files in them."
+    files = []
+    for path in map(pathlib.Path, paths):
+        if path.is_dir():
+            files.extend(sorted(_ for _ in path.glob("*.log") if _.is_file()))
+        else:
+            files.append(path)
+    return files
+
+
+class Sender:
+    "Sends batches of frames to the log server over one connection, opened when needed."
+
+    def __init__(self, host: str, port: int, compress: bool = False, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.compress = compress
+        self.timeout = timeout
+        self.sock: Optional[socket.socket] = None
+
+    def send(self, frames: list[bytes]) -> None:
+        "Raises `OSError` if not sent: the connection is closed, to retry later."
+        data = b"".join(frames)
+        if self.compress:
+            data = np_logging.wire.compress(data)
+        try:
+            if self.sock is None:
+                self.sock = socket.create_connection((self.host, self.port), self.timeout)
+            self.sock.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self.sock is not None:
+            with contextlib.suppress(OSError):
+                self.sock.close()
+            self.sock = None
+
+
+class Shipper:
+    """Ships records from log file `base` and its backups, from a checkpoint in
+    `checkpoint_dir`.
+
+    Records are sent with `fields`, e.g. `project`, where not parsed from the file.
+    Records below `level` are skipped.
+    """
+
+    def __init__(
+        self,
+        base: str | pathlib.Path,
+        sender: Sender,
+        checkpoint_dir: str | pathlib.Path,
+        fields: Optional[dict[str, Any]] = None,
+        level: int = logging.NOTSET,
+        batch_bytes: int = BATCH_BYTES,
+        encoding: str = "utf8",
+    ):
+        self.base = pathlib.Path(base).resolve()
+        self.sender = sender
+        self.template = dict(
+            logging.LogRecord(None, None, "", 0, "", (), None).__dict__,
+            **(fields or {}),
+            args=None,
+            exc_info=None,
+        )
+        "Attributes of every record sent, where not parsed from the file."
+        self.level = level
+        self.batch_bytes = batch_bytes
+        self.encoding = encoding
+        key = fingerprint(f"{self.base} {sender.host}:{sender.port}".encode())[:12]
+        self.checkpoint_file = pathlib.Path(checkpoint_dir) / f"{self.base.name}.{key}.json"
+        self.checkpoint: Optional[dict[str, Any]] = self.read_checkpoint()
+        self.sent = 0
+        "Number of records sent."
+        self.last_seen: Optional[tuple[int, int]] = None
+        "`(inode, size)` of `base` after the last step."
+        self.holding = False
+        "Whether the last record in `base` was held back, in case it's still being written."
+
+    def read_checkpoint(self) -> Optional[dict[str, Any]]:
+        with contextlib.suppress(OSError, ValueError):
+            return json.loads(self.checkpoint_file.read_text())
+        return None
+
+    def commit(self, path: pathlib.Path, head: bytes, offset: int) -> None:
+        "Record that records in `path` before `offset` were sent."
+        self.checkpoint = dict(
+            path=str(path),
+            head=fingerprint(head),
+            head_bytes=len(head),
+            offset=offset,
+            time=path.stat().st_mtime,
+        )
+        self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.checkpoint_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.checkpoint))
+        os.replace(tmp, self.checkpoint_file)
+
+    def is_checkpointed(self, path: pathlib.Path) -> bool:
+        "Whether `path` is the file the checkpoint is in, possibly since renamed."
+        checkpoint = self.checkpoint
+        data = head(path, checkpoint["head_bytes"])
+        return len(data) == checkpoint["head_bytes"] and fingerprint(data) == checkpoint["head"]
+
+    def unsent(self, rotated: bool = True) -> list[tuple[pathlib.Path, int]]:
+        """Files with records not yet sent, oldest first, and the offsets to start at.
+
+        If `base` hasn't `rotated` since the checkpoint was made in it, backups aren't listed.
+        """
+        checkpoint = self.checkpoint
+        if checkpoint is not None and not rotated and checkpoint["path"] == str(self.base):
+            return [(self.base, checkpoint["offset"])]
+        paths = np_logging.rotation.list_segments(self.base)
+        if self.base.exists():
+            paths.append(self.base)
+        if checkpoint is None:
+            return [(path, 0) for path in paths]
+        for i in reversed(range(len(paths))):  # usually in `base` or the newest backup
+            with contextlib.suppress(FileNotFoundError):
+                if self.is_checkpointed(paths[i]):
+                    return [(paths[i], checkpoint["offset"])] + [(_, 0) for _ in paths[i + 1 :]]
+        # checkpointed file deleted, or `base` overwritten: send anything newer
+        return [(path, 0) for path in paths if path.stat().st_mtime > self.checkpoint["time"]]
+
+    def step(self, final: bool = True) -> int:
+        """Send all records not yet sent. Returns the number sent.
+
+        Unless `final`, the last record in `base` is held back until a step finds
+        `base` unchanged, in case it's still being written.
+        """
+        try:
+            stat = self.base.stat()
+        except FileNotFoundError:
+            stat = None
+        seen = None if stat is None else (stat.st_ino, stat.st_size)
+        quiet = seen is not None and seen == self.last_seen
+        if quiet and not self.holding and not final:
+            return 0
+        previous, self.last_seen = self.last_seen, seen
+        rotated = previous is None or seen is None or seen[0] != previous[0] or seen < previous
+        self.holding = False
+        sent = self.sent
+        for path, offset in self.unsent(rotated):
+            try:
+                self.ship_file(path, offset, hold_last=path == self.base and not (final or quiet))
+            except FileNotFoundError:  # pruned while reading: continue with the next
+                continue
+        return self.sent - sent
+
+    def ship_file(self, path: pathlib.Path, offset: int, hold_last: bool = False) -> None:
+        data = head(path)
+        if not data:
+            return
+        parser = np_logging.parsing.Parser()
+        frames: list[bytes] = []
+        nbytes = 0
+        sent = offset  # end of the last record sent or skipped
+
+        def add(record: dict[str, Any], end: int) -> None:
+            nonlocal nbytes, sent
+            if record.get("levelno", logging.NOTSET) >= self.level:
+                frames.append(np_logging.wire.encode(self.record_dict(record)))
+                nbytes += len(frames[-1])
+            if nbytes >= self.batch_bytes:
+                self.send(frames, path, data, end)
+                nbytes = 0
+            sent = end
+
+        with np_logging.rotation.open_bytes(path) as f:
+            f.seek(offset)
+            position = offset
+            for line in f:
+                if not line.endswith(b"\n"):  # still being written
+                    break
+                record = parser.feed(line.decode(self.encoding, "replace"))
+                if record is not None:
+                    add(record, position)
+                position += len(line)
+        record = parser.flush()
+        if record is not None:
+            if hold_last:
+                self.holding = True
+            else:
+                add(record, position)
+        if frames or self.checkpoint is None or sent != self.checkpoint["offset"]:
+            self.send(frames, path, data, sent)
+
+    def send(self, frames: list[bytes], path: pathlib.Path, head: bytes, end: int) -> None:
+        if frames:
+            self.sender.send(frames)
+            self.sent += len(frames)
+            frames.clear()
+        self.commit(path, head, end)
+
+    def record_dict(self, fields: dict[str, Any]) -> dict[str, Any]:
+        "Record attributes for a parsed record, as `SocketHandler` would send them."
+        return {**self.template, **fields}
+
+
+def ship(
+    paths: Sequence[str | pathlib.Path],
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    checkpoint_dir: Optional[str | pathlib.Path] = None,
+    follow: bool = False,
+    poll_interval: float = POLL_INTERVAL,
+    compress: bool = False,
+    stop: Optional[threading.Event] = None,
+    **kwargs,
+) -> int:
+    """Send records from log files `paths`, or the `*.log` files in directories, to the
+    log server. Returns the number of records sent.
+
+    - `host` and `port` default to the log server in the package config
+    - checkpoints are kept in `checkpoint_dir`, default `logs/ship`
+    - while the server is unreachable, retries with backoff
+    - with `follow`, keeps sending new records every `poll_interval` seconds, until
+      `stop` is set
+    - other keyword arguments are passed to `Shipper`
+    """
+    if host is None or port is None or checkpoint_dir is None:
+        import np_logging.handlers
+
+        host = np_logging.handlers.handler_config("log_server")["host"] if host is None else host
+        port = np_logging.handlers.handler_config("log_server")["port"] if port is None else port
+        if checkpoint_dir is None:
+            checkpoint_dir = (
+                pathlib.Path(np_logging.handlers.handler_config("file")["logs_dir"]) / "ship"
+            )
+    stop = stop or threading.Event()
+    sender = Sender(host, port, compress)
+    shippers: dict[pathlib.Path, Shipper] = {}
+    delay = 1.0
+    try:
+        while True:
+            for path in log_files(paths):
+                if path not in shippers:
+                    shippers[path] = Shipper(path, sender, checkpoint_dir, **kwargs)
+            try:
+                for shipper in shippers.values():
+                    shipper.step(final=not follow)
+            except OSError as exc:
+                logger.warning(
+                    "Could not send to %s:%s (%s): retrying in %.0f s", host, port, exc, delay
+                )
+                if stop.wait(delay):
+                    break
+                delay = min(delay * 2, RETRY_MAX)
+                continue
+            delay = 1.0
+            if not follow or stop.wait(poll_interval):
+                break
+    finally:
+        sender.close()
+    return sum(shipper.sent for shipper in shippers.values())
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m np_logging.ship", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("paths", nargs="+", help="log files, or directories of *.log files")
+    parser.add_argument("--host", help="default: log server in the package config")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--checkpoint-dir", help="default: logs/ship")
+    parser.add_argument("--follow", action="store_true", help="keep sending new records")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--level", default="NOTSET", help="skip records below this level")
+    parser.add_argument("--project", help="project for records that don't include it")
+    parser.add_argument("--compress", action="store_true", help="np_logging receivers only")
+    args = parser.parse_args(argv)
+
+    import np_logging.handlers
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(message)s")
+    fields = np_logging.handlers.RecordFactory(
+        logging.LogRecord, args.project or np_logging.handlers.default_project_name()
+    ).fields
+    try:
+        sent = ship(
+            args.paths,
+            args.host,
+            args.port,
+            args.checkpoint_dir,
+            follow=args.follow,
+            poll_interval=args.poll_interval,
+            compress=args.compress,
+            fields=fields,
+            level=np_logging.parsing.level_number(args.level.upper()),
+        )
+    except KeyboardInterrupt:
+        return
+    logger.info("Sent %d records", sent)
+
+
+if __name__ == "__main__":
+    main()
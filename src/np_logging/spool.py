@@ -0,0 +1,324 @@
+"""
+Store-and-forward spool for records sent to the log server.
+
+Frames (see `np_logging.wire`) are appended to segment files in a local
+directory on the logging thread. A background thread forwards them to the
+server in order, in batches, and checkpoints its position after each batch is
+sent, so nothing is lost while the server is down and records aren't sent
+again after a restart.
+
+Used by `ServerHandler(spool=True)`, or directly:
+    >>> import logging, logging.handlers, tempfile
+    >>> frame = logging.handlers.SocketHandler(None, None).makePickle(logging.makeLogRecord({}))
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     spool = Spool(directory)
+    ...     spool.append(frame)
+    ...     data, position = spool.read()
+    ...     spool.commit(position)
+    ...     spool.read()[0] == b'', data == frame, position == (1, len(frame))
+    ...     spool.close()
+    (True, True, True)
+
+Delivery is at-least-once: a batch sent just before a crash, but not yet
+checkpointed, is sent again.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import pathlib
+import socket
+import threading
+import time
+from typing import IO, Optional
+
+import np_logging.wire
+
+SEGMENT_BYTES = 16 * 1024**2
+MAX_BYTES = 1024**3
+"Oldest segments are deleted, sent or not, when a spool exceeds this size."
+BATCH_BYTES = 1024**2
+
+logger = logging.getLogger(__name__)
+
+
+def lock_directory(directory: pathlib.Path) -> IO:
+    """Exclusive lock for the lifetime of the returned open file. Released by the OS
+    if the process dies. Raises `OSError` if already locked."""
+    file = (directory / "lock").open("a+b")
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        file.close()
+        raise
+    return file
+
+
+def complete_frames(data: bytes | memoryview) -> int:
+    "Number of bytes in `data` taken up by complete frames."
+    offset = 0
+    while len(data) - offset >= np_logging.wire.HEADER.size:
+        (prefix,) = np_logging.wire.HEADER.unpack_from(data, offset)
+        end = (
+            offset
+            + np_logging.wire.HEADER.size
+            + (prefix & ~np_logging.wire.COMPRESSED)
+        )
+        if end > len(data):
+            break
+        offset = end
+    return offset
+
+
+class Spool:
+    """Append-only log of frames on local disk, split into numbered segment files,
+    with a checkpoint of the first unsent frame.
+
+    A directory can only be used by one process at a time.
+    """
+
+    def __init__(
+        self,
+        directory: str | pathlib.Path,
+        segment_bytes: int = SEGMENT_BYTES,
+        max_bytes: int = MAX_BYTES,
+    ):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lockfile = lock_directory(self.directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.dropped_bytes = 0
+        self.lock = threading.Lock()
+        self.appended = threading.Event()
+        "Set when a frame is appended: cleared by the reader."
+
+        self.checkpoint: tuple[int, int] = self.read_checkpoint()
+        self.sizes = {seq: self.path(seq).stat().st_size for seq in self.segments()}
+        if self.sizes:
+            self.current = max(self.sizes)
+            self.recover(self.current)
+        else:
+            self.current = max(1, self.checkpoint[0])
+            self.sizes[self.current] = 0
+        self.total = sum(self.sizes.values())
+        self.file = self.path(self.current).open("ab", buffering=0)
+
+    @classmethod
+    def first_available(
+        cls, directory: str | pathlib.Path, attempts: int = 10, **kwargs
+    ) -> Spool:
+        """Spool in `directory`, or `directory.1`, `directory.2`... if in use by another
+        process."""
+        directory = pathlib.Path(directory)
+        for i in range(attempts):
+            try:
+                return cls(
+                    directory.with_name(f"{directory.name}.{i}") if i else directory,
+                    **kwargs,
+                )
+            except OSError:
+                continue
+        raise OSError(f"No spool directory available at {directory}")
+
+    def path(self, seq: int) -> pathlib.Path:
+        return self.directory / f"{seq:020d}.spool"
+
+    def segments(self) -> list[int]:
+        return sorted(int(_.stem) for _ in self.directory.glob("*.spool"))
+
+    def recover(self, seq: int) -> None:
+        "Truncate a frame left incomplete by a crash."
+        path = self.path(seq)
+        data = path.read_bytes()
+        complete = complete_frames(data)
+        if complete < len(data):
+            logger.debug("Truncating incomplete frame in %s", path)
+            with path.open("r+b") as f:
+                f.truncate(complete)
+            self.sizes[seq] = complete
+
+    def read_checkpoint(self) -> tuple[int, int]:
+        try:
+            return tuple(json.loads((self.directory / "checkpoint.json").read_text()))
+        except (OSError, ValueError):
+            return (0, 0)
+
+    def append(self, frame: bytes) -> None:
+        deleted = []
+        with self.lock:
+            if self.sizes[self.current] >= self.segment_bytes:
+                self.file.close()
+                self.current += 1
+                self.sizes[self.current] = 0
+                self.file = self.path(self.current).open("ab", buffering=0)
+            self.write(frame)
+            self.sizes[self.current] += len(frame)
+            self.total += len(frame)
+            if self.total > self.max_bytes:
+                deleted = self.enforce_max_bytes()
+        self.appended.set()
+        if deleted:  # not while locked: this handler may receive the warning
+            logger.warning(
+                "Log spool exceeded %d bytes: deleted unsent segment(s) %s",
+                self.max_bytes,
+                deleted,
+            )
+
+    def write(self, frame: bytes) -> None:
+        "Write all of `frame` to the current segment, or none. Call with lock held."
+        view = memoryview(frame)
+        try:
+            while view:  # unbuffered writes may be short
+                view = view[self.file.write(view) :]
+        except OSError:
+            self.file.truncate(self.sizes[self.current])
+            raise
+
+    def enforce_max_bytes(self) -> list[int]:
+        "Delete oldest segments until within `max_bytes`. Call with lock held."
+        deleted = []
+        while self.total > self.max_bytes and len(self.sizes) > 1:
+            oldest = min(self.sizes)
+            size = self.sizes.pop(oldest)
+            self.total -= size
+            self.dropped_bytes += size
+            with contextlib.suppress(OSError):
+                self.path(oldest).unlink()
+            deleted.append(oldest)
+        return deleted
+
+    def read(self, max_bytes: int = BATCH_BYTES) -> tuple[bytes, tuple[int, int]]:
+        """Complete frames from the checkpoint onwards (at least one frame, at most
+        `max_bytes` otherwise) and the position after them, to `commit()` once sent."""
+        seq, offset = self.checkpoint
+        while True:
+            with self.lock:
+                remaining = [_ for _ in self.sizes if _ >= seq]
+                current = self.current
+            if not remaining:
+                return b"", (seq, offset)
+            if seq != min(remaining):  # segment deleted by `enforce_max_bytes`
+                seq, offset = min(remaining), 0
+            with self.path(seq).open("rb") as f:
+                f.seek(offset)
+                data = f.read(max_bytes)
+                if len(data) >= np_logging.wire.HEADER.size and not complete_frames(
+                    data
+                ):
+                    f.seek(offset)  # single frame larger than max_bytes
+                    (prefix,) = np_logging.wire.HEADER.unpack_from(data)
+                    data = f.read(
+                        np_logging.wire.HEADER.size
+                        + (prefix & ~np_logging.wire.COMPRESSED)
+                    )
+            n = complete_frames(data)
+            if n:
+                return data[:n], (seq, offset + n)
+            if seq == current:
+                return b"", (seq, offset)
+            seq, offset = seq + 1, 0  # finished with segment
+
+    def commit(self, position: tuple[int, int]) -> None:
+        "Record that frames before `position` were sent, and delete finished segments."
+        self.checkpoint = tuple(position)
+        file = self.directory / "checkpoint.json"
+        tmp = file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.checkpoint))
+        os.replace(tmp, file)
+        with self.lock:
+            finished = [_ for _ in self.sizes if _ < position[0]]
+            for seq in finished:
+                self.total -= self.sizes.pop(seq)
+        for seq in finished:
+            with contextlib.suppress(OSError):
+                self.path(seq).unlink()
+
+    def pending(self) -> int:
+        "Bytes appended but not yet committed."
+        seq, offset = self.checkpoint
+        with self.lock:
+            return sum(size for _, size in self.sizes.items() if _ >= seq) - (
+                offset if seq in self.sizes else 0
+            )
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+        self._lockfile.close()
+
+
+class SpoolForwarder(threading.Thread):
+    """Sends spooled frames to a server in order, retrying with backoff while it's
+    unreachable."""
+
+    def __init__(
+        self,
+        spool: Spool,
+        host: str,
+        port: int,
+        batch_bytes: int = BATCH_BYTES,
+        timeout: float = 5.0,
+        retry_max: float = 30.0,
+    ):
+        super().__init__(name=f"np_logging spool forwarder {host}:{port}", daemon=True)
+        self.spool = spool
+        self.host = host
+        self.port = port
+        self.batch_bytes = batch_bytes
+        self.timeout = timeout
+        self.retry_max = retry_max
+        self.sock: Optional[socket.socket] = None
+        self.stopped = threading.Event()
+
+    def send(self, data: bytes) -> None:
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port), self.timeout)
+        self.sock.sendall(data)
+
+    def close_socket(self) -> None:
+        if self.sock is not None:
+            with contextlib.suppress(OSError):
+                self.sock.close()
+            self.sock = None
+
+    def run(self) -> None:
+        delay = 1.0
+        while not self.stopped.is_set():
+            self.spool.appended.clear()
+            data, position = self.spool.read(self.batch_bytes)
+            if not data:
+                self.spool.appended.wait(1.0)
+                continue
+            try:
+                self.send(data)
+            except OSError:
+                self.close_socket()
+                self.stopped.wait(delay)
+                delay = min(delay * 2, self.retry_max)
+                continue
+            delay = 1.0
+            self.spool.commit(position)
+        self.close_socket()
+
+    def drain(self, timeout: float) -> bool:
+        "Wait up to `timeout` seconds for all spooled frames to be sent."
+        deadline = time.monotonic() + timeout
+        while self.spool.pending() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self.spool.pending()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        "Stop after the current batch: unsent frames stay in the spool for next time."
+        self.stopped.set()
+        self.spool.appended.set()
+        self.join(timeout)
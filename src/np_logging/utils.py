@@ -2,35 +2,35 @@ from __future__ import annotations
 
 import atexit
 import datetime
+import json
 import logging
 import logging.config
 import logging.handlers
 import os
 import pathlib
-import platform
-import subprocess
+import smtplib
+import socket
 import sys
 import threading
-from typing import Any, Mapping, Sequence
-
-import np_config
+import time
+from typing import Any, Iterable, Mapping, Optional, Sequence
 
+import np_logging.config
+import np_logging.filters as filters
 import np_logging.handlers as handlers
-from np_logging.config import DEFAULT_LOGGING_CONFIG, PKG_CONFIG
 
 logger = logging.getLogger(__name__)
 
 START_TIME = datetime.datetime.now()
 
+PROBE_TIMEOUT = 1.0
+"Seconds to wait for a TCP connection to a log server or mail host."
+PROBE_CACHE_TTL = 60.0
+"""Seconds to re-use a successful TCP probe, in this or subsequent processes. Failed
+probes aren't re-used: a server that's down briefly is retried by the next call."""
 
-def host_responsive(host: str) -> bool:
-    """
-    Remember that a host may not respond to a ping (ICMP) request even if the host name
-    is valid. https://stackoverflow.com/a/32684938
-    """
-    param = "-n" if platform.system().lower() == "windows" else "-c"
-    command = ["ping", param, "1", host]
-    return subprocess.call(command, stdout=subprocess.PIPE) == 0
+_probe_cache: dict[str, tuple[bool, float]] = {}
+_probe_cache_lock = threading.Lock()
 
 
 def current_loggers() -> list[str]:
@@ -38,12 +38,118 @@ def current_loggers() -> list[str]:
     return list(logging.root.manager.loggerDict) + [logging.getLogger().name]
 
 
+def port_open(host: str, port: int, timeout: float = PROBE_TIMEOUT) -> bool:
+    "Whether `host` accepts a TCP connection on `port` within `timeout` seconds."
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def handler_address(handler: Mapping[str, Any]) -> Optional[tuple[str, int]]:
+    "Server address from a socket or smtp handler config, or `None` for other handlers."
+    if "host" in handler:
+        return handler["host"], int(
+            handler.get("port") or logging.handlers.DEFAULT_TCP_LOGGING_PORT
+        )
+    if "mailhost" in handler:
+        mailhost = handler["mailhost"]
+        if isinstance(mailhost, (list, tuple)):
+            return mailhost[0], int(mailhost[1])
+        return mailhost, smtplib.SMTP_PORT
+    return None
+
+
+def probe_cache_file() -> pathlib.Path:
+    return np_logging.config.CACHE_DIR / "probes.json"
+
+
+def read_probe_cache() -> dict[str, tuple[bool, float]]:
+    "Unexpired successful probes from memory, falling back to the on-disk cache."
+    now = time.time()
+    with _probe_cache_lock:
+        if not _probe_cache:
+            try:
+                _probe_cache.update(
+                    (k, tuple(v)) for k, v in json.loads(probe_cache_file().read_text()).items()
+                )
+            except (OSError, ValueError):
+                pass
+        return {
+            k: v
+            for k, v in _probe_cache.items()
+            if v[0] and now - v[1] <= PROBE_CACHE_TTL
+        }
+
+
+def write_probe_cache(results: Mapping[str, bool]) -> None:
+    now = time.time()
+    with _probe_cache_lock:
+        _probe_cache.update((k, (v, now)) for k, v in results.items())
+        file = probe_cache_file()
+        try:
+            file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = file.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(_probe_cache))
+            os.replace(tmp, file)
+        except OSError:
+            logger.debug("Could not write probe cache %s", file, exc_info=True)
+
+
+def probe(
+    addresses: Iterable[tuple[str, int]], timeout: float = PROBE_TIMEOUT
+) -> dict[tuple[str, int], bool]:
+    """TCP connect to all addresses concurrently, including name resolution, which
+    `socket.create_connection` doesn't time out: an address not connected to within
+    `timeout` seconds is inaccessible, and its probe is left to finish on its own."""
+    results = dict.fromkeys(addresses, False)
+
+    def run(address: tuple[str, int]) -> None:
+        results[address] = port_open(*address, timeout=timeout)
+
+    threads = [
+        threading.Thread(target=run, args=(_,), name="np_logging probe", daemon=True)
+        for _ in results
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    return dict(results)
+
+
+def addresses_accessible(
+    addresses: Iterable[tuple[str, int]], timeout: float = PROBE_TIMEOUT
+) -> dict[tuple[str, int], bool]:
+    """Probe all addresses concurrently with a TCP connect, re-using recent successes.
+
+    Takes as long as the slowest single probe (at most `timeout` seconds).
+    """
+    addresses = set(addresses)
+    cached = read_probe_cache()
+    results = {
+        address: cached[f"{address[0]}:{address[1]}"][0]
+        for address in addresses
+        if f"{address[0]}:{address[1]}" in cached
+    }
+    to_probe = addresses - set(results)
+    if to_probe:
+        probed = probe(to_probe, timeout)
+        if any(probed.values()):
+            write_probe_cache({f"{a[0]}:{a[1]}": ok for a, ok in probed.items() if ok})
+        results.update(probed)
+    return results
+
+
 def ensure_accessible_handlers(config: dict) -> None | list[str]:
     """
     Check filepaths and write access for file handlers; server availability for socket/smtp handlers.
     Remove inaccessible handlers from config and return their names.
     """
     removed_handlers = []
+    addresses: dict[str, tuple[str, int]] = {}
     for name, handler in config["handlers"].items():
         if "filename" in handler:
             file = pathlib.Path(handler["filename"]).resolve()
@@ -56,16 +162,21 @@ def ensure_accessible_handlers(config: dict) -> None | list[str]:
             except PermissionError:
                 removed_handlers.append(name)
 
-        if any(
-            host in handler and not host_responsive(handler[host])
-            for host in ("host", "mailhost")
-        ):
-            removed_handlers.append(name)
+        address = handler_address(handler)
+        if address is not None:
+            addresses[name] = address
+
+    accessible = addresses_accessible(addresses.values())
+    removed_handlers.extend(
+        name
+        for name, address in addresses.items()
+        if not accessible[address] and name not in removed_handlers
+    )
 
     for handler in removed_handlers:
         del config["handlers"][handler]
-        for logger in config["loggers"].values():
-            if handler in logger["handlers"]:
+        for logger in [*config.get("loggers", {}).values(), config.get("root", {})]:
+            if handler in logger.get("handlers", []):
                 logger["handlers"].remove(handler)
 
     return removed_handlers or None
@@ -106,6 +217,7 @@ class ExitHooks(object):
         if self.run_orig_hooks:
             self._orig_threading_excepthook(args)
         log_exception(exc_type, exc, tb)
+        handlers.dump_flight_recorders()
 
     def sys_excepthook(self, exc_type, exc, tb):
         self.exception = exc
@@ -113,6 +225,7 @@ class ExitHooks(object):
         if self.run_orig_hooks:
             self._orig_sys_excepthook(exc_type, exc, tb)
         log_exception(exc_type, exc, tb)
+        handlers.dump_flight_recorders()
 
 
 def log_exception(exc_type, exc, tb):
@@ -122,11 +235,14 @@ def log_exception(exc_type, exc, tb):
 def log_exit(
     hooks: ExitHooks,
     email_level: bool | int = False,
-    email_logger: str = PKG_CONFIG["default_exit_email_logger_name"],
+    email_logger: Optional[str] = None,
     root_log_at_exit: bool = True,
 ):
+    if email_logger is None:
+        email_logger = np_logging.config.PKG_CONFIG["default_exit_email_logger_name"]
 
     elapsed = elapsed_time()
+    filters.summarize()  # before exit msgs, so they're the last logged
 
     msg_level = logging.INFO
     msg = "Exited normally"
@@ -147,6 +263,9 @@ def log_exit(
     if root_log_at_exit and (not email.propagate if email_level else True):
         logging.log(msg_level, "%s after %s", msg, elapsed)
 
+    handlers.dump_flight_recorders(at_exit=True)
+    handlers.flush_buffered_file_handlers()
+
 
 def setup_logging_at_exit(*args, **kwargs):
     hooks = ExitHooks()
@@ -159,9 +278,11 @@ def setup_logging_at_exit(*args, **kwargs):
 
 def configure_email_logger(
     email_address: str | Sequence[str],
-    logger_name: str = PKG_CONFIG["default_exit_email_logger_name"],
+    logger_name: Optional[str] = None,
     email_subject: str = __name__,
 ):
+    if logger_name is None:
+        logger_name = np_logging.config.PKG_CONFIG["default_exit_email_logger_name"]
     email_logger = logging.getLogger(logger_name)
     for handler in email_logger.handlers:
         if isinstance(handler, logging.handlers.SMTPHandler):
@@ -183,6 +304,7 @@ def get_config_dict_from_multi_input(
     arg: str | Mapping | pathlib.Path
 ) -> dict[str, Any]:
     "Differentiate a file path from a ZK path and return corresponding logging config dict, if valid."
+    import np_config
 
     config = np_config.fetch(arg)
     if not valid_logging_config_dict(config):
@@ -0,0 +1,74 @@
+"""
+Framing of records sent to the log server.
+
+Compatible with `logging.handlers.SocketHandler`: each record is a pickled dict,
+prefixed with its length as a 4-byte big-endian unsigned int. Frames can be
+concatenated and sent in a single write.
+
+A batch of frames can also be sent zlib-compressed as a single frame, marked
+by setting the high bit of its length prefix: only np_logging receivers
+understand these.
+
+Like the stdlib's socket receiver, decoding unpickles whatever is received, so
+should only be used on trusted networks.
+
+    >>> import logging, logging.handlers
+    >>> handler = logging.handlers.SocketHandler('localhost', None)
+    >>> frames = b''.join(
+    ...     handler.makePickle(logging.makeLogRecord({'msg': i})) for i in range(3)
+    ... )
+    >>> decoder = FrameDecoder()
+    >>> [r['msg'] for r in decoder.feed(compress(frames)[:10])]
+    []
+    >>> [r['msg'] for r in decoder.feed(compress(frames)[10:] + frames)]
+    ['0', '1', '2', '0', '1', '2']
+"""
+from __future__ import annotations
+
+import pickle
+import struct
+import zlib
+from typing import Any
+
+HEADER = struct.Struct(">L")
+COMPRESSED = 0x80000000
+"Flag set in a frame's length prefix if its payload is a zlib-compressed batch of frames."
+
+
+def encode(fields: dict[str, Any]) -> bytes:
+    "Frame for a record dict, as made by `SocketHandler.makePickle()` for a record."
+    payload = pickle.dumps(fields, 1)
+    return HEADER.pack(len(payload)) + payload
+
+
+def compress(frames: bytes, level: int = 1) -> bytes:
+    "Pack concatenated frames into a single compressed frame."
+    payload = zlib.compress(frames, level)
+    return HEADER.pack(len(payload) | COMPRESSED) + payload
+
+
+class FrameDecoder:
+    "Incremental decoder: `feed()` bytes as they arrive, get back complete records."
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[dict[str, Any]]:
+        "Record dicts (for `logging.makeLogRecord`) from all complete frames received so far."
+        self.buffer += data
+        records: list[dict[str, Any]] = []
+        offset = 0
+        while len(self.buffer) - offset >= HEADER.size:
+            (prefix,) = HEADER.unpack_from(self.buffer, offset)
+            size = prefix & ~COMPRESSED
+            end = offset + HEADER.size + size
+            if len(self.buffer) < end:
+                break
+            payload = bytes(self.buffer[offset + HEADER.size : end])
+            if prefix & COMPRESSED:
+                records.extend(FrameDecoder().feed(zlib.decompress(payload)))
+            else:
+                records.append(pickle.loads(payload))
+            offset = end
+        del self.buffer[:offset]
+        return records
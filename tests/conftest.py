@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import socket
+import threading
+import time
+
+import pytest
+
+from np_logging.server import ThreadedLogServer
+
+
+@pytest.fixture
+def receiver() -> ThreadedLogServer:
+    "Local stand-in for the log server."
+    server = ThreadedLogServer(keep=True)
+    yield server
+    server.close()
+
+
+class SMTPServer:
+    "Local stand-in for a mail host: accepts connections and keeps messages received."
+
+    def __init__(self):
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen()
+        self.port = self.server.getsockname()[1]
+        self.messages: list[str] = []
+        self.connections = 0
+        self.received = threading.Event()
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self.session, args=(conn,), daemon=True).start()
+
+    def session(self, conn: socket.socket):
+        with conn, conn.makefile("rb") as lines:
+            conn.sendall(b"220 localhost\r\n")
+            for line in lines:
+                command = line[:4].upper()
+                if command == b"DATA":
+                    conn.sendall(b"354 go ahead\r\n")
+                    data = []
+                    for line in lines:
+                        if line == b".\r\n":
+                            break
+                        data.append(line)
+                    self.messages.append(b"".join(data).decode())
+                    self.received.set()
+                elif command == b"QUIT":
+                    conn.sendall(b"221 bye\r\n")
+                    return
+                conn.sendall(b"250 ok\r\n")
+
+    def wait(self, n: int, timeout: float = 5):
+        "Wait for at least `n` messages."
+        deadline = time.monotonic() + timeout
+        while len(self.messages) < n and time.monotonic() < deadline:
+            self.received.wait(0.01)
+            self.received.clear()
+
+    def close(self):
+        self.server.close()
+
+
+@pytest.fixture
+def smtp_server() -> SMTPServer:
+    "Local stand-in for the mail host."
+    server = SMTPServer()
+    yield server
+    server.close()
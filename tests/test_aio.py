@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import socket
+import time
+
+from np_logging import aio, handlers, listener
+
+
+def make_record(msg: str) -> logging.LogRecord:
+    return logging.makeLogRecord({"msg": msg, "levelno": logging.INFO})
+
+
+async def max_loop_lag(handler: logging.Handler, n: int, size: int) -> float:
+    "Log `n` records while measuring the longest delay of a 1 ms timer on the loop."
+    lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal lag
+        while not done:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - t0 - 0.001)
+
+    task = asyncio.ensure_future(ticker())
+    record = make_record("x" * size)
+    for i in range(n):
+        handler.handle(record)
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    done = True
+    await task
+    return lag
+
+
+def test_event_loop_lag_with_stalled_server(monkeypatch):
+    monkeypatch.setattr(aio, "SHUTDOWN_TIMEOUT", 0.1)
+    server = socket.socket()  # accepts connections but never reads
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    port = server.getsockname()[1]
+    kwargs = dict(host="127.0.0.1", port=port, backup=logging.NullHandler())
+
+    async def main(handler):
+        lag = await max_loop_lag(handler, 3_000, 2_000)  # fills socket buffers
+        handler.close()
+        return lag
+
+    async_lag = asyncio.run(main(aio.AsyncServerHandler("test", **kwargs)))
+    blocking_lag = asyncio.run(main(handlers.ServerHandler("test", **kwargs)))
+    server.close()
+    assert async_lag < 0.1
+    assert blocking_lag > 5 * async_lag
+
+
+def test_queued_records_sent_at_loop_shutdown(receiver):
+    handler = aio.AsyncServerHandler(
+        "test", host="127.0.0.1", port=receiver.port, backup=logging.NullHandler()
+    )
+    handler.handle(make_record("before loop"))
+
+    async def main():
+        for i in range(100):
+            handler.handle(make_record(f"record {i}"))
+
+    asyncio.run(main())
+    handler.close()
+    receiver.join()
+    messages = [r["msg"] for r in receiver.records]
+    assert messages[0] == "before loop" and messages[-1] == "record 99"
+    assert len(messages) == 101
+
+
+def test_flush(receiver):
+    async def main():
+        handler = aio.AsyncServerHandler(
+            "test", host="127.0.0.1", port=receiver.port, backup=logging.NullHandler()
+        )
+        handler.handle(make_record("flushed"))
+        await aio.flush()
+        assert handler.queue.empty()
+        return handler
+
+    handler = asyncio.run(main())
+    handler.close()
+    receiver.join()
+    assert [r["msg"] for r in receiver.records] == ["flushed"]
+
+
+def test_async_handlers_not_moved_to_listener_thread():
+    logger = logging.getLogger("test_aio_listener")
+    async_handler = aio.AsyncServerHandler(
+        "test", host="127.0.0.1", port=0, backup=logging.NullHandler()
+    )
+    logger.addHandler(async_handler)
+    logger.addHandler(logging.NullHandler())
+    listener.enable([logger])
+    try:
+        assert async_handler in logger.handlers
+        assert async_handler not in listener.sinks(logger)[1:]
+    finally:
+        listener.disable()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+
+def test_bound_on_creation_in_loop(receiver):
+    async def main():
+        handler = aio.AsyncServerHandler(
+            "test", host="127.0.0.1", port=receiver.port, backup=logging.NullHandler()
+        )
+        await asyncio.to_thread(handler.handle, make_record("from a thread"))
+        await aio.flush()
+        return handler
+
+    handler = asyncio.run(main())
+    handler.close()
+    receiver.join()
+    assert [r["msg"] for r in receiver.records] == ["from a thread"]
+
+
+def test_unbound_records_capped_and_sent_at_close(receiver):
+    handler = aio.AsyncServerHandler(
+        "test",
+        host="127.0.0.1",
+        port=receiver.port,
+        backup=logging.NullHandler(),
+        maxsize=5,
+    )
+    for i in range(8):
+        handler.handle(make_record(f"record {i}"))
+    assert handler.dropped == 3
+    handler.close()
+    receiver.join()
+    assert [r["msg"] for r in receiver.records] == [f"record {i}" for i in range(3, 8)]
+
+
+def test_server_handlers_restored(receiver):
+    logger = logging.getLogger("test_aio_restore")
+    server_handler = handlers.ServerHandler(
+        "test", host="127.0.0.1", port=receiver.port, backup=logging.NullHandler()
+    )
+    server_handler.name = "server"
+    logger.addHandler(server_handler)
+    try:
+        aio.replace_server_handlers("test")
+        (async_handler,) = logger.handlers
+        assert isinstance(async_handler, aio.AsyncServerHandler)
+        aio.restore_server_handlers("test")
+        (restored,) = logger.handlers
+        assert restored.name == "server"
+        assert type(restored) is handlers.ServerHandler
+        assert (restored.host, restored.port) == ("127.0.0.1", receiver.port)
+    finally:
+        for handler in list(logger.handlers):
+            handler.close()
+            logger.removeHandler(handler)
+
+
+def test_null_backup_skips_executor(receiver):
+    calls = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        run = loop.run_in_executor
+        loop.run_in_executor = lambda *args: calls.append(args) or run(*args)
+        handler = aio.AsyncServerHandler(
+            "test", host="127.0.0.1", port=receiver.port, backup=logging.NullHandler()
+        )
+        handler.handle(make_record("no backup"))
+        await aio.flush()
+        return handler
+
+    handler = asyncio.run(main())
+    handler.close()
+    receiver.join()
+    assert handler.backup is None
+    assert not [args for args in calls if args[1] == handler.write_backup]
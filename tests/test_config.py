@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+
+import np_config
+import pytest
+
+from np_logging import config
+
+IMPORT_TIME_BUDGET_S = 1.0
+
+
+def import_time(env: dict[str, str]) -> float:
+    code = "import time; t0 = time.perf_counter(); import np_logging; print(time.perf_counter() - t0)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_does_not_wait_on_zk(tmp_path):
+    "Cold cache: ZK is queried in background, so import time doesn't depend on it."
+    assert import_time({"NP_LOGGING_CACHE_DIR": str(tmp_path)}) < IMPORT_TIME_BUDGET_S
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(config, "_background_refreshes", {})
+    yield tmp_path
+
+
+def test_fresh_cache_is_used_without_zk(cache_dir, monkeypatch):
+    config.write_cache(config.ZK_PROJECT_CONFIG, {"cached": True})
+    monkeypatch.setattr(config, "refresh_in_background", pytest.fail)
+    assert config.load(*config.SOURCES["PKG_CONFIG"]) == {"cached": True}
+
+
+def test_stale_cache_is_used_and_refreshed(cache_dir, monkeypatch):
+    config.write_cache(config.ZK_PROJECT_CONFIG, {"cached": True})
+    monkeypatch.setattr(config, "CACHE_TTL", -1)
+    monkeypatch.setattr(config, "fetch_from_zk", lambda path: time.sleep(0.1))
+    t0 = time.perf_counter()
+    assert config.load(*config.SOURCES["PKG_CONFIG"]) == {"cached": True}
+    assert time.perf_counter() - t0 < 0.1
+    assert config._background_refreshes[config.ZK_PROJECT_CONFIG].is_alive()
+
+
+def test_local_copy_used_without_cache(cache_dir, monkeypatch):
+    monkeypatch.setattr(config, "fetch_from_zk", lambda path: None)
+    expected = np_config.from_file(config.LOCAL_PROJECT_CONFIG)
+    assert config.load(*config.SOURCES["PKG_CONFIG"]) == expected
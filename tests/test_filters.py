@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import logging
+import logging.config
+import threading
+import time
+
+import pytest
+
+from np_logging import filters, listener
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages: list[str] = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def logger() -> logging.Logger:
+    logger = logging.getLogger("test_filters")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    yield logger
+    logger.handlers.clear()
+
+
+def rate_limited(handler: logging.Handler, **kwargs) -> filters.RateLimitFilter:
+    rate_limit = filters.RateLimitFilter(**kwargs)
+    rate_limit.clock = Clock()
+    handler.addFilter(rate_limit)
+    return rate_limit
+
+
+def test_rate_limit_summarizes_suppressed_records(logger):
+    handler = ListHandler()
+    logger.handlers[:] = [handler]
+    rate_limit = rate_limited(handler, rate=1, burst=5)
+    for i in range(101):
+        if i == 100:
+            rate_limit.clock.now = 2.0
+        logger.info("frame %d", i)
+    callsite = next(iter(rate_limit.buckets))
+    assert handler.messages == [f"frame {i}" for i in range(5)] + [
+        f"suppressed 95 records from test_filters.py:{callsite[1]} in 2.0 s",
+        "frame 100",
+    ]
+
+
+def test_warnings_bypass_and_sampling(logger):
+    handler = ListHandler()
+    logger.handlers[:] = [handler]
+    rate_limit = rate_limited(handler, rate=1000, burst=1000, sample=10, per="logger")
+    for i in range(100):
+        logger.debug("frame %d", i)
+        logger.warning("warning %d", i)
+    assert sum(m.startswith("warning") for m in handler.messages) == 100
+    assert [m for m in handler.messages if m.startswith("frame")] == [
+        f"frame {i}" for i in range(0, 100, 10)
+    ]
+    rate_limit.summarize()
+    assert handler.messages[-1] == "suppressed 9 records from logger 'test_filters' in 0.0 s"
+
+
+def test_shared_filter_from_dict_config(logger):
+    logging.config.dictConfig(
+        {
+            "version": 1,
+            "disable_existing_loggers": False,
+            "filters": {
+                "rate_limit": {"()": "np_logging.filters.RateLimitFilter", "burst": 3}
+            },
+            "handlers": {
+                name: {"class": "logging.NullHandler", "filters": ["rate_limit"]}
+                for name in ("a", "b")
+            },
+            "loggers": {"test_filters": {"handlers": ["a", "b"], "propagate": False}},
+        }
+    )
+    a, b = logger.handlers[:2]
+    assert a.filters[0] is b.filters[0]
+    records = [logging.makeLogRecord({"levelno": logging.INFO}) for _ in range(5)]
+    passed = [(a.filter(r), b.filter(r)) for r in records]
+    assert passed == [(True, True)] * 3 + [(False, False)] * 2
+
+
+def test_coalesce_duplicates(logger):
+    handler = ListHandler()
+    logger.handlers[:] = [handler, logging.NullHandler()]
+    coalesce = filters.coalesce([logger])
+    assert all(h.filters == [coalesce] for h in logger.handlers)
+    for _ in range(1000):
+        logger.error("poll failed: %s", "timeout")
+    logger.error("poll failed: %s", "no device")
+    logger.error("poll failed: %s", "no device")
+    assert handler.messages[0] == "poll failed: timeout"
+    assert handler.messages[1].startswith("poll failed: timeout [repeated 999 times from ")
+    assert handler.messages[2:] == ["poll failed: no device"]
+    filters.summarize()
+    assert handler.messages[3].startswith("poll failed: no device [repeated 1 times")
+
+
+def test_coalesce_summary_logged_after_interval(logger):
+    handler = ListHandler()
+    logger.handlers[:] = [handler]
+    handler.addFilter(filters.CoalesceFilter(interval=0.05))
+    for _ in range(3):
+        logger.info("same")
+    deadline = time.monotonic() + 5
+    while len(handler.messages) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert handler.messages[1].startswith("same [repeated 2 times")
+
+
+def test_summary_only_to_handlers_with_filter(logger):
+    limited, other = ListHandler(), ListHandler()
+    logger.handlers[:] = [limited, other]
+    rate_limit = rate_limited(limited, rate=1, burst=1)
+    for i in range(4):
+        if i == 3:
+            rate_limit.clock.now = 2.0
+        logger.info("frame %d", i)
+    assert limited.messages[0] == "frame 0" and limited.messages[2] == "frame 3"
+    assert limited.messages[1].startswith("suppressed 2 records")
+    assert other.messages == [f"frame {i}" for i in range(4)]
+
+
+def test_summary_not_queued_again(logger):
+    handler = ListHandler()
+    logger.handlers[:] = [handler]
+    rate_limit = rate_limited(handler, rate=1, burst=1)
+    rate_limit.clock = time.monotonic
+    q = listener.enable([logger], maxsize=1, overflow="block")
+    try:
+        for i in range(3):
+            if i == 2:
+                time.sleep(1.1)
+            logger.info("frame %d", i)
+    finally:
+        listener.disable()
+    assert q.dropped == 0
+    assert handler.messages[0] == "frame 0" and handler.messages[2] == "frame 2"
+    assert handler.messages[1].startswith("suppressed 1 records")
+
+
+def test_coalesce_filters_share_one_timer(logger):
+    handlers = [ListHandler() for _ in range(3)]
+    logger.handlers[:] = handlers
+    for handler, interval in zip(handlers, (60, 0.05, 0.1)):
+        handler.addFilter(filters.CoalesceFilter(interval=interval))
+    for _ in range(3):
+        logger.info("same")
+    deadline = time.monotonic() + 5
+    while len(handlers[2].messages) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [len(h.messages) for h in handlers] == [1, 2, 2]
+    assert handlers[1].messages[1].startswith("same [repeated 2 times")
+    timers = [t for t in threading.enumerate() if t.name == "np_logging coalesce timer"]
+    assert len(timers) == 1
+
+
+@pytest.fixture
+def other_logger() -> logging.Logger:
+    other = logging.getLogger("test_filters_other")
+    other.propagate = False
+    yield other
+    other.handlers.clear()
+
+
+def test_coalesce_summary_not_sent_to_unrelated_loggers(logger, other_logger):
+    handler, unrelated = ListHandler(), ListHandler()
+    logger.handlers[:] = [handler]
+    other_logger.handlers[:] = [unrelated]
+    filters.coalesce([logger, other_logger])
+    for _ in range(5):
+        logger.info("poll failed")
+    logger.info("other")
+    assert handler.messages[1].startswith("poll failed [repeated 4 times")
+    assert unrelated.messages == []
+
+
+def test_rate_limit_summary_not_sent_to_unrelated_loggers(logger, other_logger):
+    handler, unrelated = ListHandler(), ListHandler()
+    logger.handlers[:] = [handler]
+    other_logger.handlers[:] = [unrelated]
+    rate_limit = rate_limited(handler, rate=1, burst=1)
+    unrelated.addFilter(rate_limit)
+    for i in range(3):
+        if i == 2:
+            rate_limit.clock.now = 2.0
+        logger.info("frame %d", i)
+    assert handler.messages[1].startswith("suppressed 1 records")
+    assert unrelated.messages == []
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import gc
+import json
+import logging
+import sys
+import weakref
+
+import pytest
+
+from np_logging import formatters, handlers
+
+FORMATS = [
+    "%(asctime)s | %(message)s",
+    "%(levelname)-8s %(lineno)5d %(created).1f %(name)r 100%% done",
+    "{literal braces} %(message)s '\"",
+    "%(unknown)s",
+    "%s %(message)s",
+    "",
+]
+
+
+def make_record(**fields) -> logging.LogRecord:
+    record = logging.LogRecord("np.test", logging.INFO, __file__, 10, "%s %d%%", ("a", 5), None)
+    record.__dict__.update(project="test", hostname="localhost", **fields)
+    return record
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_matches_logging_formatter(fmt):
+    for datefmt in (None, "%H:%M"):
+        record = make_record()
+        try:
+            expected = logging.Formatter(fmt, datefmt).format(record)
+        except ValueError as exc:
+            with pytest.raises(type(exc)):
+                formatters.CachedFormatter(fmt, datefmt).format(record)
+            continue
+        assert formatters.CachedFormatter(fmt, datefmt).format(record) == expected
+
+
+def test_package_config_formatters():
+    try:
+        raise RuntimeError("test")
+    except RuntimeError:
+        exc_info = sys.exc_info()
+    for name, formatter in handlers.FORMAT.items():
+        assert isinstance(formatter, formatters.CachedFormatter)
+        for created in (1e9, 1e9 + 0.5, 1e9 + 1.25):
+            record = make_record(created=created, msecs=(created % 1) * 1000, exc_info=exc_info)
+            expected = logging.Formatter(formatter._fmt, formatter.datefmt).format(
+                make_record(created=created, msecs=(created % 1) * 1000, exc_info=exc_info)
+            )
+            assert formatter.format(record) == expected, name
+
+
+def test_message_shared_between_formatters():
+    record = make_record()
+    calls = []
+    get_message = record.getMessage
+    record.getMessage = lambda: calls.append(1) or get_message()
+    for formatter in handlers.FORMAT.values():
+        formatter.format(record)
+    assert len(calls) == 1
+    record.msg = "changed %s %s"
+    assert handlers.FORMAT["simple"].format(record).endswith("| changed a 5")
+
+
+def test_json_formatter():
+    try:
+        raise RuntimeError("test")
+    except RuntimeError:
+        exc_info = sys.exc_info()
+    record = make_record(rig_name="NP.1", comp_id=None, exc_info=exc_info)
+    record.msg = 'quote " newline \n unicode µ %s %d%%'
+    line = formatters.JSONFormatter().format(record)
+    assert "\n" not in line
+    fields = json.loads(line)
+    assert list(fields) == [*formatters.JSON_FIELDS, "exc_text"]
+    assert fields["msg"] == record.getMessage()
+    assert fields["created"] == record.created and fields["levelno"] == logging.INFO
+    assert (fields["project"], fields["rig_name"], fields["comp_id"]) == ("test", "NP.1", None)
+    assert fields["exc_text"] == logging.Formatter().formatException(exc_info)
+
+
+def strict_loads(line: str):
+    def reject(constant):
+        raise ValueError(f"invalid JSON constant {constant}")
+
+    return json.loads(line, parse_constant=reject)
+
+
+def test_json_formatter_other_values():
+    record = make_record(
+        extra=[1, object()], flag=True, nan=float("nan"), inf=[float("inf")], created=float("nan")
+    )
+    fields = ("created", "extra", "flag", "nan", "inf", "missing")
+    values = strict_loads(formatters.JSONFormatter(fields).format(record))
+    assert values["extra"][0] == 1 and values["extra"][1].startswith("<object")
+    assert values["flag"] is True and values["missing"] is None
+    assert values["created"] is None and values["nan"] is None and values["inf"] == "[inf]"
+
+
+def test_message_cache_keeps_no_records_alive():
+    try:
+        raise RuntimeError("test")
+    except RuntimeError:
+        record = make_record(exc_info=sys.exc_info())
+    formatters.CachedFormatter("%(message)s").format(record)
+    ref = weakref.ref(record)
+    del record
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import logging
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from np_logging import handlers, parsing, rotation
+
+
+@pytest.fixture
+def record_factory():
+    original = logging.getLogRecordFactory()
+    yield
+    logging.setLogRecordFactory(original)
+
+
+def make_record() -> logging.LogRecord:
+    return logging.getLogRecordFactory()(
+        name=None, level=0, pathname="", lineno=0, msg="", args=(), exc_info=None
+    )
+
+
+def test_record_factory_is_not_nested(record_factory):
+    factory = handlers.setup_record_factory("first")
+    for project_name in ("second", "third"):
+        handlers.setup_record_factory(project_name)
+        handlers.EmailHandler("test@email.com", project_name=project_name)
+    assert logging.getLogRecordFactory() is factory
+    assert not isinstance(factory.base, handlers.RecordFactory)
+    assert make_record().project == "third"
+
+
+def test_record_factory_fields_resolved_on_refresh(record_factory, monkeypatch):
+    handlers.setup_record_factory("test")
+    monkeypatch.setenv("aibs_comp_id", "test_comp_id")
+    assert make_record().comp_id != "test_comp_id"
+    handlers.setup_record_factory("test", refresh=True)
+    assert make_record().comp_id == "test_comp_id"
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_batch_server_handler(compress, receiver):
+    handler = handlers.BatchServerHandler(
+        "test",
+        host="127.0.0.1",
+        port=receiver.port,
+        batch_size=100,
+        compress=compress,
+        backup=logging.NullHandler(),
+    )
+    for i in range(1000):
+        handler.handle(logging.makeLogRecord({"msg": "record %d", "args": (i,)}))
+    handler.close()
+    receiver.join()
+    assert [r["msg"] for r in receiver.records] == [f"record {i}" for i in range(1000)]
+    assert receiver.reads <= 1000 / 100 * 2
+
+
+def test_batch_server_handler_flushes_on_interval(receiver):
+    handler = handlers.BatchServerHandler(
+        "test",
+        host="127.0.0.1",
+        port=receiver.port,
+        batch_interval=0.01,
+        backup=logging.NullHandler(),
+    )
+    handler.handle(logging.makeLogRecord({"msg": "test"}))
+    for _ in range(100):
+        if receiver.records:
+            break
+        threading.Event().wait(0.01)
+    handler.close()
+    receiver.join()
+    assert [r["msg"] for r in receiver.records] == ["test"]
+
+
+def info_record(msg: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.makeLogRecord({"msg": msg, "levelno": level, "levelname": "INFO"})
+
+
+def test_buffered_file_handler_flush_triggers(tmp_path):
+    handler = handlers.FileHandler(
+        logs_dir=tmp_path, level="INFO", buffer_size=1 << 16, flush_interval=60
+    )
+    log = tmp_path / "info.log"
+    handler.handle(info_record("buffered"))
+    assert "buffered" not in log.read_text()
+    handler.handle(info_record("error", logging.ERROR))
+    assert "buffered" in log.read_text() and "error" in log.read_text()
+
+    handler.handle(info_record("at exit"))
+    handlers.flush_buffered_file_handlers()
+    assert "at exit" in log.read_text()
+    handler.close()
+
+
+def test_buffered_file_handler_flushes_on_interval(tmp_path):
+    handler = handlers.FileHandler(
+        logs_dir=tmp_path, level="INFO", buffer_size=1 << 16, flush_interval=0.05
+    )
+    handler.handle(info_record("idle"))
+    for _ in range(100):
+        if "idle" in (tmp_path / "info.log").read_text():
+            break
+        threading.Event().wait(0.01)
+    assert "idle" in (tmp_path / "info.log").read_text()
+    handler.close()
+
+
+def test_buffered_file_handler_rotates_by_bytes(tmp_path):
+    handler = handlers.FileHandler(
+        logs_dir=tmp_path,
+        level="INFO",
+        buffer_size=1 << 16,
+        maxBytes=1000,
+        backupCount=100,
+        formatter=logging.Formatter("%(message)s"),
+        encoding="utf8",
+    )
+    for _ in range(100):
+        handler.handle(info_record("µ" * 20))  # 41 bytes, 21 characters
+    handler.close()
+    files = list(tmp_path.glob("info.log*"))
+    assert len(files) > 4
+    assert all(0 < _.stat().st_size <= 1000 for _ in files)
+
+
+@pytest.mark.parametrize("cls", ["FileHandler", "ServerBackupHandler"])
+def test_json_lines_round_trip(tmp_path, cls):
+    if cls == "FileHandler":
+        handler = handlers.FileHandler(logs_dir=tmp_path, level="INFO", json_lines=True)
+        path = tmp_path / "info.log"
+    else:
+        path = tmp_path / "backup.log"
+        handler = handlers.ServerBackupHandler(filename=str(path), json_lines=True)
+    records = [info_record("plain"), info_record('"quoted" µ\nsecond line')]
+    records[1].__dict__.update(project="test", rig_name="NP.1", comp_id=None)
+    records[1].created = float("nan")
+    for record in records:
+        handler.handle(record)
+    handler.close()
+    parsed = list(parsing.parse_json_lines(rotation.read_lines(path)))
+    assert [_["msg"] for _ in parsed] == ["plain", '"quoted" µ\nsecond line']
+    assert parsed[0]["created"] == records[0].created
+    assert "created" not in parsed[1]
+    assert (parsed[1]["project"], parsed[1]["rig_name"], parsed[1]["comp_id"]) == (
+        "test",
+        "NP.1",
+        None,
+    )
+
+
+def test_flight_recorder_dumps_at_exit(tmp_path):
+    script = f"""
+import logging
+from np_logging import handlers
+for dump_at_exit, name in ((True, 'kept'), (False, 'discarded')):
+    recorder = handlers.FlightRecorderHandler(
+        logs_dir=r'{tmp_path}' + '/' + name, dump_at_exit=dump_at_exit
+    )
+    recorder.handle(logging.makeLogRecord({{'msg': name, 'levelno': logging.DEBUG}}))
+    logging.getLogger(name).addHandler(recorder)
+"""
+    subprocess.run([sys.executable, "-c", script], check=True)
+    assert "kept" in (tmp_path / "kept" / "debug.log").read_text()
+    assert not (tmp_path / "discarded" / "debug.log").exists()
+
+
+def digest_email_handler(smtp_server, subject: str, **kwargs):
+    return handlers.DigestEmailHandler(
+        "test@localhost",
+        mailhost=("127.0.0.1", smtp_server.port),
+        subject=subject,
+        formatter=logging.Formatter("%(message)s"),
+        **kwargs,
+    )
+
+
+def test_digest_email_handler_collapses_duplicates(smtp_server):
+    handler = digest_email_handler(smtp_server, "digest", window=0.1)
+    for _ in range(50):
+        handler.handle(info_record("repeated"))
+    handler.handle(info_record("once"))
+    assert not smtp_server.messages  # sent from background thread after window
+    smtp_server.wait(1)
+    handler.close()
+    assert len(smtp_server.messages) == 1
+    body = smtp_server.messages[0]
+    assert "repeated\n[repeated 50 times]" in body.replace("\r\n", "\n")
+    assert body.count("once") == 1
+
+
+def test_digest_email_handler_rate_limit_and_connection_reuse(smtp_server):
+    handler = digest_email_handler(
+        smtp_server, "rate limited", window=0.01, min_interval=0.5
+    )
+    handler.handle(info_record("first"))
+    smtp_server.wait(1)
+    handler.handle(info_record("second"))
+    threading.Event().wait(0.2)
+    assert len(smtp_server.messages) == 1
+    smtp_server.wait(2)
+    assert "second" in smtp_server.messages[1]
+    handler.handle(info_record("at exit"))
+    handler.close()  # sends immediately
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.connections == 1
+
+
+def test_flight_recorder_dumps_on_trigger(tmp_path):
+    handler = handlers.FlightRecorderHandler(capacity=3, logs_dir=tmp_path)
+    for i in range(5):
+        handler.handle(info_record(f"debug {i}", logging.DEBUG))
+    log = tmp_path / "debug.log"
+    assert not log.exists()
+    handler.handle(info_record("error", logging.ERROR))
+    assert [line.split()[-1] for line in log.read_text().splitlines()] == [
+        "3",
+        "4",
+        "error",
+    ]
+    handler.close()
+
+
+def test_flight_recorder_dumps_on_uncaught_exception(tmp_path, monkeypatch):
+    from np_logging import utils
+
+    for hook in ("exit", "excepthook"):
+        monkeypatch.setattr(sys, hook, getattr(sys, hook))
+    monkeypatch.setattr(threading, "excepthook", threading.excepthook)
+    monkeypatch.setattr(utils, "log_exception", lambda *args: None)
+    hooks = utils.ExitHooks()
+
+    handler = handlers.FlightRecorderHandler(max_age=60, logs_dir=tmp_path)
+    old = info_record("old", logging.DEBUG)
+    old.created -= 120
+    handler.handle(old)
+    handler.handle(info_record("recent", logging.DEBUG))
+    handler.flush()  # not written
+    assert not (tmp_path / "debug.log").exists()
+    hooks.sys_excepthook(ValueError, ValueError(), None)
+    assert "recent" in (tmp_path / "debug.log").read_text()
+    assert "old" not in (tmp_path / "debug.log").read_text()
+    handler.close()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import np_logging
+
+IMPORT_BUDGET_US = 50_000
+"Cumulative `-X importtime` of `import np_logging`: ~1 ms when lazy, ~200 ms eager."
+
+DEFERRED = ("np_config", "kazoo", "importlib_resources", "yaml", "np_logging.handlers")
+"Not imported until a handler is built or `setup()` is called."
+
+
+def importtime(tmp_path) -> dict[str, int]:
+    "Cumulative import time in microseconds of each module imported by `import np_logging`."
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import np_logging"],
+        env={**os.environ, "NP_LOGGING_CACHE_DIR": str(tmp_path)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_within_budget(tmp_path):
+    times = importtime(tmp_path)
+    assert times["np_logging"] < IMPORT_BUDGET_US
+    assert not [module for module in DEFERRED if module in times]
+
+
+def test_lazy_attributes():
+    assert np_logging.FileHandler is np_logging.handlers.FileHandler
+    assert np_logging.getLogger is np_logging.np_logging.getLogger
+    assert callable(np_logging.stats)
+    assert {"setup", "FileHandler", "handlers"} <= set(dir(np_logging))
+
+
+def test_star_import_exports_handlers():
+    namespace: dict = {}
+    exec("from np_logging import *", namespace)
+    assert namespace["FileHandler"] is np_logging.handlers.FileHandler
+    assert namespace["setup"] is np_logging.np_logging.setup
+    assert callable(namespace["setup_record_factory"]) and "detailed" in namespace["FORMAT"]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+
+import np_logging
+from np_logging import levels
+
+
+@pytest.fixture
+def parent():
+    "Logger with a single INFO handler, isolated from root."
+    parent = logging.getLogger("test_levels")
+    parent.propagate = False
+    return parent
+
+
+def only_handler(logger: logging.Logger, level: int) -> logging.Handler:
+    "Replace `logger`'s handlers, including pytest's capture handlers, in a test."
+    handler = logging.NullHandler(level)
+    logger.handlers[:] = [handler]
+    return handler
+
+
+def test_module_logger_level_follows_handlers(parent):
+    handler = only_handler(parent, logging.INFO)
+    logger = np_logging.getLogger("test_levels.module")
+    assert not logger.isEnabledFor(logging.DEBUG)
+    assert logger.isEnabledFor(logging.INFO)
+
+    handler.setLevel(logging.DEBUG)
+    levels.refresh()
+    assert logger.isEnabledFor(logging.DEBUG)
+
+    handler.setLevel(logging.ERROR)
+    levels.refresh()
+    assert not logger.isEnabledFor(logging.WARNING)
+
+
+def test_module_logger_without_handlers_is_not_filtered():
+    logger = np_logging.getLogger("test_levels_no_handlers.module")
+    logger.propagate = False
+    logger.handlers[:] = []
+    levels.refresh()
+    assert logger.isEnabledFor(logging.DEBUG)
+
+
+def test_level_set_elsewhere_is_kept(parent):
+    handler = only_handler(parent, logging.INFO)
+    logger = np_logging.getLogger("test_levels.explicit")
+    logger.setLevel(logging.CRITICAL)
+    handler.setLevel(logging.DEBUG)
+    levels.refresh()
+    assert logger.level == logging.CRITICAL
+    assert not levels.managed(logger)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import pytest
+
+from np_logging import listener
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay: float = 0, gate: threading.Event | None = None):
+        super().__init__()
+        self.delay = delay
+        self.gate = gate
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        time.sleep(self.delay)
+        self.records.append(record)
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("test_listener")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    yield logger
+    listener.disable()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+
+def test_emit_does_not_wait_on_slow_handler(logger):
+    slow = SlowHandler(delay=0.01)
+    logger.addHandler(slow)
+    listener.enable([logger], maxsize=1000)
+    t0 = time.perf_counter()
+    for i in range(100):
+        logger.info("record %d", i)
+    assert time.perf_counter() - t0 < 0.1 * 100 * slow.delay
+    listener.disable()
+    assert [r.getMessage() for r in slow.records] == [f"record {i}" for i in range(100)]
+    assert slow in logger.handlers
+    assert not any(isinstance(_, listener.QueueHandler) for _ in logger.handlers)
+
+
+def test_queue_handler_level_follows_handlers(logger):
+    handler = SlowHandler()
+    handler.setLevel(logging.WARNING)
+    logger.addHandler(handler)
+    listener.enable([logger])
+    queue_handler = next(
+        _ for _ in logger.handlers if isinstance(_, listener.QueueHandler)
+    )
+    assert queue_handler.level == min(_.level for _ in queue_handler.handlers)
+    logger.info("not wanted")
+    listener._queue.join()
+    handler.setLevel(logging.INFO)
+    listener.update_levels()
+    assert queue_handler.level == min(_.level for _ in queue_handler.handlers)
+    logger.info("wanted")
+    listener.disable()
+    assert [r.getMessage() for r in handler.records] == ["wanted"]
+
+
+@pytest.mark.parametrize(
+    "overflow, expected",
+    [
+        ("drop_oldest", ["info 0", "warning 5"] + [f"info {i}" for i in range(6, 10)]),
+        ("drop_below", ["info 0", "info 1", "info 2", "info 3", "info 4", "warning 5"]),
+    ],
+)
+def test_overflow_policies(logger, overflow, expected):
+    gate = threading.Event()
+    handler = SlowHandler(gate=gate)
+    logger.addHandler(handler)
+    listener.enable([logger], maxsize=5, overflow=overflow)
+    logger.info("info 0")
+    while listener._queue.qsize():  # wait for listener to block on first record
+        time.sleep(0.001)
+    for i in range(1, 10):
+        if i == 5:
+            logger.warning("warning %d", i)
+        else:
+            logger.info("info %d", i)
+    gate.set()
+    dropped = listener.dropped()
+    listener.disable()
+    assert [r.getMessage() for r in handler.records] == expected
+    assert dropped == 10 - len(expected)
+
+
+def test_queued_record_is_a_copy(logger):
+    original = []
+    logger.addFilter(lambda record: original.append(record) or True)
+    handler = SlowHandler()
+    logger.addHandler(handler)
+    listener.enable([logger])
+    args = {"n": 1}
+    logger.info("record %(n)d", args)
+    listener.disable()
+    logger.filters.clear()
+    assert original[0].msg == "record %(n)d" and original[0].args == args
+    assert handler.records[0] is not original[0]
+    assert handler.records[0].getMessage() == "record 1"
+
+
+def test_drop_level(logger):
+    gate = threading.Event()
+    handler = SlowHandler(gate=gate)
+    logger.addHandler(handler)
+    listener.enable([logger], maxsize=2, overflow="drop_below", drop_level="ERROR")
+    logger.info("info 0")
+    while listener._queue.qsize():
+        time.sleep(0.001)
+    logger.info("info 1")
+    logger.info("info 2")
+    logger.warning("warning 3")
+    threading.Timer(0.1, gate.set).start()
+    logger.error("error 4")  # waits for space
+    listener.disable()
+    messages = [r.getMessage() for r in handler.records]
+    assert messages == ["info 0", "info 1", "info 2", "error 4"]
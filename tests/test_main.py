@@ -4,6 +4,7 @@ import logging
 import logging.handlers
 import os
 import pathlib
+import smtplib
 import sys
 from typing import Optional
 
@@ -101,11 +102,13 @@ def test_set_level():
 
 
 def test_email_server():
-    assert utils.host_responsive(handlers.EmailHandler("test@email.com").mailhost)
+    handler = handlers.EmailHandler("test@email.com")
+    assert utils.port_open(handler.mailhost, handler.mailport or smtplib.SMTP_PORT)
 
 
 def test_log_server():
-    assert utils.host_responsive(handlers.ServerHandler().host)
+    handler = handlers.ServerHandler()
+    assert utils.port_open(handler.host, handler.port)
 
 
 def test_web_standalone():
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+
+import np_logging
+from np_logging import handlers, metrics
+
+
+@pytest.fixture
+def enabled():
+    metrics.enable()
+    yield
+    metrics.disable()
+
+
+def make_record(msg: str = "test") -> logging.LogRecord:
+    return logging.makeLogRecord({"msg": msg, "levelno": logging.INFO})
+
+
+def test_file_handler_metrics(tmp_path, enabled):
+    handler = handlers.FileHandler(logs_dir=tmp_path, level="INFO", maxBytes=100)
+    for _ in range(10):
+        handler.handle(make_record("x" * 20))
+    stats = np_logging.stats()[metrics.key(handler)]
+    assert stats["records"] == 10
+    assert stats["chars"] >= 200
+    assert stats["rollovers"] > 0
+    assert sum(stats["latency_us"].values()) == 10
+    assert stats["p50_us"] <= stats["p99_us"]
+    handler.close()
+
+
+def test_server_handler_metrics(receiver, tmp_path, enabled):
+    backup = handlers.ServerBackupHandler(filename=str(tmp_path / "backup.log"))
+    handler = handlers.ServerHandler(
+        "test", host="127.0.0.1", port=receiver.port, backup=backup
+    )
+    backup.stream.close()  # writes to backup fail, and are swallowed
+    handler.handle(make_record())
+    handler.close()
+    receiver.join()
+    stats = np_logging.stats()
+    assert stats[metrics.key(handler)]["connects"] == 1
+    assert stats[metrics.key(handler)]["chars"] > 0
+    assert stats[metrics.key(backup)]["errors"] == 1
+
+
+def test_server_backup_write_errors_counted(tmp_path, enabled, capsys):
+    backup = handlers.ServerBackupHandler(
+        filename=str(tmp_path / "missing" / "backup.log"), delay=True
+    )
+    for _ in range(3):
+        backup.handle(make_record())
+    assert np_logging.stats()[metrics.key(backup)]["errors"] == 3
+    assert "Traceback" not in capsys.readouterr().err
+    backup.close()
+
+
+def test_disabled_metrics_leave_no_wrappers(tmp_path):
+    handler = handlers.ConsoleHandler()
+    metrics.enable()
+    assert "handle" in vars(handler)
+    metrics.disable()
+    assert "handle" not in vars(handler) and handler.metrics is None
+    assert not np_logging.stats()
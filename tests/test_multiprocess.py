@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import multiprocessing
+
+import np_logging
+from np_logging import multiprocess
+
+CONTEXT = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def work(i: int) -> int:
+    logger = np_logging.getLogger("test_multiprocess.worker")
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("error in task %d", i)
+    for j in range(150):  # last batch is partial: sent at worker exit
+        logger.info("record %d from task %d", j, i)
+    return len(logging.getLogger().handlers)
+
+
+def test_workers_log_through_parent():
+    parent = logging.getLogger("test_multiprocess")
+    parent.propagate = False
+    handler = ListHandler()
+    parent.addHandler(handler)
+    listener = multiprocess.start(CONTEXT, level=logging.INFO)
+    with concurrent.futures.ProcessPoolExecutor(
+        2,
+        mp_context=multiprocessing.get_context(CONTEXT),
+        initializer=listener.initializer,
+        initargs=listener.initargs,
+    ) as pool:
+        assert list(pool.map(work, range(4))) == [1] * 4  # only the queue handler
+    multiprocess.stop()
+    parent.removeHandler(handler)
+
+    messages = [r.getMessage() for r in handler.records]
+    assert len(messages) == 4 * 151
+    assert "record 149 from task 3" in messages
+    errors = [r for r in handler.records if r.levelno == logging.ERROR]
+    assert len(errors) == 4 and "ZeroDivisionError" in errors[0].getMessage()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import logging
+import sys
+
+import pytest
+
+from np_logging import handlers, parsing
+
+
+@pytest.mark.parametrize("name", parsing.PACKAGE_FORMATS)
+def test_package_formats_round_trip(name):
+    formatter = handlers.formats()[name]
+    try:
+        raise RuntimeError("test")
+    except RuntimeError:
+        exc_info = sys.exc_info()
+    records = [
+        logging.LogRecord("np.test", level, __file__, 10, "message %d | %s", (i, "x"), exc)
+        for i, (level, exc) in enumerate(
+            [(logging.INFO, None), (logging.ERROR, exc_info), (5, None)]
+        )
+    ]
+    for i, record in enumerate(records):
+        record.__dict__.update(project="test", hostname="localhost", created=1e9 + i)
+    lines = "\n".join(formatter.format(record) for record in records).splitlines(True)
+    parsed = list(parsing.parse(lines))
+    assert [_["msg"] for _ in parsed] == [
+        "message 0 | x",
+        "message 1 | x\n" + records[1].exc_text,
+        "message 2 | x",
+    ]
+    assert [_["levelno"] for _ in parsed] == [logging.INFO, logging.ERROR, 5]
+    assert [_["created"] for _ in parsed] == [r.created for r in records]
+
+
+def test_unparseable_format():
+    with pytest.raises(ValueError):
+        parsing.LineFormat("%s | %(message)s")
+
+
+def test_json_lines_round_trip(tmp_path):
+    handler = handlers.FileHandler(logs_dir=tmp_path, level="INFO", json_lines=True)
+    try:
+        raise RuntimeError("test")
+    except RuntimeError:
+        exc_info = sys.exc_info()
+    for i, exc in enumerate([None, exc_info]):
+        record = logging.LogRecord("np.test", logging.ERROR, __file__, 10, "msg %d", (i,), exc)
+        record.__dict__.update(project="test", rig_name="NP.1", comp_id=None)
+        handler.handle(record)
+    handler.close()
+    lines = (tmp_path / "info.log").read_text().splitlines(True)
+    assert len(lines) == 2
+    lazy = list(parsing.parse_json_lines(lines + ['{"created": 1']))  # partial last line
+    assert lazy == list(parsing.parse(lines))
+    assert [_["msg"] for _ in lazy] == ["msg 0", "msg 1"]
+    assert lazy[1]["exc_text"].endswith("RuntimeError: test")
+    assert lazy[0]["project"] == "test" and lazy[0]["levelno"] == logging.ERROR
+    assert logging.makeLogRecord(lazy[0]).getMessage() == "msg 0"
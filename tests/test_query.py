@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import logging
+import sys
+import time
+
+import pytest
+
+from np_logging import handlers, query, rotation
+
+
+def record(msg: str, name: str = "np.test", level: int = logging.INFO, created=None):
+    fields = {
+        "name": name,
+        "msg": msg,
+        "levelno": level,
+        "levelname": logging.getLevelName(level),
+    }
+    record = logging.makeLogRecord(fields)
+    if created is not None:
+        record.created, record.msecs = created, (created % 1) * 1000
+    return record
+
+
+def file_handler(tmp_path, **kwargs) -> handlers.FileHandler:
+    return handlers.FileHandler(
+        logs_dir=tmp_path, level="DEBUG", maxBytes=10_000, backupCount=100, **kwargs
+    )
+
+
+def write(handler, records) -> None:
+    for _ in records:
+        handler.handle(_)
+    handler.flush()
+
+
+def messages(found) -> list[str]:
+    return [fields["msg"].splitlines()[0] for _, fields in found]
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_query_across_backups(tmp_path, monkeypatch, compression):
+    monkeypatch.setattr(query, "BLOCK_BYTES", 1000)
+    handler = file_handler(tmp_path, rotation="sequence", compression=compression)
+    t0 = int(time.time()) - 1000  # whole seconds: the format has no msecs
+    levels = (logging.DEBUG, logging.INFO, logging.WARNING)
+    write(
+        handler,
+        (
+            record(f"record {i}", f"np.{i % 4}", levels[i % 3], created=t0 + i)
+            for i in range(600)
+        ),
+    )
+    rotation.pruner().requests.join()
+    base = tmp_path / "debug.log"
+    assert len(rotation.list_segments(base)) > 2
+
+    found = query.query(base, level=logging.WARNING, logger="np.1")
+    assert messages(found) == [f"record {i}" for i in range(600) if i % 12 == 5]
+
+    found = query.query(base, since=t0 + 100, until=t0 + 110.5)
+    assert messages(found) == [f"record {i}" for i in range(100, 111)]
+
+    # only the blocks with matching records are read
+    index = query.get_index(rotation.list_segments(base)[0], base, final=True)
+    assert 1 < len(index.blocks) == len(index.loggers["np.0"])
+    assert len(index.candidates(since=t0 + 5, until=t0 + 6)) == 1
+    handler.close()
+
+
+@pytest.mark.parametrize("json_lines", [False, True])
+def test_index_updated_as_file_grows(tmp_path, json_lines):
+    handler = file_handler(tmp_path, json_lines=json_lines)
+    base = tmp_path / "debug.log"
+    write(handler, (record(f"record {i}") for i in range(10)))
+    assert len(list(query.query(base))) == 10
+    size = query.get_index(base, base, final=False).size
+    assert 0 < size < base.stat().st_size  # last record unindexed: may be incomplete
+
+    write(handler, (record(f"record {i}") for i in range(10, 20)))
+    found = query.query(base, logger="np")
+    assert messages(found) == [f"record {i}" for i in range(20)]
+    assert query.get_index(base, base, final=False).size > size
+    handler.close()
+
+
+def test_multiline_records(tmp_path):
+    handler = file_handler(tmp_path)
+    try:
+        raise RuntimeError("test")
+    except RuntimeError:
+        failed = record("failed", level=logging.ERROR)
+        failed.exc_info = sys.exc_info()
+    write(handler, [record("before"), failed, record("after")])
+    handler.close()
+    ((text, fields),) = query.query(tmp_path / "debug.log", level=logging.ERROR)
+    assert text.endswith("RuntimeError: test\n")
+    assert fields["msg"].startswith("failed\nTraceback")
+
+
+def test_stale_indexes_removed(tmp_path):
+    handler = file_handler(tmp_path, rotation="sequence")
+    write(handler, (record(f"record {i} " + "x" * 100) for i in range(500)))
+    handler.close()
+    base = tmp_path / "debug.log"
+    list(query.query(base))
+    indexes = list(query.index_dir(base).iterdir())
+    assert len(indexes) == len(rotation.list_segments(base)) + 1
+    rotation.Pruner.prune(str(base), 1)
+    list(query.query(base))
+    assert len(list(query.index_dir(base).iterdir())) == 2
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import copy
+import logging
+
+import pytest
+
+from np_logging import reconfigure
+
+
+@pytest.fixture
+def config(tmp_path) -> dict:
+    yield {
+        "version": 1,
+        "formatters": {"simple": {"format": "%(message)s"}},
+        "handlers": {
+            "file": {
+                "class": "logging.FileHandler",
+                "filename": str(tmp_path / "test.log"),
+                "formatter": "simple",
+                "level": "INFO",
+            },
+            "null": {"class": "logging.NullHandler"},
+        },
+        "loggers": {"test_reconfigure": {"handlers": ["file", "null"], "level": "DEBUG"}},
+        "disable_existing_loggers": False,
+    }
+    logger = logging.getLogger("test_reconfigure")
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers.clear()
+
+
+def test_unchanged_handlers_kept(config):
+    reconfigure.apply(config, incremental=False)
+    logger = logging.getLogger("test_reconfigure")
+    file, null = logger.handlers
+    stream = file.stream
+
+    config = copy.deepcopy(config)
+    config["handlers"]["file"]["level"] = "WARNING"
+    config["formatters"]["simple"]["format"] = "changed %(message)s"
+    config["loggers"]["test_reconfigure"]["level"] = "INFO"
+    assert reconfigure.apply(config) == {"built": [], "kept": ["file", "null"], "closed": []}
+    assert logger.handlers == [file, null]
+    assert file.stream is stream and not stream.closed
+    assert file.level == logging.WARNING
+    assert file.formatter._fmt == "changed %(message)s"
+    assert logger.level == logging.INFO
+
+
+def test_changed_handlers_replaced_and_closed(config, tmp_path):
+    reconfigure.apply(config, incremental=False)
+    logger = logging.getLogger("test_reconfigure")
+    file, null = logger.handlers
+    stream = file.stream
+
+    config = copy.deepcopy(config)
+    config["handlers"]["file"]["filename"] = str(tmp_path / "other.log")
+    del config["handlers"]["null"]
+    config["loggers"]["test_reconfigure"]["handlers"] = ["file"]
+    changes = reconfigure.apply(config)
+    assert changes == {"built": ["file"], "kept": [], "closed": ["file", "null"]}
+    assert logger.handlers[0] is not file and len(logger.handlers) == 1
+    assert logging._handlers["file"] is logger.handlers[0]
+    assert stream.closed
+    logger.warning("test")
+    assert (tmp_path / "other.log").read_text() == "test\n"
+
+
+def test_unconfigured_logger_reset(config):
+    reconfigure.apply(config, incremental=False)
+    config = copy.deepcopy(config)
+    config["loggers"] = {"test_reconfigure.other": {"handlers": ["null"]}}
+    reconfigure.apply(config)
+    logger = logging.getLogger("test_reconfigure")
+    assert logger.handlers == [] and logger.level == logging.NOTSET
+    assert logging.getLogger("test_reconfigure.other").handlers[0].name == "null"
+    logging.getLogger("test_reconfigure.other").handlers.clear()
+
+
+def test_server_connection_kept(receiver):
+    config = {
+        "version": 1,
+        "handlers": {
+            "server": {
+                "()": "np_logging.handlers.ServerHandler",
+                "project_name": "test",
+                "host": "127.0.0.1",
+                "port": receiver.port,
+                "level": "INFO",
+            }
+        },
+        "loggers": {"test_reconfigure": {"handlers": ["server"], "propagate": False}},
+        "disable_existing_loggers": False,
+    }
+    logger = logging.getLogger("test_reconfigure")
+    logger.setLevel(logging.DEBUG)
+    reconfigure.apply(config, incremental=False)
+    for i in range(5):
+        config["handlers"]["server"]["level"] = "DEBUG" if i % 2 else "INFO"
+        reconfigure.apply(config)
+        logger.info("record %d", i)
+    receiver.wait_for(5)
+    assert receiver.connections == 1
+    logger.handlers[0].close()
+    logger.handlers.clear()
+    logger.setLevel(logging.NOTSET)
+
+
+def test_removed_level_reset(config):
+    reconfigure.apply(config, incremental=False)
+    config = copy.deepcopy(config)
+    del config["handlers"]["file"]["level"]
+    changes = reconfigure.apply(config)
+    assert changes["built"] == ["file"]
+    logger = logging.getLogger("test_reconfigure")
+    assert logger.handlers[0].level == logging.NOTSET
+    logger.handlers[0].close()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+
+from np_logging import handlers, rotation
+
+
+def record(msg: str = "x" * 100) -> logging.LogRecord:
+    return logging.makeLogRecord({"msg": msg, "levelno": logging.INFO})
+
+
+@pytest.mark.parametrize("buffer_size", [0, 1 << 16])
+@pytest.mark.parametrize("scheme", ["sequence", "timestamp"])
+def test_rollover_renames_only_current_file(tmp_path, scheme, buffer_size):
+    handler = handlers.FileHandler(
+        logs_dir=tmp_path,
+        maxBytes=1000,
+        backupCount=5,
+        rotation=scheme,
+        level="INFO",
+        buffer_size=buffer_size,
+    )
+    for i in range(100):
+        handler.handle(record(f"{i:03d}" + "x" * 100))
+    handler.close()
+    rotation.pruner().requests.join()
+    segments = rotation.list_segments(tmp_path / "info.log")
+    assert len(segments) == 5
+    assert all(_.stat().st_size <= 1000 for _ in segments)
+    # newest records in base file, previous in newest segment
+    assert "099" in (tmp_path / "info.log").read_text()
+    last_segment = segments[-1].read_text()
+    first_in_base = (tmp_path / "info.log").read_text().split("|")[1][1:4]
+    assert f"{int(first_in_base) - 1:03d}" in last_segment
+
+
+def test_sequence_continues_after_restart(tmp_path):
+    for _ in range(2):
+        handler = handlers.FileHandler(
+            logs_dir=tmp_path, maxBytes=100, backupCount=10, rotation="sequence"
+        )
+        for _ in range(3):
+            handler.handle(record())
+        handler.close()
+    rotation.pruner().requests.join()
+    names = [_.name for _ in rotation.list_segments(tmp_path / "info.log")]
+    assert len(names) > 3
+    assert names == [f"info.log.{i:06d}" for i in range(1, len(names) + 1)]
+
+
+def test_invalid_rotation(tmp_path):
+    with pytest.raises(ValueError):
+        handlers.FileHandler(logs_dir=tmp_path, rotation="rename")
+
+
+@pytest.mark.parametrize("compression", ["gzip", "xz"])
+def test_backups_compressed_in_background(tmp_path, compression):
+    handler = handlers.FileHandler(
+        logs_dir=tmp_path,
+        maxBytes=1000,
+        backupCount=5,
+        rotation="sequence",
+        compression=compression,
+        level="INFO",
+    )
+    for i in range(100):
+        handler.handle(record(f"{i:03d}" + "x" * 100))
+    handler.close()
+    rotation.pruner().requests.join()
+    segments = rotation.list_segments(tmp_path / "info.log")
+    assert len(segments) == 5
+    assert all(_.suffix == {"gzip": ".gz", "xz": ".xz"}[compression] for _ in segments)
+    assert not [_ for _ in tmp_path.iterdir() if _.name.endswith(".tmp")]
+    mtimes = [_.stat().st_mtime for _ in segments]
+    assert mtimes == sorted(mtimes)
+    numbers = [int(line.split("|")[1][1:4]) for line in rotation.read_lines(tmp_path / "info.log")]
+    assert numbers == list(range(numbers[0], 100))
+
+
+def test_compression_requires_segment_rotation(tmp_path):
+    with pytest.raises(ValueError):
+        handlers.FileHandler(logs_dir=tmp_path, rotation="classic", compression="gzip")
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import logging.handlers
+import socket
+import threading
+
+from np_logging import handlers
+from np_logging.server import LogServer, ThreadedLogServer
+
+
+def frame(i: int) -> bytes:
+    return logging.handlers.SocketHandler(None, None).makePickle(
+        logging.makeLogRecord({"msg": f"record {i}", "levelno": logging.INFO})
+    )
+
+
+def test_records_written_to_file(tmp_path):
+    path = tmp_path / "server.log"
+    server = ThreadedLogServer(
+        handlers=[handlers.ServerBackupHandler(filename=str(path), delay=True)]
+    )
+    with socket.create_connection((server.host, server.port)) as client:
+        client.sendall(b"".join(frame(i) for i in range(100)))
+    server.join()
+    server.close()
+    lines = path.read_text().splitlines()
+    assert len(lines) == 100
+    assert all(f"record {i}" in line for i, line in enumerate(lines))
+
+
+def test_records_forwarded_upstream(receiver):
+    relay = ThreadedLogServer(
+        handlers=[
+            handlers.BatchServerHandler(
+                host="127.0.0.1",
+                port=receiver.port,
+                compress=True,
+                backup=logging.NullHandler(),
+                level=logging.NOTSET,
+            )
+        ]
+    )
+    with socket.create_connection((relay.host, relay.port)) as client:
+        client.sendall(b"".join(frame(i) for i in range(1000)))
+    relay.join()
+    relay.close()
+    receiver.join()
+    assert [r["msg"] for r in receiver.records] == [f"record {i}" for i in range(1000)]
+    assert receiver.reads < 1000
+
+
+def test_many_connections(receiver):
+    clients = [socket.create_connection((receiver.host, receiver.port)) for _ in range(500)]
+    for i, client in enumerate(clients):
+        client.sendall(frame(i))
+    assert receiver.wait_for(500, timeout=10)
+    assert receiver.stats()["open_connections"] == 500
+    for client in clients:
+        client.close()
+    receiver.join()
+    assert receiver.stats()["connections"] == 500
+    assert sorted(r["msg"] for r in receiver.records) == sorted(
+        f"record {i}" for i in range(500)
+    )
+
+
+class GatedHandler(logging.Handler):
+    def __init__(self, gate: threading.Event):
+        super().__init__()
+        self.gate = gate
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record):
+        self.gate.wait()
+        if record.msg == "record 1":
+            raise RuntimeError("test")
+        self.records.append(record)
+
+    def handleError(self, record):
+        raise  # as if a handler let an exception escape
+
+
+def send_batches(server: ThreadedLogServer, n: int) -> None:
+    with socket.create_connection((server.host, server.port)) as client:
+        for i in range(n):
+            client.sendall(frame(i))
+            assert server.wait_for(i + 1)
+    server.join()
+
+
+def test_sinks_drop_records_when_behind():
+    gate = threading.Event()
+    handler = GatedHandler(gate)
+    server = ThreadedLogServer(handlers=[handler], max_batches=1)
+    send_batches(server, 5)
+    # first batch waiting on the gate, second queued, the rest dropped
+    assert server.stats()["dropped"] == 3
+    gate.set()
+    server.close()
+    assert [r.msg for r in handler.records] == ["record 0"]  # 1 raised
+
+
+def test_sinks_continue_after_errors():
+    gate = threading.Event()
+    gate.set()
+    handler = GatedHandler(gate)
+    server = ThreadedLogServer(handlers=[handler])
+    send_batches(server, 3)
+    server.close()
+    assert [r.msg for r in handler.records] == ["record 0", "record 2"]
+
+
+def test_listens_on_loopback_by_default():
+    async def main():
+        server = LogServer(port=0)
+        await server.start()
+        address = server.server.sockets[0].getsockname()[0]
+        await server.stop()
+        return address
+
+    assert asyncio.run(main()) == "127.0.0.1"
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import time
+
+import pytest
+
+from np_logging import handlers, rotation, ship
+
+
+def record(msg: str, level: int = logging.INFO, exc_info=None) -> logging.LogRecord:
+    return logging.makeLogRecord(
+        {
+            "name": "np.test",
+            "msg": msg,
+            "levelno": level,
+            "levelname": logging.getLevelName(level),
+            "exc_info": exc_info,
+        }
+    )
+
+
+def file_handler(tmp_path, **kwargs) -> handlers.FileHandler:
+    return handlers.FileHandler(
+        logs_dir=tmp_path, level="INFO", maxBytes=2000, backupCount=100, **kwargs
+    )
+
+
+def messages(receiver) -> list[str]:
+    return [r["msg"].splitlines()[0] for r in receiver.records]
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_backfill_resumes_from_checkpoint(tmp_path, receiver, compression):
+    handler = file_handler(tmp_path, rotation="sequence", compression=compression)
+    for i in range(50):
+        handler.handle(record(f"record {i}"))
+    handler.close()
+    rotation.pruner().requests.join()
+    assert rotation.list_segments(tmp_path / "info.log")
+
+    kwargs = dict(host=receiver.host, port=receiver.port, checkpoint_dir=tmp_path / "ship")
+    assert ship.ship([tmp_path], batch_bytes=1000, **kwargs) == 50
+    assert ship.ship([tmp_path], **kwargs) == 0
+
+    handler = file_handler(tmp_path, rotation="sequence", compression=compression)
+    for i in range(50, 80):
+        handler.handle(record(f"record {i}"))
+    handler.close()
+    rotation.pruner().requests.join()
+    assert ship.ship([tmp_path / "info.log"], **kwargs) == 30
+    assert receiver.wait_for(80)
+    assert messages(receiver) == [f"record {i}" for i in range(80)]
+
+
+def test_multiline_records_and_level(tmp_path, receiver):
+    handler = file_handler(tmp_path)
+    try:
+        raise RuntimeError("test")
+    except RuntimeError:
+        handler.handle(record("failed", logging.ERROR, sys.exc_info()))
+    handler.handle(record("info"))
+    handler.close()
+    kwargs = dict(host=receiver.host, port=receiver.port, checkpoint_dir=tmp_path / "ship")
+    assert ship.ship([tmp_path / "info.log"], level=logging.WARNING, **kwargs) == 1
+    receiver.wait_for(1)
+    (shipped,) = receiver.records
+    assert shipped["levelno"] == logging.ERROR and shipped["name"] == "np.test"
+    assert shipped["msg"].startswith("failed\nTraceback")
+    assert shipped["msg"].endswith("RuntimeError: test")
+
+
+def test_follow_across_rotation(tmp_path, receiver):
+    handler = file_handler(tmp_path, rotation="classic")
+    stop = threading.Event()
+    kwargs = dict(host=receiver.host, port=receiver.port, checkpoint_dir=tmp_path / "ship")
+    follower = threading.Thread(
+        target=ship.ship,
+        args=([tmp_path / "info.log"],),
+        kwargs=dict(follow=True, poll_interval=0.01, stop=stop, **kwargs),
+    )
+    follower.start()
+    for i in range(200):
+        handler.handle(record(f"record {i}"))
+        if i % 20 == 0:
+            time.sleep(0.02)
+    handler.close()
+    try:
+        assert receiver.wait_for(200, timeout=10)
+    finally:
+        stop.set()
+        follower.join()
+    assert messages(receiver) == [f"record {i}" for i in range(200)]
+
+
+def test_checkpoint_kept_while_server_down(tmp_path):
+    handler = file_handler(tmp_path)
+    handler.handle(record("record"))
+    handler.close()
+    sender = ship.Sender("127.0.0.1", 1)
+    shipper = ship.Shipper(tmp_path / "info.log", sender, tmp_path / "ship")
+    with pytest.raises(OSError):
+        shipper.step()
+    assert shipper.checkpoint is None and shipper.sent == 0
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import logging
+import logging.handlers
+import time
+
+import pytest
+
+from np_logging import handlers, spool, wire
+
+
+def frame(i: int) -> bytes:
+    return logging.handlers.SocketHandler(None, None).makePickle(
+        logging.makeLogRecord({"msg": f"record {i}"})
+    )
+
+
+def unsent(s: spool.Spool) -> list[str]:
+    "Messages of all unsent records, committing as if sent."
+    decoder = wire.FrameDecoder()
+    messages = []
+    while True:
+        data, position = s.read()
+        if not data:
+            return messages
+        messages += [r["msg"] for r in decoder.feed(data)]
+        s.commit(position)
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_spooled_records_replayed_in_order_when_server_available(tmp_path, receiver):
+    handler = handlers.ServerHandler(
+        "test", host="127.0.0.1", port=receiver.port, spool=tmp_path
+    )
+    handler.forwarder.stop()  # server "down"
+    for i in range(100):
+        handler.handle(logging.makeLogRecord({"msg": f"record {i}"}))
+    handler.close()  # releases the spool directory, with the forwarder stopped
+    assert not receiver.records
+
+    handler = handlers.ServerHandler(
+        "test", host="127.0.0.1", port=receiver.port, spool=tmp_path
+    )
+    assert handler.spool.directory == tmp_path
+    assert handler.forwarder.drain(5)
+    handler.close()
+    receiver.join()
+    assert [r["msg"] for r in receiver.records] == [f"record {i}" for i in range(100)]
+
+
+def test_checkpoint_survives_restart(tmp_path):
+    s = spool.Spool(tmp_path, segment_bytes=len(frame(0)) * 3)
+    for i in range(10):
+        s.append(frame(i))
+    data, position = s.read(len(frame(0)) * 5)
+    s.commit(position)
+    s.close()
+
+    s = spool.Spool(tmp_path)
+    assert unsent(s) == [f"record {i}" for i in range(3, 10)]
+    s.close()
+
+
+def test_incomplete_frame_truncated_after_crash(tmp_path):
+    s = spool.Spool(tmp_path)
+    s.append(frame(0))
+    s.append(frame(1)[:-5])
+    s.close()
+    s = spool.Spool(tmp_path)
+    s.append(frame(2))
+    assert unsent(s) == ["record 0", "record 2"]
+    s.close()
+
+
+class ShortWrites:
+    "File writing at most `n` bytes per call, and failing after `fail_after` calls."
+
+    def __init__(self, file, n: int, fail_after: int | None = None):
+        self.file = file
+        self.n = n
+        self.fail_after = fail_after
+
+    def write(self, data) -> int:
+        if self.fail_after is not None:
+            if self.fail_after <= 0:
+                raise OSError("disk full")
+            self.fail_after -= 1
+        return self.file.write(data[: self.n])
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+def test_short_writes_completed(tmp_path):
+    s = spool.Spool(tmp_path)
+    s.file = ShortWrites(s.file, n=7)
+    for i in range(3):
+        s.append(frame(i))
+    assert unsent(s) == ["record 0", "record 1", "record 2"]
+
+    s.file.fail_after = 2
+    with pytest.raises(OSError):
+        s.append(frame(3))
+    s.file.fail_after = None
+    s.append(frame(4))
+    assert unsent(s) == ["record 4"]
+    s.close()
+
+
+def test_disk_use_is_bounded(tmp_path):
+    size = len(frame(0))
+    s = spool.Spool(tmp_path, segment_bytes=size * 10, max_bytes=size * 30)
+    for i in range(100):
+        s.append(frame(i))
+    assert sum(_.stat().st_size for _ in tmp_path.glob("*.spool")) <= size * 30
+    assert unsent(s) == [
+        f"record {i}" for i in range(80, 100)
+    ]  # whole segments dropped
+    s.close()
+
+
+def test_directory_used_by_one_spool_at_a_time(tmp_path):
+    s = spool.Spool(tmp_path / "spool")
+    with pytest.raises(OSError):
+        spool.Spool(tmp_path / "spool")
+    other = spool.Spool.first_available(tmp_path / "spool")
+    assert other.directory == tmp_path / "spool.1"
+    s.close()
+    other.close()
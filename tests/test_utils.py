@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import logging
+import socket
+import time
+
+import pytest
+
+from np_logging import config, utils
+
+
+@pytest.fixture(autouse=True)
+def probe_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(utils, "_probe_cache", {})
+
+
+@pytest.fixture
+def open_port():
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        yield server.getsockname()[1]
+
+
+@pytest.fixture
+def closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_probes_run_concurrently(monkeypatch):
+    def slow_port_open(host, port, timeout):
+        time.sleep(0.2)
+        return True
+
+    monkeypatch.setattr(utils, "port_open", slow_port_open)
+    addresses = [("127.0.0.1", port) for port in range(5)]
+    t0 = time.perf_counter()
+    assert all(utils.addresses_accessible(addresses).values())
+    assert time.perf_counter() - t0 < 0.2 * 2
+
+
+def test_successful_probes_are_cached(open_port, closed_port, monkeypatch):
+    addresses = [("127.0.0.1", open_port), ("127.0.0.1", closed_port)]
+    expected = {addresses[0]: True, addresses[1]: False}
+    assert utils.addresses_accessible(addresses) == expected
+    probed = []
+    monkeypatch.setattr(utils, "port_open", lambda *a, **kw: probed.append(a) or False)
+    assert utils.addresses_accessible(addresses) == expected
+    monkeypatch.setattr(utils, "_probe_cache", {})  # e.g. new process: on-disk cache
+    assert utils.addresses_accessible(addresses) == expected
+    assert probed == [addresses[1]] * 2  # failures aren't re-used
+
+
+def test_probe_time_bounded_including_name_resolution(monkeypatch):
+    def slow_getaddrinfo(*args, **kwargs):
+        time.sleep(2)
+        raise socket.gaierror
+
+    monkeypatch.setattr(socket, "getaddrinfo", slow_getaddrinfo)
+    t0 = time.perf_counter()
+    assert utils.addresses_accessible([("unresolvable", 9000)], timeout=0.1) == {
+        ("unresolvable", 9000): False
+    }
+    assert time.perf_counter() - t0 < 1
+
+
+def test_inaccessible_handlers_removed(open_port, closed_port):
+    logging_config = {
+        "version": 1,
+        "handlers": {
+            "up": {"class": "logging.handlers.SocketHandler", "host": "127.0.0.1", "port": open_port},
+            "down": {"class": "logging.handlers.SocketHandler", "host": "127.0.0.1", "port": closed_port},
+            "mail": {"class": "logging.handlers.SMTPHandler", "mailhost": ["127.0.0.1", closed_port]},
+        },
+        "loggers": {"web": {"handlers": ["up", "down"]}},
+        "root": {"handlers": ["mail"]},
+    }
+    assert sorted(utils.ensure_accessible_handlers(logging_config)) == ["down", "mail"]
+    assert list(logging_config["handlers"]) == ["up"]
+    assert logging_config["loggers"]["web"]["handlers"] == ["up"]
+    assert logging_config["root"]["handlers"] == []